@@ -33,6 +33,67 @@ class MuffChangeLogAdmin(admin.ModelAdmin):
     list_filter = ['change_date', 'changed_muff_type']
     date_hierarchy = 'change_date'
 
+class CableRiskScoreAdmin(admin.ModelAdmin):
+    list_display = ['cable_line', 'risk_level', 'probability', 'model_version', 'scored_at']
+    list_filter = ['risk_level', 'model_version']
+
+class TrainingJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'status', 'mode', 'progress', 'message', 'requested_by', 'model_version', 'created_at',
+                    'heartbeat_at', 'finished_at']
+    list_filter = ['status']
+
+class PDTraceAdmin(admin.ModelAdmin):
+    list_display = ['session', 'voltage_level', 'core', 'pulse_count', 'file_path', 'created_at']
+    exclude = ['data']
+
+class PRPDPatternAdmin(admin.ModelAdmin):
+    list_display = ['session', 'pulse_count', 'schema_version', 'updated_at']
+    exclude = ['histogram', 'features']
+
+class CableHotSpotProfileAdmin(admin.ModelAdmin):
+    list_display = ['cable_line', 'session_count', 'bin_length', 'schema_version', 'updated_at']
+    exclude = ['weights', 'hits']
+
+class CableDischargeTrendAdmin(admin.ModelAdmin):
+    list_display = ['cable_line', 'core', 'growth_rate', 'slope', 'acceleration', 'session_count',
+                    'last_session_date']
+    list_filter = ['core']
+
+class ModelVersionAdmin(admin.ModelAdmin):
+    list_display = ['version', 'mode', 'parent_version', 'base_version', 'data_watermark', 'sample_count',
+                    'trained_sample_count', 'new_sample_count', 'tree_count', 'roc_auc', 'precision', 'recall']
+    list_filter = ['mode']
+
+class ViewProfileAdmin(admin.ModelAdmin):
+    list_display = ['view_name', 'method', 'period', 'request_count', 'average_ms', 'max_ms', 'average_queries',
+                    'max_queries', 'average_sql_ms', 'error_count']
+    list_filter = ['method', 'view_name']
+    date_hierarchy = 'period'
+    ordering = ['-period', '-total_time']
+
+    @admin.display(description='Среднее время (мс)')
+    def average_ms(self, obj):
+        return round(obj.total_time / obj.request_count * 1000, 1) if obj.request_count else 0
+
+    @admin.display(description='Максимальное время (мс)', ordering='max_time')
+    def max_ms(self, obj):
+        return round(obj.max_time * 1000, 1)
+
+    @admin.display(description='SQL-запросов в среднем')
+    def average_queries(self, obj):
+        return round(obj.query_count / obj.request_count, 1) if obj.request_count else 0
+
+    @admin.display(description='Время SQL в среднем (мс)')
+    def average_sql_ms(self, obj):
+        return round(obj.sql_time / obj.request_count * 1000, 1) if obj.request_count else 0
+
+class ProfileSampleAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'method', 'path', 'view_name', 'status_code', 'duration', 'query_count',
+                    'sql_time']
+    list_filter = ['view_name']
+    readonly_fields = ['view_name', 'method', 'path', 'status_code', 'duration', 'query_count', 'sql_time',
+                       'stats', 'created_at']
+
 admin.site.register(Enterprise)
 admin.site.register(UserProfile)
 admin.site.register(CableLine, CableLineAdmin)
@@ -40,4 +101,13 @@ admin.site.register(MuffChangeLog, MuffChangeLogAdmin)
 admin.site.register(PDDMeasurementSession, PDDMeasurementSessionAdmin)
 admin.site.register(SinglePDMeasurement)
 admin.site.register(HighVoltageTest, HighVoltageTestAdmin)
-admin.site.register(Accident, AccidentAdmin)
\ No newline at end of file
+admin.site.register(Accident, AccidentAdmin)
+admin.site.register(CableRiskScore, CableRiskScoreAdmin)
+admin.site.register(TrainingJob, TrainingJobAdmin)
+admin.site.register(PDTrace, PDTraceAdmin)
+admin.site.register(PRPDPattern, PRPDPatternAdmin)
+admin.site.register(CableHotSpotProfile, CableHotSpotProfileAdmin)
+admin.site.register(CableDischargeTrend, CableDischargeTrendAdmin)
+admin.site.register(ModelVersion, ModelVersionAdmin)
+admin.site.register(ViewProfile, ViewProfileAdmin)
+admin.site.register(ProfileSample, ProfileSampleAdmin)
\ No newline at end of file
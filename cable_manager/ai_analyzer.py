@@ -1,62 +1,195 @@
+import copy
+import time
+
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import accuracy_score, classification_report
-import joblib
-import os
-from .models import CableLine, PDDMeasurementSession, SinglePDMeasurement, HighVoltageTest, Accident
+from .compiled_model import load_compiled_model, save_compiled_model
+from .feature_store import load_session_features
+from .prpd import PRPD_FEATURE_COLUMNS, PRPD_FEATURE_LABELS, load_prpd_features
+from .trends import TREND_FEATURE_COLUMNS, TREND_FEATURE_LABELS, load_trend_features
+from .metrics import collector, predict_latency, predict_rows, training_duration, training_samples
+from .model_registry import registry, atomic_dump, atomic_write_json
+from .page_cache import invalidate_enterprises
+from .models import CableLine, PDDMeasurementSession, Accident, CableRiskScore, SessionFeatureVector, ModelVersion
 from django.conf import settings
-from datetime import timedelta
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from datetime import datetime, timedelta
 from django.utils import timezone
 
 
-class CableAIAnalyzer:
-    def __init__(self):
-        self.model = None
-        self.scaler = StandardScaler()
-        self.model_path = os.path.join(settings.BASE_DIR, 'cable_ai_model.pkl')
-        self.scaler_path = os.path.join(settings.BASE_DIR, 'cable_scaler.pkl')
-        self.load_model()
+# Размер пакета кабелей при полном пересчёте оценок риска
+RESCORE_BATCH_SIZE = 2000
 
-    def prepare_training_data(self):
-        """Подготовка данных для обучения модели"""
-        features = []
-        labels = []
+# Горизонт прогноза: авария в течение 90 дней после измерений
+ACCIDENT_HORIZON = timedelta(days=90)
 
-        print("Сбор данных для обучения...")
 
-        # Собираем данные по всем кабельным линиям
-        cable_lines = CableLine.objects.all()
+# Дообучение: сколько деревьев добавляется к ансамблю за один запуск и сколько
+# старых образцов (в долях от числа новых) повторно подмешивается к новым данным
+INCREMENTAL_TREES = 10
+INCREMENTAL_REPLAY_RATIO = 1.0
+
+# Когда вместо дообучения выполняется полное переобучение
+FULL_REBUILD_EVERY = 10
+FULL_REBUILD_MAX_AGE = timedelta(days=30)
+MAX_ENSEMBLE_TREES = 300
 
-        print(f"Найдено кабельных линий: {cable_lines.count()}")
 
-        for cable in cable_lines:
-            # Получаем ВСЕ сессии измерений для этого кабеля
-            sessions = PDDMeasurementSession.objects.filter(cable_line=cable).order_by('session_date')
+# Дополнительные наборы признаков сессии: столбцы, загрузчик (по session_id) и подписи.
+# Сессии без данных набора получают нулевые значения.
+EXTRA_FEATURE_SETS = {
+    'prpd': (PRPD_FEATURE_COLUMNS, load_prpd_features, PRPD_FEATURE_LABELS),
+    'trend': (TREND_FEATURE_COLUMNS, load_trend_features, TREND_FEATURE_LABELS),
+}
 
-            for session in sessions:
-                # Получаем все измерения для этой сессии
-                measurements = SinglePDMeasurement.objects.filter(session=session)
 
-                if not measurements:
-                    continue
+def configured_extra_features():
+    """Наборы дополнительных признаков для обучения новой модели (CABLE_AI_EXTRA_FEATURES)"""
+    return [name for name in getattr(settings, 'CABLE_AI_EXTRA_FEATURES', []) if name in EXTRA_FEATURE_SETS]
 
-                # Извлекаем признаки
-                feature_vector = self.extract_features(cable, measurements)
 
-                if feature_vector is not None:
-                    features.append(feature_vector)
+def extra_session_features(extra_features, session_ids=None):
+    """Дополнительные признаки сессий одним DataFrame по session_id (без пропусков)"""
+    frames = []
+    for name in extra_features:
+        columns, loader, _ = EXTRA_FEATURE_SETS[name]
+        frame = loader(session_ids)
+        if session_ids is not None:
+            frame = frame.reindex(pd.Index(session_ids, name='session_id'))
+        frames.append(frame[columns])
+    if not frames:
+        return pd.DataFrame(index=pd.Index(session_ids or [], name='session_id'))
+    return pd.concat(frames, axis=1).fillna(0)
 
-                    # Определяем метку (была ли авария в ближайшие 90 дней после измерений)
-                    has_accident = self.check_future_accidents(cable, session.session_date)
-                    labels.append(1 if has_accident else 0)
+
+def changed_session_ids(since, max_session_id=None):
+    """Сессии, добавленные или с пересчитанными признаками после момента since"""
+    new_sessions = Q(created_at__gt=since)
+    if max_session_id is not None:
+        new_sessions |= Q(pk__gt=max_session_id)
+    session_ids = set(PDDMeasurementSession.objects.filter(new_sessions).values_list('pk', flat=True))
+    session_ids.update(SessionFeatureVector.objects.filter(updated_at__gt=since).values_list('session_id', flat=True))
+    return session_ids
+
+
+def positive_sessions(samples):
+    """Сессии обучающей выборки с меткой аварии"""
+    return sorted(int(session_id) for session_id in samples.loc[samples['label'] == 1, 'id'])
+
+
+def risk_level_for(probability):
+    """Уровень риска по вероятности аварии"""
+    if probability < 0.3:
+        return "Низкий"
+    elif probability < 0.7:
+        return "Средний"
+    return "Высокий"
+
+
+class CableAIAnalyzer:
+    """Модель прогноза аварий.
+
+    Для прогноза используется скомпилированная копия модели из реестра, поэтому
+    scikit-learn импортируется только в методах обучения.
+    """
+
+    def __init__(self):
+        self.model = None
+        self.scaler = None
+        self.model_version = None
+        self.extra_features = []
+        self.training_info = None
+        self.model_path = registry.model_path
+        self.scaler_path = registry.scaler_path
+        self.load_model()
+
+    def prepare_training_data(self, extra_features=()):
+        """Подготовка данных для обучения модели"""
+        print("Сбор данных для обучения...")
+
+        features, labels = self.build_training_dataset(extra_features)
 
         print(f"Подготовлено образцов: {len(features)}")
         print(f"Аварии в данных: {sum(labels)}")
 
-        return np.array(features), np.array(labels)
+        return features, labels
+
+    def build_training_dataset(self, extra_features=()):
+        """Матрица признаков и метки обучающей выборки"""
+        samples, feature_columns = self.build_training_frame(extra_features)
+        if samples.empty:
+            return np.array([]), np.array([])
+        return samples[feature_columns].to_numpy(dtype=float), samples['label'].to_numpy(dtype=int)
+
+    def build_training_frame(self, extra_features=()):
+        """Сборка обучающей выборки несколькими массовыми запросами.
+
+        Кабели, сессии и аварии выбираются через values(), признаки сессий берутся
+        из хранилища признаков (feature_store), а метка аварии в течение ACCIDENT_HORIZON
+        назначается поиском ближайшей следующей аварии (merge_asof) по каждому кабелю.
+        Порядок образцов совпадает с обходом кабель -> сессии по дате.
+        Наборы extra_features добавляются после признаков сессии.
+        Возвращает DataFrame образцов (id сессии, признаки, метка) и список столбцов признаков.
+        """
+        cables = pd.DataFrame.from_records(
+            CableLine.objects.values('id', 'length', 'core_count', 'commissioning_date'),
+            columns=['id', 'length', 'core_count', 'commissioning_date'],
+        )
+        print(f"Найдено кабельных линий: {len(cables)}")
+
+        sessions = pd.DataFrame.from_records(
+            PDDMeasurementSession.objects.order_by('cable_line_id', 'session_date', 'pk').values(
+                'id', 'cable_line_id', 'session_date'),
+            columns=['id', 'cable_line_id', 'session_date'],
+        )
+        session_features = load_session_features()
+        if extra_features:
+            extra = extra_session_features(extra_features)
+            session_features = session_features.join(extra, how='left').fillna(0)
+
+        # Сессии без измерений в выборку не попадают
+        samples = sessions.merge(session_features, left_on='id', right_index=True, how='inner')
+        samples = samples.merge(cables, left_on='cable_line_id', right_on='id', suffixes=('', '_cable'))
+        feature_columns = ['length', 'core_count', 'age'] + list(session_features.columns)
+        if samples.empty:
+            return samples, feature_columns
+
+        today = timezone.now().date()
+        samples['age'] = [(today - commissioning_date).days for commissioning_date in samples['commissioning_date']]
+        samples['label'] = self._future_accident_labels(samples)
+
+        return samples, feature_columns
+
+    def _future_accident_labels(self, samples):
+        """Метки аварий в течение ACCIDENT_HORIZON после каждой сессии"""
+        accidents = pd.DataFrame.from_records(
+            Accident.objects.values('cable_line_id', 'accident_date'),
+            columns=['cable_line_id', 'accident_date'],
+        )
+        if accidents.empty:
+            return np.zeros(len(samples), dtype=int)
+
+        # Дата аварии в текущем часовом поясе, как при фильтре accident_date__date
+        accidents['accident_day'] = pd.to_datetime(
+            [timezone.localtime(accident_date).date() for accident_date in accidents['accident_date']]
+        )
+        left = pd.DataFrame({
+            'order': np.arange(len(samples)),
+            'cable_line_id': samples['cable_line_id'].to_numpy(),
+            'session_day': pd.to_datetime(samples['session_date']).to_numpy(),
+        }).sort_values('session_day')
+        right = accidents[['cable_line_id', 'accident_day']].sort_values('accident_day')
+
+        matched = pd.merge_asof(
+            left, right,
+            left_on='session_day', right_on='accident_day',
+            by='cable_line_id',
+            direction='forward',
+            tolerance=pd.Timedelta(ACCIDENT_HORIZON),
+        ).sort_values('order')
+
+        return matched['accident_day'].notna().to_numpy(dtype=int)
 
     def extract_features(self, cable, measurements):
         """Извлечение признаков из данных измерений"""
@@ -128,7 +261,7 @@ class CableAIAnalyzer:
 
     def check_future_accidents(self, cable, measurement_date):
         """Проверяет, были ли аварии в течение 90 дней после измерений"""
-        future_date = measurement_date + timedelta(days=90)
+        future_date = measurement_date + ACCIDENT_HORIZON
         accidents = Accident.objects.filter(
             cable_line=cable,
             accident_date__date__gte=measurement_date,
@@ -136,17 +269,79 @@ class CableAIAnalyzer:
         )
         return accidents.exists()
 
-    def train_model(self):
-        """Обучение модели"""
+    @staticmethod
+    def _report_progress(progress, percent, message):
+        """Передача хода обучения (процент, сообщение) вызывающему коду"""
+        if progress is not None:
+            progress(percent, message)
+
+    def train_model(self, progress=None, mode='auto'):
+        """Обучение модели (см. _train_model) с записью длительности и размера выборки в показатели"""
+        started = time.perf_counter()
+        trained = self._train_model(progress, mode)
+        info = self.training_info or {}
+        result_mode = info.get('mode', mode) if trained else 'failed'
+        training_duration.observe(time.perf_counter() - started, mode=result_mode)
+        if trained and info.get('sample_count') is not None:
+            training_samples.observe(info['sample_count'], mode=result_mode)
+        # Обучение выполняется в воркере редко, поэтому показатели записываются сразу
+        collector.write()
+        return trained
+
+    def _train_model(self, progress=None, mode='auto'):
+        """Обучение модели.
+
+        mode='full' — полное переобучение на всей истории, 'incremental' — дообучение
+        только на сессиях, добавленных или изменивших метку после прошлого обучения,
+        'auto' — дообучение, если оно возможно, иначе полное переобучение,
+        'search' — подбор гиперпараметров с проверкой во времени (train_search).
+        """
         print("Начинаем обучение модели ИИ...")
 
-        features, labels = self.prepare_training_data()
+        # Дообучение и сравнение моделей выполняются на исходной модели scikit-learn
+        self.load_estimators()
 
-        if len(features) < 5:
-            print(f"Недостаточно данных для обучения. Нужно минимум 5 образцов, доступно: {len(features)}")
+        self._report_progress(progress, 5, "Сбор данных для обучения")
+        extra_features = configured_extra_features()
+        print("Сбор данных для обучения...")
+        samples, feature_columns = self.build_training_frame(extra_features)
+        # Отметка данных берётся после сборки выборки, чтобы векторы признаков, рассчитанные
+        # при самой сборке, не считались изменёнными; сессии, созданные во время сборки,
+        # найдутся по id больше максимального в выборке
+        watermark = timezone.now()
+        print(f"Подготовлено образцов: {len(samples)}")
+        print(f"Аварии в данных: {int(samples['label'].sum()) if not samples.empty else 0}")
+
+        if len(samples) < 5:
+            print(f"Недостаточно данных для обучения. Нужно минимум 5 образцов, доступно: {len(samples)}")
             return False
 
-        # Масштабирование признаков
+        if mode == 'search':
+            return self.train_search(samples, feature_columns, extra_features, watermark, progress)
+
+        if mode != 'full':
+            reason = self.incremental_blocker(extra_features, feature_columns)
+            if reason is None:
+                trained = self.train_incremental(samples, feature_columns, watermark, progress)
+                if trained:
+                    return True
+                reason = "в новых данных нет обоих классов"
+            print(f"Дообучение невозможно ({reason}), выполняется полное обучение")
+
+        return self.train_full(samples, feature_columns, extra_features, watermark, progress)
+
+    def train_full(self, samples, feature_columns, extra_features, watermark, progress=None):
+        """Полное обучение новой модели на всей выборке"""
+        from sklearn.metrics import accuracy_score, classification_report
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+        from .model_selection import build_model
+
+        features = samples[feature_columns].to_numpy(dtype=float)
+        labels = samples['label'].to_numpy(dtype=int)
+
+        # Масштабирование признаков (новый масштабатор: загруженный общий для всех запросов процесса)
+        self.scaler = StandardScaler()
         features_scaled = self.scaler.fit_transform(features)
 
         # Для маленьких наборов данных используем другую стратегию
@@ -165,13 +360,11 @@ class CableAIAnalyzer:
             print(f"Разделение данных: {len(X_train)} train, {len(X_test)} test")
 
         # Обучение модели
-        self.model = RandomForestClassifier(
-            n_estimators=50,  # Уменьшаем для маленьких наборов данных
-            max_depth=5,
-            random_state=42,
-            min_samples_split=2,
-            min_samples_leaf=1
-        )
+        self._report_progress(progress, 40, f"Обучение модели на {len(X_train)} образцах")
+        parent_version = self.model_version
+        params = self.model_params()
+        self.extra_features = extra_features
+        self.model = build_model(params)
 
         self.model.fit(X_train, y_train)
 
@@ -184,71 +377,406 @@ class CableAIAnalyzer:
             print("Отчет классификации:")
             print(classification_report(y_test, y_pred))
 
+        self.training_info = {
+            'mode': 'full',
+            'parent_version': parent_version,
+            'watermark': watermark.isoformat(),
+            'max_session_id': int(samples['id'].max()),
+            'sample_count': len(samples),
+            'trained_sample_count': len(X_train),
+            'new_sample_count': len(samples),
+            'updates_since_full': 0,
+            'positive_sessions': positive_sessions(samples),
+            'params': params,
+        }
+
         # Сохранение модели
+        self._report_progress(progress, 80, "Сохранение модели и пересчёт оценок риска")
         self.save_model()
 
         return True
 
+    @staticmethod
+    def model_params():
+        """Гиперпараметры для полного обучения: последние подобранные или параметры по умолчанию"""
+        from .model_selection import DEFAULT_MODEL_PARAMS
+        return registry.metadata().get('training', {}).get('params') or dict(DEFAULT_MODEL_PARAMS)
+
+    def train_search(self, samples, feature_columns, extra_features, watermark, progress=None):
+        """Подбор гиперпараметров с проверкой во времени и обучение лучшей модели.
+
+        Кандидаты оцениваются на разбиениях time_series_folds (обучение на прошлом,
+        проверка на следующем периоде) в пуле процессов с ограничением по времени.
+        Параметры текущей модели входят в число кандидатов; лучший кандидат публикуется,
+        только если его ROC-AUC на тех же блоках выше, чем у параметров текущей модели.
+        Иначе текущая модель остаётся, а в training_info записывается режим 'rejected'.
+        """
+        from sklearn.preprocessing import StandardScaler
+        from .model_selection import build_model, search_candidates, search_parameters, time_series_folds
+
+        features = samples[feature_columns].to_numpy(dtype=float)
+        labels = samples['label'].to_numpy(dtype=int)
+
+        folds = time_series_folds(samples['session_date'], labels, gap=ACCIDENT_HORIZON)
+        if not folds:
+            print("Недостаточно данных для проверки во времени, выполняется полное обучение")
+            return self.train_full(samples, feature_columns, extra_features, watermark, progress)
+
+        current_params = self.comparable_params(feature_columns, extra_features)
+        candidates = search_candidates(current_params or registry.metadata().get('training', {}).get('params'))
+        print(f"Подбор параметров: кандидатов {len(candidates)}, проверочных блоков {len(folds)}")
+        self._report_progress(progress, 10, f"Подбор параметров: {len(candidates)} кандидатов")
+
+        def search_progress(done, total):
+            self._report_progress(progress, 10 + 60 * done // total, f"Оценено кандидатов: {done} из {total}")
+
+        results, budget_exhausted = search_parameters(features, labels, folds, candidates, progress=search_progress)
+        if not results:
+            print("Бюджет времени подбора исчерпан до оценки первого кандидата, выполняется полное обучение")
+            return self.train_full(samples, feature_columns, extra_features, watermark, progress)
+
+        best = results[0]
+        print(f"Лучшие параметры: {best['params']}, ROC-AUC {best['roc_auc']:.3f}, "
+              f"точность {best['precision']:.2f}, полнота {best['recall']:.2f}")
+
+        # Сравнение с параметрами текущей модели по тем же проверочным блокам
+        current = next((result for result in results if result['params'] == current_params), None)
+        evaluation = {
+            'roc_auc': best['roc_auc'],
+            'fold_roc_auc': best['fold_roc_auc'],
+            'precision': best['precision'],
+            'recall': best['recall'],
+            'folds': len(folds),
+            'candidates': len(candidates),
+            'candidates_evaluated': len(results),
+            'budget_exhausted': budget_exhausted,
+            'current_roc_auc': current['roc_auc'] if current is not None else None,
+        }
+
+        if current is not None and best['roc_auc'] <= current['roc_auc']:
+            print(f"Новая модель не лучше текущей (ROC-AUC {best['roc_auc']:.3f} против {current['roc_auc']:.3f}), "
+                  f"оставлена текущая модель")
+            self.training_info = {'mode': 'rejected', 'params': best['params'], 'evaluation': evaluation}
+            return True
+
+        # Лучшая модель обучается на всей выборке
+        self._report_progress(progress, 75, f"Обучение лучшей модели на {len(samples)} образцах")
+        parent_version = self.model_version
+        self.extra_features = extra_features
+        self.scaler = StandardScaler()
+        self.model = build_model(best['params'], n_jobs=-1)
+        self.model.fit(self.scaler.fit_transform(features), labels)
+        # В веб-процессах прогноз выполняется в одном потоке
+        self.model.set_params(n_jobs=None)
+
+        self.training_info = {
+            'mode': 'search',
+            'parent_version': parent_version,
+            'watermark': watermark.isoformat(),
+            'max_session_id': int(samples['id'].max()),
+            'sample_count': len(samples),
+            'trained_sample_count': len(samples),
+            'new_sample_count': len(samples),
+            'updates_since_full': 0,
+            'positive_sessions': positive_sessions(samples),
+            'params': best['params'],
+            'evaluation': evaluation,
+        }
+
+        self._report_progress(progress, 80, "Сохранение модели и пересчёт оценок риска")
+        self.save_model()
+        return True
+
+    def comparable_params(self, feature_columns, extra_features):
+        """Гиперпараметры текущей модели, если с ней можно сравнить кандидатов подбора (иначе None)"""
+        if self.model is None or len(getattr(self.model, 'classes_', ())) < 2:
+            return None
+        # Модель на демонстрационных данных заменяется без сравнения
+        metadata = registry.metadata()
+        if metadata.get('version') == self.model_version and metadata.get('training', {}).get('mode') == 'synthetic':
+            return None
+        if list(extra_features) != list(self.extra_features) or self.scaler.n_features_in_ != len(feature_columns):
+            return None
+        return self.model_params()
+
+    def incremental_blocker(self, extra_features, feature_columns):
+        """Причина, по которой дообучение текущей модели невозможно (None, если возможно)"""
+        from sklearn.ensemble import RandomForestClassifier
+
+        if self.model is None:
+            return "модель ещё не обучена"
+        if not isinstance(self.model, RandomForestClassifier):
+            return "модель не поддерживает дообучение"
+
+        metadata = registry.metadata()
+        info = metadata.get('training') or {}
+        if metadata.get('version') != self.model_version or info.get('mode') not in ('full', 'search', 'incremental'):
+            return "нет сведений о данных текущей модели"
+        if list(extra_features) != list(self.extra_features) or self.scaler.n_features_in_ != len(feature_columns):
+            return "изменился набор признаков"
+        if info.get('updates_since_full', 0) >= FULL_REBUILD_EVERY:
+            return "плановое полное переобучение"
+        base_trained_at = info.get('base_trained_at')
+        if base_trained_at and timezone.now() - datetime.fromisoformat(base_trained_at) > FULL_REBUILD_MAX_AGE:
+            return "плановое полное переобучение"
+        if self.model.n_estimators + INCREMENTAL_TREES > MAX_ENSEMBLE_TREES:
+            return "ансамбль достиг максимального размера"
+        return None
+
+    def train_incremental(self, samples, feature_columns, watermark, progress=None):
+        """Дообучение: новые деревья ансамбля обучаются на изменившихся данных.
+
+        В обучение попадают сессии, добавленные или с пересчитанными признаками после
+        отметки прошлого обучения, и сессии, у которых изменилась метка аварии,
+        плюс случайная выборка прежних сессий (INCREMENTAL_REPLAY_RATIO), чтобы новые
+        деревья не забывали старые данные. Масштабатор не меняется.
+        Возвращает False, если на этих данных дообучить нельзя.
+        """
+        from sklearn.metrics import accuracy_score
+
+        info = registry.metadata()['training']
+        since = datetime.fromisoformat(info['watermark'])
+
+        changed = changed_session_ids(since, info.get('max_session_id'))
+        previous_positive = set(info.get('positive_sessions', []))
+        current_positive = set(positive_sessions(samples))
+        relabeled = previous_positive ^ current_positive
+
+        is_new = samples['id'].isin(changed | relabeled).to_numpy()
+        new_samples = samples[is_new]
+        if new_samples.empty:
+            print("Новых или изменённых данных с прошлого обучения нет, модель не изменилась")
+            self.training_info = {'mode': 'unchanged', 'new_sample_count': 0}
+            return True
+
+        # Прежние сессии берутся пропорционально классам, но не меньше одной каждого класса,
+        # чтобы и небольшое пополнение данных можно было дообучить
+        rest = samples[~is_new]
+        replay_count = min(len(rest), int(np.ceil(len(new_samples) * INCREMENTAL_REPLAY_RATIO)))
+        replay = [
+            group.sample(n=min(len(group), max(1, round(replay_count * len(group) / len(rest)))), random_state=42)
+            for _, group in rest.groupby('label')
+        ]
+        subset = pd.concat([new_samples] + replay)
+        replay_count = len(subset) - len(new_samples)
+        labels = subset['label'].to_numpy(dtype=int)
+        if len(set(labels)) < 2:
+            return False
+
+        self._report_progress(progress, 40, f"Дообучение на {len(new_samples)} новых и изменённых образцах")
+        print(f"Дообучение: новых и изменённых образцов {len(new_samples)}, повторно использовано {replay_count}")
+
+        # Общая модель процесса не изменяется на месте: дообучается её копия
+        model = copy.deepcopy(self.model)
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + INCREMENTAL_TREES)
+        model.fit(self.scaler.transform(subset[feature_columns].to_numpy(dtype=float)), labels)
+        model.set_params(warm_start=False)
+
+        features_new = self.scaler.transform(new_samples[feature_columns].to_numpy(dtype=float))
+        accuracy = accuracy_score(new_samples['label'].to_numpy(dtype=int), model.predict(features_new))
+        print(f"Точность на новых данных: {accuracy:.2f}, деревьев в ансамбле: {model.n_estimators}")
+
+        parent_version = self.model_version
+        self.model = model
+        self.training_info = {
+            'mode': 'incremental',
+            'parent_version': parent_version,
+            'base_version': info.get('base_version'),
+            'base_trained_at': info.get('base_trained_at'),
+            'watermark': watermark.isoformat(),
+            'max_session_id': int(samples['id'].max()),
+            'sample_count': len(samples),
+            'trained_sample_count': len(subset),
+            'new_sample_count': len(new_samples),
+            'updates_since_full': info.get('updates_since_full', 0) + 1,
+            'positive_sessions': sorted(current_positive),
+            'params': info.get('params'),
+        }
+
+        self._report_progress(progress, 80, "Сохранение модели и пересчёт оценок риска")
+        self.save_model()
+        return True
+
     def predict_risk(self, cable_line):
         """Прогнозирование риска аварии для конкретной кабельной линии"""
-        if self.model is None:
-            return "Модель не обучена", 0
+        with predict_latency.time(operation='single'):
+            _, risk_level, probability = self._predict_risk_batch(CableLine.objects.filter(pk=cable_line.pk))[0]
+        return risk_level, probability
 
-        # Получаем последние измерения
+    def predict_risk_batch(self, cable_lines):
+        """Пакетное прогнозирование риска (см. _predict_risk_batch) с записью времени и размера пакета"""
+        with predict_latency.time(operation='batch'):
+            results = self._predict_risk_batch(cable_lines)
+        predict_rows.observe(len(results))
+        return results
+
+    def _predict_risk_batch(self, cable_lines):
+        """Пакетное прогнозирование риска аварии для набора кабельных линий.
+
+        Последние сессии и их векторы признаков из хранилища выбираются фиксированным
+        числом запросов, признаки собираются в одну матрицу и оцениваются одним вызовом predict_proba.
+        Возвращает список кортежей (кабельная линия, уровень риска, вероятность)
+        в порядке исходного набора.
+        """
         latest_session = PDDMeasurementSession.objects.filter(
-            cable_line=cable_line
-        ).order_by('-session_date').first()
+            cable_line=OuterRef('pk')
+        ).order_by('-session_date', '-pk').values('pk')[:1]
 
-        if not latest_session:
-            return "Нет данных измерений", 0
+        cables = list(cable_lines.annotate(latest_session_id=Subquery(latest_session)))
 
-        measurements = SinglePDMeasurement.objects.filter(session=latest_session)
+        if self.model is None:
+            return [(cable, "Модель не обучена", 0) for cable in cables]
+
+        session_ids = [cable.latest_session_id for cable in cables if cable.latest_session_id]
+        session_features = load_session_features(session_ids)
+        extra = extra_session_features(self.extra_features, session_ids)
+
+        today = timezone.now().date()
+        scored_cables = []
+        feature_matrix = []
+        for cable in cables:
+            if cable.latest_session_id not in session_features.index:
+                continue
+            scored_cables.append(cable)
+            feature_matrix.append(
+                [cable.length, cable.core_count, (today - cable.commissioning_date).days]
+                + session_features.loc[cable.latest_session_id].tolist()
+                + extra.loc[cable.latest_session_id].tolist()
+            )
 
-        if not measurements:
-            return "Нет данных измерений", 0
+        probabilities = {}
+        prediction_failed = False
+        if feature_matrix:
+            try:
+                features_scaled = self.scaler.transform(np.array(feature_matrix))
+                predicted = self.model.predict_proba(features_scaled)[:, 1]
+                probabilities = {cable.pk: probability for cable, probability in zip(scored_cables, predicted)}
+            except Exception as e:
+                print(f"Ошибка пакетного предсказания: {e}")
+                prediction_failed = True
+
+        results = []
+        for cable in cables:
+            if cable.pk in probabilities:
+                probability = probabilities[cable.pk]
+                results.append((cable, risk_level_for(probability), probability))
+            elif prediction_failed and cable.latest_session_id in session_features.index:
+                results.append((cable, "Ошибка предсказания", 0))
+            else:
+                results.append((cable, "Нет данных измерений", 0))
+
+        return results
+
+    def update_risk_scores(self, cable_lines):
+        """Пересчёт и сохранение оценок риска для набора кабельных линий"""
+        if self.model is None:
+            # Без модели оценок нет: прежние оценки линий удаляются, новые не сохраняются
+            with transaction.atomic():
+                stale = CableRiskScore.objects.filter(cable_line__in=cable_lines)
+                enterprise_ids = set(stale.values_list('cable_line__enterprise_id', flat=True))
+                if enterprise_ids:
+                    stale.delete()
+                    invalidate_enterprises(enterprise_ids)
+            return []
 
-        # Извлекаем признаки
-        feature_vector = self.extract_features(cable_line, measurements)
+        scored_at = timezone.now()
+        scores = [
+            CableRiskScore(
+                cable_line=cable,
+                risk_level=risk_level,
+                probability=float(probability),
+                model_version=self.model_version or '',
+                scored_at=scored_at,
+            )
+            for cable, risk_level, probability in self.predict_risk_batch(cable_lines)
+        ]
 
-        if feature_vector is None:
-            return "Ошибка извлечения признаков", 0
+        if not scores:
+            return scores
 
-        # Масштабируем и предсказываем
-        try:
-            feature_vector_scaled = self.scaler.transform([feature_vector])
-            probability = self.model.predict_proba(feature_vector_scaled)[0][1]
-        except Exception as e:
-            print(f"Ошибка предсказания: {e}")
-            return "Ошибка предсказания", 0
-
-        # Определяем уровень риска
-        if probability < 0.3:
-            risk_level = "Низкий"
-        elif probability < 0.7:
-            risk_level = "Средний"
-        else:
-            risk_level = "Высокий"
+        with transaction.atomic():
+            CableRiskScore.objects.filter(cable_line__in=[score.cable_line for score in scores]).delete()
+            CableRiskScore.objects.bulk_create(scores)
+            # Оценки пишутся без сигналов моделей, поэтому кэш страниц предприятий сбрасывается явно
+            invalidate_enterprises({score.cable_line.enterprise_id for score in scores})
 
-        return risk_level, probability
+        return scores
+
+    def rescore_all(self, batch_size=RESCORE_BATCH_SIZE):
+        """Полный пересчёт оценок риска по всем кабельным линиям пакетами"""
+        cable_ids = list(CableLine.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(cable_ids), batch_size):
+            self.update_risk_scores(CableLine.objects.filter(pk__in=cable_ids[start:start + batch_size]))
+        print(f"Оценки риска пересчитаны: {len(cable_ids)}")
 
     def save_model(self):
         """Сохранение обученной модели"""
         if self.model is not None:
-            joblib.dump(self.model, self.model_path)
-            joblib.dump(self.scaler, self.scaler_path)
+            trained_at = timezone.now()
+            self.model_version = trained_at.strftime('%Y%m%d%H%M%S%f')
+
+            # Какие данные видела эта версия: отметка данных, режим обучения и цепочка версий
+            training = dict(self.training_info or {'mode': 'full'})
+            if training['mode'] != 'incremental':
+                training['base_version'] = self.model_version
+                training['base_trained_at'] = trained_at.isoformat()
+
+            atomic_dump(self.model, self.model_path)
+            atomic_dump(self.scaler, self.scaler_path)
+            # Копия для прогноза без scikit-learn записывается до метаданных: реестр
+            # использует её, только когда её версия совпадает с версией в метаданных
+            save_compiled_model(self.model, self.scaler, self.model_version, registry.compiled_path)
+            atomic_write_json({
+                'version': self.model_version,
+                'trained_at': trained_at.isoformat(),
+                'extra_features': list(self.extra_features),
+                'training': training,
+            }, registry.metadata_path)
+            compiled_model, compiled_scaler, _ = load_compiled_model(registry.compiled_path)
+            registry.publish(compiled_model, compiled_scaler, self.model_version, self.extra_features)
+            self.record_version(trained_at, training)
             print("Модель сохранена")
 
+            # Новая модель: пересчитываем сохранённые оценки риска всего парка
+            self.rescore_all()
+
+    def record_version(self, trained_at, training):
+        """Запись версии модели и данных, на которых она обучена"""
+        watermark = training.get('watermark')
+        evaluation = training.get('evaluation') or {}
+        ModelVersion.objects.create(
+            version=self.model_version,
+            mode=training['mode'],
+            parent_version=training.get('parent_version') or '',
+            base_version=training.get('base_version') or '',
+            trained_at=trained_at,
+            data_watermark=datetime.fromisoformat(watermark) if watermark else None,
+            sample_count=training.get('sample_count', 0),
+            trained_sample_count=training.get('trained_sample_count', 0),
+            new_sample_count=training.get('new_sample_count', 0),
+            tree_count=getattr(self.model, 'n_estimators', 0),
+            extra_features=','.join(self.extra_features),
+            roc_auc=evaluation.get('roc_auc'),
+            precision=evaluation.get('precision'),
+            recall=evaluation.get('recall'),
+        )
+
     def load_model(self):
-        """Загрузка обученной модели"""
-        try:
-            if os.path.exists(self.model_path) and os.path.exists(self.scaler_path):
-                self.model = joblib.load(self.model_path)
-                self.scaler = joblib.load(self.scaler_path)
-                print("Модель загружена")
-        except Exception as e:
-            print(f"Ошибка загрузки модели: {e}")
+        """Загрузка обученной модели из общего реестра процесса"""
+        loaded = registry.get()
+        if loaded is not None:
+            self.model, self.scaler, self.model_version, self.extra_features = loaded
+        else:
             self.model = None
 
+    def load_estimators(self):
+        """Замена скомпилированной модели исходными моделью и масштабатором scikit-learn"""
+        if self.model is None:
+            return
+        estimators = registry.estimators(self.model_version)
+        if estimators is not None:
+            self.model, self.scaler = estimators
+
     def get_feature_importance(self):
         """Получение важности признаков"""
         if self.model is None:
@@ -266,6 +794,9 @@ class CableAIAnalyzer:
             'Максимальное расстояние жила 3',
             'Количество измерений'
         ]
+        for name in self.extra_features:
+            columns, _, labels = EXTRA_FEATURE_SETS[name]
+            feature_names.extend(labels[column] for column in columns)
 
         importances = self.model.feature_importances_
         return list(zip(feature_names, importances))
@@ -309,13 +840,27 @@ class CableAIAnalyzer:
 
         return np.array(features), np.array(labels)
 
-    def train_with_synthetic_data(self):
+    def train_with_synthetic_data(self, progress=None):
         """Обучение на синтетических данных для демонстрации"""
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
+
         print("Обучение на синтетических данных...")
+        self._report_progress(progress, 40, "Обучение на демонстрационных данных")
 
         features, labels = self.generate_synthetic_data(50)
 
+        # Синтетические данные содержат только базовые признаки
+        self.extra_features = []
+        self.training_info = {
+            'mode': 'synthetic',
+            'parent_version': self.model_version,
+            'sample_count': len(features),
+            'trained_sample_count': len(features),
+        }
+
         # Масштабирование признаков
+        self.scaler = StandardScaler()
         features_scaled = self.scaler.fit_transform(features)
 
         # Обучение модели
@@ -328,6 +873,7 @@ class CableAIAnalyzer:
         self.model.fit(features_scaled, labels)
 
         # Сохранение модели
+        self._report_progress(progress, 80, "Сохранение модели и пересчёт оценок риска")
         self.save_model()
 
         print("Модель обучена на синтетических данных")
@@ -6,13 +6,8 @@ class CableManagerConfig(AppConfig):
     name = 'cable_manager'
 
     def ready(self):
-        # Автоматическое обучение модели при запуске сервера
-        try:
-            from .ai_analyzer import CableAIAnalyzer
-            analyzer = CableAIAnalyzer()
-            if analyzer.model is None:
-                print("Попытка автоматического обучения ИИ-модели...")
-                # Не будем автоматически обучать на синтетических данных
-                # Пользователь сам решит, когда обучать модель
-        except Exception as e:
-            print(f"Ошибка при инициализации ИИ: {e}")
\ No newline at end of file
+        from . import signals  # noqa: F401
+
+        # Модель ИИ загружается в общий реестр процесса при первом обращении к ней, а не при
+        # запуске: migrate, тесты и воркеры без ИИ-запросов не загружают numpy, pandas и модель.
+        # Для gunicorn --preload загрузку в мастер-процессе включает CABLE_PRELOAD=1 (cable_site/wsgi.py)
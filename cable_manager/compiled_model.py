@@ -0,0 +1,148 @@
+import os
+
+import numpy as np
+
+
+# Версия формата файла скомпилированной модели
+COMPILED_FORMAT_VERSION = 1
+
+# Размер пакета строк при обходе деревьев (ограничивает память на матрицу узлов строки × деревья)
+PREDICT_BATCH_SIZE = 4096
+
+
+class CompiledScaler:
+    """Масштабатор признаков (StandardScaler) в виде массивов NumPy"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+        self.n_features_in_ = len(mean)
+
+    def transform(self, features):
+        # Те же операции, что и у StandardScaler.transform, поэтому результат совпадает побитово
+        features = np.array(features, dtype=np.float64)
+        features -= self.mean_
+        features /= self.scale_
+        return features
+
+
+class CompiledForest:
+    """Случайный лес классификации в виде плоских массивов NumPy.
+
+    Узлы всех деревьев лежат подряд: признак и порог разбиения, номера дочерних
+    узлов (-1 у листа) и вероятности классов в листьях; roots — корни деревьев.
+    predict_proba обходит все деревья для пакета строк одновременно (один шаг
+    на уровень глубины) и усредняет вероятности листьев в порядке деревьев, как
+    RandomForestClassifier, поэтому вероятности совпадают с исходной моделью.
+    max_depth сохраняется для справки: обход идёт, пока все пары не дойдут до листьев.
+    """
+
+    def __init__(self, feature, threshold, children_left, children_right, value, roots, max_depth,
+                 classes, feature_importances):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.feature_importances_ = feature_importances
+        self.n_estimators = len(roots)
+        self.n_features_in_ = len(feature_importances)
+
+    def apply(self, features):
+        """Номера листьев для каждой строки (строки × деревья)"""
+        # Деревья scikit-learn сравнивают признаки, приведённые к float32, с порогами float64
+        features = np.asarray(features, dtype=np.float32)
+        tree_count = len(self.roots)
+        nodes = np.tile(self.roots, len(features))
+        # На каждом шаге спускаются на уровень только пары (строка, дерево), ещё не дошедшие до листа
+        active = np.flatnonzero(self.children_left[nodes] >= 0)
+        while active.size:
+            current = nodes[active]
+            go_left = features[active // tree_count, self.feature[current]] <= self.threshold[current]
+            following = np.where(go_left, self.children_left[current], self.children_right[current])
+            nodes[active] = following
+            active = active[self.children_left[following] >= 0]
+        return nodes.reshape(len(features), tree_count)
+
+    def predict_proba(self, features):
+        features = np.asarray(features)
+        probabilities = np.zeros((len(features), len(self.classes_)), dtype=np.float64)
+        for start in range(0, len(features), PREDICT_BATCH_SIZE):
+            leaves = self.apply(features[start:start + PREDICT_BATCH_SIZE])
+            batch = probabilities[start:start + PREDICT_BATCH_SIZE]
+            for tree in range(self.n_estimators):
+                batch += self.value[leaves[:, tree]]
+        probabilities /= self.n_estimators
+        return probabilities
+
+    def predict(self, features):
+        return self.classes_[np.argmax(self.predict_proba(features), axis=1)]
+
+
+def leaf_probabilities(estimator):
+    """Вероятности классов в узлах дерева так, как их возвращает DecisionTreeClassifier.predict_proba.
+
+    До scikit-learn 1.4 в tree_.value хранятся взвешенные количества, которые predict_proba
+    нормирует; начиная с 1.4 там уже хранятся доли и нормировка не выполняется.
+    """
+    from sklearn import __version__ as sklearn_version
+    from sklearn.utils.fixes import parse_version
+
+    value = estimator.tree_.value[:, 0, :estimator.n_classes_].astype(np.float64)
+    if parse_version(sklearn_version) < parse_version('1.4'):
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        value /= normalizer
+    return value
+
+
+def compile_model(model, scaler):
+    """Массивы скомпилированной модели (для save_compiled_model) по RandomForestClassifier и StandardScaler"""
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    offsets = np.concatenate([[0], np.cumsum([tree.node_count for tree in trees])[:-1]]).astype(np.int64)
+
+    def children(values, offset):
+        return np.where(values >= 0, values + offset, -1)
+
+    n_features = model.n_features_in_
+    return {
+        'format_version': np.array(COMPILED_FORMAT_VERSION),
+        # У листьев признак заменяется на 0, чтобы индексирование при обходе оставалось корректным
+        'feature': np.concatenate([np.maximum(tree.feature, 0) for tree in trees]).astype(np.int32),
+        'threshold': np.concatenate([tree.threshold for tree in trees]).astype(np.float64),
+        'children_left': np.concatenate([children(tree.children_left, o) for tree, o in zip(trees, offsets)]),
+        'children_right': np.concatenate([children(tree.children_right, o) for tree, o in zip(trees, offsets)]),
+        'value': np.concatenate([leaf_probabilities(estimator) for estimator in model.estimators_]),
+        'roots': offsets,
+        'max_depth': np.array(max(tree.max_depth for tree in trees)),
+        'classes': np.asarray(model.classes_),
+        'feature_importances': np.asarray(model.feature_importances_, dtype=np.float64),
+        'mean': np.zeros(n_features) if scaler.mean_ is None else np.asarray(scaler.mean_, dtype=np.float64),
+        'scale': np.ones(n_features) if scaler.scale_ is None else np.asarray(scaler.scale_, dtype=np.float64),
+    }
+
+
+def save_compiled_model(model, scaler, version, path):
+    """Атомарное сохранение скомпилированной модели и масштабатора в .npz"""
+    arrays = compile_model(model, scaler)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, version=np.array(str(version)), **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_compiled_model(path):
+    """Загрузка скомпилированной модели: (CompiledForest, CompiledScaler, версия)"""
+    with np.load(path, allow_pickle=False) as data:
+        if int(data['format_version']) != COMPILED_FORMAT_VERSION:
+            raise ValueError(f"неподдерживаемая версия формата {int(data['format_version'])}")
+        forest = CompiledForest(
+            data['feature'], data['threshold'], data['children_left'], data['children_right'], data['value'],
+            data['roots'], data['max_depth'], data['classes'], data['feature_importances'],
+        )
+        scaler = CompiledScaler(data['mean'], data['scale'])
+        version = str(data['version'])
+    return forest, scaler, version
@@ -0,0 +1,89 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections
+from django.db.backends.signals import connection_created
+
+
+# Потоки для запросов к базе из асинхронных представлений и для расчёта оценок риска моделью.
+# 0 — выполнять в общем потоке синхронного кода (как асинхронный ORM Django): без параллельности,
+# но в том же соединении с базой, что и синхронный код (нужно тестам в транзакции TestCase)
+QUERY_WORKERS = getattr(settings, 'CABLE_ASYNC_QUERY_WORKERS', 8)
+SCORING_WORKERS = getattr(settings, 'CABLE_SCORING_WORKERS', 2)
+
+# Сколько секунд поток пула держит одно соединение с базой (None — без ограничения)
+POOL_CONN_MAX_AGE = getattr(settings, 'CABLE_POOL_CONN_MAX_AGE', 60)
+
+_executors = {}
+_executors_lock = threading.Lock()
+_pool_thread = threading.local()
+
+
+def mark_pool_thread():
+    _pool_thread.active = True
+
+
+def keep_pool_connection(sender, connection, **kwargs):
+    # Поток пула живёт весь процесс: его соединение переиспользуется задачами до POOL_CONN_MAX_AGE,
+    # а не закрывается после каждой задачи по CONN_MAX_AGE запросов (по умолчанию 0)
+    if getattr(_pool_thread, 'active', False):
+        connection.close_at = None if POOL_CONN_MAX_AGE is None else time.monotonic() + POOL_CONN_MAX_AGE
+
+
+connection_created.connect(keep_pool_connection, dispatch_uid='cable_pool_connection')
+
+
+def executor(name, workers):
+    """Пул потоков процесса (создаётся при первом обращении)"""
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'cable-{name}',
+                                                  initializer=mark_pool_thread)
+        return _executors[name]
+
+
+def call_in_pool_thread(func, args, kwargs):
+    # Соединение потока пула закрывается только после ошибки или по истечении POOL_CONN_MAX_AGE
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_pool(name, workers, func, *args, **kwargs):
+    if not workers:
+        return await sync_to_async(func)(*args, **kwargs)
+    # Контекст (в том числе счётчик запросов профилирования) передаётся в поток пула
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        executor(name, workers),
+        functools.partial(context.run, call_in_pool_thread, func, args, kwargs),
+    )
+
+
+async def run_query(func, *args, **kwargs):
+    """Синхронный код с обращениями к базе (ORM, кэш, шаблоны) в пуле потоков запросов"""
+    return await run_in_pool('query', QUERY_WORKERS, func, *args, **kwargs)
+
+
+async def run_scoring(func, *args, **kwargs):
+    """Расчёт оценок риска моделью в отдельном ограниченном пуле, чтобы он не занимал потоки запросов"""
+    return await run_in_pool('scoring', SCORING_WORKERS, func, *args, **kwargs)
+
+
+def async_login_required(view):
+    """login_required для асинхронных представлений (декоратор Django 4.2 их не поддерживает)"""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from .models import PDDMeasurementSession, SinglePDMeasurement, SessionFeatureVector, PDTrace
+from .pd_traces import trace_measurement_rows
+
+
+# Версия схемы сохранённых векторов: увеличивается при любом изменении состава признаков
+FEATURE_SCHEMA_VERSION = 1
+
+# Поля измерений ЧР, участвующие в расчёте признаков
+MEASUREMENT_FIELDS = [
+    'voltage_level',
+    'core_1_discharge', 'core_1_distance',
+    'core_2_discharge', 'core_2_distance',
+    'core_3_discharge', 'core_3_distance',
+]
+
+CORE_FIELDS = [
+    ('core_1_discharge', 'core_1_distance'),
+    ('core_2_discharge', 'core_2_distance'),
+    ('core_3_discharge', 'core_3_distance'),
+]
+
+# Признаки сессии в порядке CableAIAnalyzer.extract_features (после трёх параметров кабеля).
+# Параметры кабеля в векторе не хранятся: возраст меняется каждый день, а длина и число жил
+# могут быть исправлены в карточке линии, поэтому они подставляются при чтении.
+SESSION_FEATURE_COLUMNS = (
+    ['voltage_mean', 'voltage_max', 'voltage_min', 'voltage_std']
+    + [f'{field}_{stat}'
+       for discharge_field, distance_field in CORE_FIELDS
+       for field in (discharge_field, distance_field)
+       for stat in ('mean', 'max')]
+    + ['measurement_count']
+)
+
+VECTOR_DTYPE = np.dtype('<f8')
+
+REBUILD_BATCH_SIZE = 5000
+
+
+def measurement_features(rows):
+    """Векторизованный расчёт признаков измерений по сессиям.
+
+    Принимает строки SinglePDMeasurement в виде словарей (session_id + MEASUREMENT_FIELDS)
+    и возвращает DataFrame, индексированный по session_id, с теми же 17 признаками
+    измерений, что и CableAIAnalyzer.extract_features (без трёх параметров кабеля).
+    """
+    df = pd.DataFrame.from_records(list(rows), columns=['session_id'] + MEASUREMENT_FIELDS)
+    df[MEASUREMENT_FIELDS] = df[MEASUREMENT_FIELDS].astype(float)
+
+    grouped = df.groupby('session_id')
+    voltages = grouped['voltage_level']
+    result = pd.DataFrame({
+        'voltage_mean': voltages.mean(),
+        'voltage_max': voltages.max(),
+        'voltage_min': voltages.min(),
+        'voltage_std': voltages.std(ddof=0),
+    })
+
+    for discharge_field, distance_field in CORE_FIELDS:
+        for field in (discharge_field, distance_field):
+            # Как и в extract_features, пустые и нулевые значения не учитываются
+            values = df[field].where(df[field].fillna(0) != 0)
+            values_grouped = values.groupby(df['session_id'])
+            result[f'{field}_mean'] = values_grouped.mean()
+            result[f'{field}_max'] = values_grouped.max()
+
+    result['measurement_count'] = grouped.size()
+
+    return result[SESSION_FEATURE_COLUMNS].fillna(0)
+
+
+def session_features(measurements, traces):
+    """Признаки сессий по измерениям и трассам ЧР.
+
+    Для сессий с записанными трассами строки измерений строятся по трассам
+    (trace_measurement_rows) и заменяют введённые вручную значения.
+    """
+    rows = trace_measurement_rows(traces)
+    traced = {row['session_id'] for row in rows}
+    if traced:
+        measurements = measurements.exclude(session_id__in=traced)
+    rows.extend(measurements.values('session_id', *MEASUREMENT_FIELDS))
+    return measurement_features(rows)
+
+
+def store_session_features(frame):
+    """Сохранение рассчитанных признаков сессий в хранилище"""
+    if frame.empty:
+        return
+
+    matrix = frame[SESSION_FEATURE_COLUMNS].to_numpy(dtype=VECTOR_DTYPE)
+    vectors = [
+        SessionFeatureVector(session_id=session_id, schema_version=FEATURE_SCHEMA_VERSION, vector=row.tobytes())
+        for session_id, row in zip(frame.index, matrix)
+    ]
+
+    with transaction.atomic():
+        SessionFeatureVector.objects.filter(session_id__in=list(frame.index)).delete()
+        SessionFeatureVector.objects.bulk_create(vectors)
+
+
+def refresh_session_features(session_ids):
+    """Пересчёт сохранённых признаков сессий по их измерениям и трассам"""
+    frame = session_features(
+        SinglePDMeasurement.objects.filter(session_id__in=session_ids),
+        PDTrace.objects.filter(session_id__in=session_ids),
+    )
+
+    # Сессии, оставшиеся без измерений, в хранилище не держим
+    SessionFeatureVector.objects.filter(session_id__in=session_ids).exclude(session_id__in=list(frame.index)).delete()
+    store_session_features(frame)
+
+    return frame
+
+
+def load_session_features(session_ids=None):
+    """Признаки сессий из хранилища в виде DataFrame, индексированного по session_id.
+
+    Отсутствующие векторы и векторы устаревшей схемы рассчитываются по измерениям
+    и трассам и сохраняются. Без session_ids загружаются все сессии.
+    """
+    vectors = SessionFeatureVector.objects.filter(schema_version=FEATURE_SCHEMA_VERSION)
+    if session_ids is not None:
+        vectors = vectors.filter(session_id__in=session_ids)
+    stored_ids, blobs = [], []
+    for session_id, blob in vectors.values_list('session_id', 'vector'):
+        stored_ids.append(session_id)
+        blobs.append(bytes(blob))
+
+    stored = pd.DataFrame(
+        np.frombuffer(b''.join(blobs), dtype=VECTOR_DTYPE).reshape(-1, len(SESSION_FEATURE_COLUMNS)),
+        index=pd.Index(stored_ids, name='session_id'),
+        columns=SESSION_FEATURE_COLUMNS,
+    )
+
+    if session_ids is not None:
+        missing_ids = set(session_ids) - set(stored_ids)
+        missing = SinglePDMeasurement.objects.filter(session_id__in=missing_ids)
+        missing_traces = PDTrace.objects.filter(session_id__in=missing_ids)
+    else:
+        missing = SinglePDMeasurement.objects.exclude(
+            session__feature_vector__schema_version=FEATURE_SCHEMA_VERSION
+        )
+        missing_traces = PDTrace.objects.exclude(
+            session__feature_vector__schema_version=FEATURE_SCHEMA_VERSION
+        )
+    computed = session_features(missing, missing_traces)
+    store_session_features(computed)
+
+    if computed.empty:
+        return stored
+    if stored.empty:
+        return computed
+    return pd.concat([stored, computed])
+
+
+def rebuild_feature_store(batch_size=REBUILD_BATCH_SIZE):
+    """Полная перестройка хранилища признаков пакетами сессий"""
+    session_ids = list(PDDMeasurementSession.objects.order_by('pk').values_list('pk', flat=True))
+    SessionFeatureVector.objects.exclude(schema_version=FEATURE_SCHEMA_VERSION).delete()
+    stored = 0
+    for start in range(0, len(session_ids), batch_size):
+        stored += len(refresh_session_features(session_ids[start:start + batch_size]))
+    print(f"Векторы признаков пересчитаны: {stored} из {len(session_ids)} сессий")
+    return stored
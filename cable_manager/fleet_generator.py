@@ -0,0 +1,355 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+
+from .models import Enterprise, UserProfile, CableLine, MuffChangeLog, PDDMeasurementSession, SinglePDMeasurement, \
+    HighVoltageTest, Accident
+
+
+# Количество кабельных линий, которые генерируются и вставляются за один шаг (одна транзакция)
+GENERATOR_BATCH_SIZE = 2000
+
+# Строк в одном INSERT при bulk_create
+INSERT_BATCH_SIZE = 5000
+
+ENTERPRISE_NAME = 'Нагрузочный тест'
+
+CABLE_BRANDS = {
+    1: ['ПвБбШп-10 1х240', 'АПвПу-10 1х185', 'ПвПу2г-10 1х300'],
+    3: ['ААБл-10 3х120', 'ААШв-10 3х150', 'АВБбШв-10 3х95', 'АСБл-10 3х185'],
+}
+END_MUFFS = ['КНТп-10', '3КНТп-10', 'КВтп-10', 'ПКНТп-10']
+CONNECT_MUFFS = ['СТп-10', '3СТп-10', 'ПСТ-10', 'СТпО-10']
+
+VOLTAGE_LEVELS = (5.0, 10.0, 15.0)
+# Верхняя граница диапазона измерения ЧР (пКл) и скорости старения (доля роста ЧР в год)
+MAX_DISCHARGE = 100000.0
+MAX_WEAR = 1.5
+HV_TEST_VOLTAGE = 24.0
+
+# Измерения начинаются не раньше этой даты и повторяются примерно раз в полгода
+HISTORY_START = date(2019, 1, 1)
+SESSION_INTERVAL_DAYS = (150, 210)
+
+# Риск аварии в течение 120 дней после сессии: 1 - exp(-(ЧР / DISCHARGE_SCALE) ** 2) * HAZARD
+DISCHARGE_SCALE = 2000.0
+HAZARD = 0.35
+ACCIDENT_DELAY_DAYS = 120
+ACCIDENT_TYPES = ['short_circuit', 'break', 'insulation_breakdown', 'other']
+ACCIDENT_TYPE_WEIGHTS = [0.35, 0.1, 0.45, 0.1]
+
+MUFF_FIELDS = {'start': 'start_muff', 'end': 'end_muff'}
+
+
+class FleetResult:
+    """Итог генерации: количество созданных строк по таблицам"""
+
+    COUNTERS = ['enterprises', 'cables', 'sessions', 'measurements', 'tests', 'accidents', 'muff_changes']
+
+    def __init__(self, **counts):
+        for name in self.COUNTERS:
+            setattr(self, name, counts.get(name, 0))
+
+    def add(self, other):
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.COUNTERS}
+
+
+def cable_number(prefix, enterprise_index, cable_index):
+    return f'{prefix}{enterprise_index:03d}-{cable_index:06d}'
+
+
+def generated_numbers_exist(prefix):
+    return CableLine.objects.filter(number__startswith=prefix).exists()
+
+
+def generate_cables(rng, count):
+    """Параметры кабельных линий пакета (массивы NumPy).
+
+    wear — скрытая скорость старения изоляции: от неё растут ЧР, падает сопротивление
+    изоляции и, через уровень ЧР, растёт вероятность аварии.
+    """
+    core_count = np.where(rng.random(count) < 0.25, 1, 3)
+    commissioning = rng.integers(0, 35 * 365, count)
+    connect_count = rng.integers(0, 4, count)
+    length = rng.uniform(80, 3000, count).round(1)
+    return {
+        'core_count': core_count,
+        'length': length,
+        'commissioning_days': commissioning,
+        'brand': rng.integers(0, 4, count),
+        'start_muff': rng.integers(0, len(END_MUFFS), count),
+        'end_muff': rng.integers(0, len(END_MUFFS), count),
+        'connect_count': connect_count,
+        'connect_muff': rng.integers(0, len(CONNECT_MUFFS), (count, 3)),
+        'connect_position': np.sort(rng.uniform(0.05, 0.95, (count, 3)), axis=1) * length[:, np.newaxis],
+        'wear': np.minimum(rng.lognormal(-1.6, 0.9, count), MAX_WEAR),
+        'base_discharge': rng.lognormal(3.5, 0.8, count),
+    }
+
+
+def generate_sessions(rng, cables, sessions_per_cable):
+    """Сессии измерений пакета: номер линии в пакете, дата (дни от HISTORY_START) и годы от первой сессии"""
+    count = len(cables['length'])
+    session_counts = rng.integers(max(sessions_per_cable - 2, 1), sessions_per_cable + 3, count)
+    cable_index = np.repeat(np.arange(count), session_counts)
+    intervals = rng.integers(*SESSION_INTERVAL_DAYS, len(cable_index))
+    # Первая сессия — со сдвигом от начала истории, следующие — через интервалы
+    starts = np.cumsum(session_counts) - session_counts
+    intervals[starts] = rng.integers(0, 365, count)
+    offsets = np.cumsum(intervals)
+    days = offsets - np.repeat(offsets[starts] - intervals[starts], session_counts)
+    first_day = np.repeat(days[starts], session_counts)
+    return {
+        'cable_index': cable_index,
+        'days': days,
+        'years': (days - first_day) / 365.25,
+    }
+
+
+def generate_discharges(rng, cables, sessions):
+    """ЧР (пКл) сессий по напряжениям и жилам: (сессии × напряжения × 3); у отсутствующих жил NaN"""
+    index = sessions['cable_index']
+    trend = cables['base_discharge'][index] * np.exp(cables['wear'][index] * sessions['years'])
+    voltage_factor = (np.array(VOLTAGE_LEVELS) / 10.0) ** 1.5
+    noise = rng.lognormal(0.0, 0.3, (len(index), len(VOLTAGE_LEVELS), 3))
+    discharges = trend[:, np.newaxis, np.newaxis] * voltage_factor[np.newaxis, :, np.newaxis] * noise
+    discharges[cables['core_count'][index] == 1, :, 1:] = np.nan
+    return np.minimum(discharges, MAX_DISCHARGE).round(1)
+
+
+def generate_accidents(rng, sessions, discharges):
+    """Первая авария линии после сессии с вероятностью, растущей с максимальным ЧР.
+
+    Возвращает номера сессий, после которых произошла авария, задержку в днях и тип.
+    """
+    peak = np.nanmax(discharges, axis=(1, 2))
+    probability = HAZARD * (1 - np.exp(-(peak / DISCHARGE_SCALE) ** 2))
+    happened = np.flatnonzero(rng.random(len(peak)) < probability)
+    # У линии учитывается только первая авария
+    _, first = np.unique(sessions['cable_index'][happened], return_index=True)
+    happened = happened[first]
+    delays = rng.integers(1, ACCIDENT_DELAY_DAYS, len(happened))
+    types = rng.choice(len(ACCIDENT_TYPES), len(happened), p=ACCIDENT_TYPE_WEIGHTS)
+    hours = rng.integers(0, 24, len(happened))
+    downtime = rng.lognormal(2.0, 0.8, len(happened)).round(1)
+    return happened, delays, types, hours, downtime
+
+
+def day(days):
+    return HISTORY_START + timedelta(days=int(days))
+
+
+def generate_batch(rng, enterprise, enterprise_index, first_cable, count, sessions_per_cable, prefix):
+    """Генерация и вставка пакета кабельных линий со всей историей в одной транзакции"""
+    result = FleetResult()
+    cables = generate_cables(rng, count)
+    sessions = generate_sessions(rng, cables, sessions_per_cable)
+    discharges = generate_discharges(rng, cables, sessions)
+    distances = rng.uniform(0.0, 1.0, discharges.shape) * cables['length'][sessions['cable_index'], np.newaxis, np.newaxis]
+    accident_sessions, delays, types, hours, downtime = generate_accidents(rng, sessions, discharges)
+
+    # Пробой изоляции на муфте — муфта заменяется через несколько дней после аварии
+    replaced = types == ACCIDENT_TYPES.index('insulation_breakdown')
+    replaced_muffs = {
+        int(sessions['cable_index'][session]): (
+            'start' if side == 0 else 'end', END_MUFFS[new_muff], int(sessions['days'][session] + delay + lag),
+        )
+        for session, delay, side, new_muff, lag in zip(
+            accident_sessions[replaced], delays[replaced],
+            rng.integers(0, 2, replaced.sum()), rng.integers(0, len(END_MUFFS), replaced.sum()),
+            rng.integers(1, 15, replaced.sum()),
+        )
+    }
+
+    numbers = [cable_number(prefix, enterprise_index, first_cable + i) for i in range(count)]
+    cable_objects = []
+    for i, number in enumerate(numbers):
+        core_count = int(cables['core_count'][i])
+        brands = CABLE_BRANDS[core_count]
+        muffs = {
+            'start_muff': END_MUFFS[cables['start_muff'][i]],
+            'end_muff': END_MUFFS[cables['end_muff'][i]],
+        }
+        if i in replaced_muffs:
+            muff_type, new_value, _ = replaced_muffs[i]
+            muffs[MUFF_FIELDS[muff_type]] = new_value
+        connect = {}
+        for k in range(int(cables['connect_count'][i])):
+            connect[f'connect_muff_{k + 1}'] = CONNECT_MUFFS[cables['connect_muff'][i, k]]
+            connect[f'connect_muff_{k + 1}_position'] = round(float(cables['connect_position'][i, k]), 1)
+        cable_objects.append(CableLine(
+            number=number,
+            enterprise=enterprise,
+            cable_brand=brands[cables['brand'][i] % len(brands)],
+            length=float(cables['length'][i]),
+            core_count=core_count,
+            commissioning_date=HISTORY_START - timedelta(days=int(cables['commissioning_days'][i])),
+            **muffs,
+            **connect,
+        ))
+
+    with transaction.atomic():
+        CableLine.objects.bulk_create(cable_objects, batch_size=INSERT_BATCH_SIZE)
+        # id читаются запросом, а не из bulk_create: MySQL не возвращает их после вставки
+        cable_ids = dict(CableLine.objects.filter(number__in=numbers).values_list('number', 'id'))
+        cable_ids = np.array([cable_ids[number] for number in numbers])
+        result.cables = count
+
+        session_cables = cable_ids[sessions['cable_index']]
+        PDDMeasurementSession.objects.bulk_create([
+            PDDMeasurementSession(cable_line_id=int(cable_id), session_date=day(days), notes='Плановые измерения')
+            for cable_id, days in zip(session_cables, sessions['days'])
+        ], batch_size=INSERT_BATCH_SIZE)
+        session_ids = {
+            (cable_id, session_date): session_id
+            for session_id, cable_id, session_date in PDDMeasurementSession.objects.filter(
+                cable_line_id__in=cable_ids.tolist()).values_list('id', 'cable_line_id', 'session_date')
+        }
+        session_ids = [session_ids[int(cable_id), day(days)] for cable_id, days in zip(session_cables, sessions['days'])]
+        result.sessions = len(session_ids)
+
+        measurements = []
+        for s, session_id in enumerate(session_ids):
+            for v, voltage in enumerate(VOLTAGE_LEVELS):
+                values = discharges[s, v]
+                measurements.append(SinglePDMeasurement(
+                    session_id=session_id,
+                    voltage_level=voltage,
+                    **{
+                        f'core_{core + 1}_{field}': float(array[s, v, core])
+                        for core in range(3)
+                        for field, array in (('discharge', discharges), ('distance', distances))
+                        if not np.isnan(values[core])
+                    },
+                ))
+            if len(measurements) >= INSERT_BATCH_SIZE:
+                SinglePDMeasurement.objects.bulk_create(measurements, batch_size=INSERT_BATCH_SIZE)
+                result.measurements += len(measurements)
+                measurements = []
+        SinglePDMeasurement.objects.bulk_create(measurements, batch_size=INSERT_BATCH_SIZE)
+        result.measurements += len(measurements)
+
+        # Высоковольтные испытания — через неделю после каждой второй сессии; сопротивление изоляции падает со старением
+        tested = np.flatnonzero(np.arange(len(session_ids)) % 2 == 0)
+        index = sessions['cable_index'][tested]
+        resistance = 2000 * np.exp(-cables['wear'][index] * sessions['years'][tested]) \
+            * rng.lognormal(0.0, 0.2, len(tested))
+        HighVoltageTest.objects.bulk_create([
+            HighVoltageTest(
+                cable_line_id=int(cable_ids[i]),
+                test_date=day(sessions['days'][s] + 7),
+                test_voltage=HV_TEST_VOLTAGE,
+                insulation_resistance=round(max(float(r), 1.0), 1),
+            )
+            for s, i, r in zip(tested, index, resistance)
+        ], batch_size=INSERT_BATCH_SIZE)
+        result.tests = len(tested)
+
+        Accident.objects.bulk_create([
+            Accident(
+                cable_line_id=int(session_cables[s]),
+                accident_date=datetime.combine(day(sessions['days'][s] + delay), time(int(hour)),
+                                               tzinfo=dt_timezone.utc),
+                accident_type=ACCIDENT_TYPES[accident_type],
+                description='Сгенерированная авария',
+                downtime=timedelta(hours=float(hours_down)),
+            )
+            for s, delay, accident_type, hour, hours_down in zip(accident_sessions, delays, types, hours, downtime)
+        ], batch_size=INSERT_BATCH_SIZE)
+        result.accidents = len(accident_sessions)
+
+        if replaced_muffs:
+            changes = {
+                int(cable_ids[i]): MuffChangeLog(
+                    cable_line_id=int(cable_ids[i]),
+                    changed_muff_type=muff_type,
+                    old_value=END_MUFFS[cables[MUFF_FIELDS[muff_type]][i]],
+                    new_value=new_value,
+                    notes='Замена после пробоя изоляции на муфте',
+                )
+                for i, (muff_type, new_value, _) in replaced_muffs.items()
+            }
+            MuffChangeLog.objects.bulk_create(changes.values(), batch_size=INSERT_BATCH_SIZE)
+            # change_date заполняется автоматически при вставке, дата замены записывается отдельно
+            change_dates = {int(cable_ids[i]): change_day for i, (_, _, change_day) in replaced_muffs.items()}
+            logs = list(MuffChangeLog.objects.filter(cable_line_id__in=list(changes)))
+            for log in logs:
+                log.change_date = datetime.combine(day(change_dates[log.cable_line_id]), time(12),
+                                                   tzinfo=dt_timezone.utc)
+            MuffChangeLog.objects.bulk_update(logs, ['change_date'], batch_size=INSERT_BATCH_SIZE)
+            result.muff_changes = len(logs)
+
+    return result
+
+
+def generate_enterprise(enterprise_id, enterprise_index, cable_count, sessions_per_cable, seed, prefix,
+                        batch_size=GENERATOR_BATCH_SIZE):
+    """Генерация линий одного предприятия.
+
+    Генератор случайных чисел инициализируется (seed, номер предприятия), поэтому
+    данные предприятия не зависят от числа процессов и порядка их выполнения.
+    """
+    rng = np.random.default_rng([seed, enterprise_index])
+    enterprise = Enterprise.objects.get(pk=enterprise_id)
+    result = FleetResult()
+    for start in range(0, cable_count, batch_size):
+        count = min(batch_size, cable_count - start)
+        result.add(generate_batch(rng, enterprise, enterprise_index, start, count, sessions_per_cable, prefix))
+        print(f"{enterprise.name}: линий {start + count} из {cable_count}")
+    return result
+
+
+def _init_worker():
+    # При запуске процессов через spawn Django нужно настроить заново
+    import django
+    django.setup()
+
+
+def _generate_enterprise(*args):
+    try:
+        return generate_enterprise(*args)
+    finally:
+        connections.close_all()
+
+
+def generate_fleet(enterprise_count, cable_count, sessions_per_cable=8, seed=0, prefix='НТ-', workers=1,
+                   batch_size=GENERATOR_BATCH_SIZE, password=None):
+    """Генерация парка для нагрузочного тестирования.
+
+    Создаёт enterprise_count предприятий (с пользователем prefix + номер у каждого) и
+    распределяет между ними cable_count линий с сессиями измерений ЧР на трёх напряжениях,
+    высоковольтными испытаниями, авариями (вероятность растёт с уровнем ЧР) и заменами муфт.
+    Предприятия генерируются в workers процессах. Сигналы при bulk_create не вызываются:
+    векторы признаков, тренды и оценки риска рассчитываются потом командами перестройки.
+    """
+    if generated_numbers_exist(prefix):
+        raise ValueError(f"линии с префиксом '{prefix}' уже существуют")
+
+    result = FleetResult(enterprises=enterprise_count)
+    tasks = []
+    for k in range(enterprise_count):
+        enterprise = Enterprise.objects.create(name=f'{ENTERPRISE_NAME} {prefix}{k:03d}')
+        user = User.objects.create_user(username=f'{prefix}{k:03d}', password=password)
+        UserProfile.objects.create(user=user, enterprise=enterprise, full_name=f'Пользователь {prefix}{k:03d}')
+        cables = cable_count // enterprise_count + (1 if k < cable_count % enterprise_count else 0)
+        tasks.append((enterprise.pk, k, cables, sessions_per_cable, seed, prefix, batch_size))
+
+    if workers <= 1:
+        for task in tasks:
+            result.add(generate_enterprise(*task))
+        return result
+
+    # Процессы открывают собственные соединения с базой, унаследованные закрываются до запуска
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        for enterprise_result in executor.map(_generate_enterprise, *zip(*tasks)):
+            result.add(enterprise_result)
+    return result
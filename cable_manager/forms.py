@@ -6,7 +6,9 @@ class CableLineForm(forms.ModelForm):
         model = CableLine
         fields = [
             'number', 'cable_brand', 'start_muff', 'end_muff',
-            'connect_muff_1', 'connect_muff_2', 'connect_muff_3',
+            'connect_muff_1', 'connect_muff_1_position',
+            'connect_muff_2', 'connect_muff_2_position',
+            'connect_muff_3', 'connect_muff_3_position',
             'length', 'core_count', 'commissioning_date'
         ]
         widgets = {
@@ -73,4 +75,65 @@ class CombinedPDMeasurementForm(forms.ModelForm):
         fields = ['cable_line', 'session_date', 'notes']
         widgets = {
             'session_date': forms.DateInput(attrs={'type': 'date'}),
-        }
\ No newline at end of file
+        }
+
+class DashboardFilterForm(forms.Form):
+    ORDER_CHOICES = [
+        ('number', 'По номеру'),
+        ('commissioning', 'По дате ввода'),
+    ]
+    # Уровень риска линий без измерений; сюда же относятся ещё не оценённые линии
+    NO_DATA_RISK = 'Нет данных измерений'
+    RISK_CHOICES = [
+        ('', 'Любой риск'),
+        ('Низкий', 'Низкий'),
+        ('Средний', 'Средний'),
+        ('Высокий', 'Высокий'),
+        (NO_DATA_RISK, 'Нет данных'),
+    ]
+
+    q = forms.CharField(required=False, label='Поиск',
+                        widget=forms.TextInput(attrs={'placeholder': 'Номер или марка (начало)'}))
+    brand = forms.ChoiceField(required=False, label='Марка кабеля')
+    core_count = forms.IntegerField(required=False, min_value=1, label='Жил')
+    year = forms.IntegerField(required=False, min_value=1900, max_value=2100, label='Год ввода')
+    risk = forms.ChoiceField(required=False, choices=RISK_CHOICES, label='Риск')
+    order = forms.ChoiceField(required=False, choices=ORDER_CHOICES, label='Сортировка')
+
+    def __init__(self, *args, brands=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['brand'].choices = [('', 'Все марки')] + [(brand, brand) for brand in brands]
+
+
+class MeasurementImportForm(forms.Form):
+    file = forms.FileField(label='CSV-файл измерений ЧР')
+
+
+class HistoryExportForm(forms.Form):
+    DATASET_CHOICES = [
+        ('measurements', 'Измерения ЧР'),
+        ('sessions', 'Сессии измерений'),
+        ('tests', 'Высоковольтные испытания'),
+        ('accidents', 'Аварии'),
+    ]
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('csv.gz', 'CSV (gzip)'),
+        ('parquet', 'Parquet'),
+    ]
+
+    dataset = forms.ChoiceField(required=False, choices=DATASET_CHOICES, initial='measurements', label='Данные')
+    format = forms.ChoiceField(required=False, choices=FORMAT_CHOICES, initial='csv', label='Формат')
+    date_from = forms.DateField(required=False, label='С даты', widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, label='По дату', widget=forms.DateInput(attrs={'type': 'date'}))
+    cables = forms.CharField(required=False, label='Линии',
+                             widget=forms.TextInput(attrs={'placeholder': 'Номера через запятую'}))
+
+    def clean_dataset(self):
+        return self.cleaned_data['dataset'] or 'measurements'
+
+    def clean_format(self):
+        return self.cleaned_data['format'] or 'csv'
+
+    def clean_cables(self):
+        return [number.strip() for number in self.cleaned_data['cables'].split(',') if number.strip()]
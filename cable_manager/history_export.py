@@ -0,0 +1,238 @@
+import csv
+import io
+import zlib
+
+from .models import PDDMeasurementSession, SinglePDMeasurement, HighVoltageTest, Accident
+from .pagination import keyset_filter
+
+
+# Сколько строк читается из БД одним запросом и попадает в одну группу строк Parquet
+EXPORT_CHUNK_SIZE = 2000
+
+# Размер текстового буфера CSV, после которого он отдаётся клиенту
+CSV_FLUSH_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'csv.gz': ('application/gzip', 'csv.gz'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Наборы данных: модель, путь к кабельной линии, поле даты для фильтра, порядок выгрузки
+# и столбцы (имя, путь ORM, тип)
+DATASETS = {
+    'sessions': {
+        'model': PDDMeasurementSession,
+        'cable_path': 'cable_line',
+        'date_lookup': 'session_date',
+        'ordering': ['id'],
+        'columns': [
+            ('cable_number', 'cable_line__number', 'string'),
+            ('session_id', 'id', 'int'),
+            ('session_date', 'session_date', 'date'),
+            ('created_at', 'created_at', 'datetime'),
+            ('notes', 'notes', 'string'),
+        ],
+    },
+    'measurements': {
+        'model': SinglePDMeasurement,
+        'cable_path': 'session__cable_line',
+        'date_lookup': 'session__session_date',
+        'ordering': ['session_id', 'id'],
+        'columns': [
+            ('cable_number', 'session__cable_line__number', 'string'),
+            ('session_id', 'session_id', 'int'),
+            ('session_date', 'session__session_date', 'date'),
+            ('voltage_level', 'voltage_level', 'float'),
+            ('core_1_discharge', 'core_1_discharge', 'float'),
+            ('core_1_distance', 'core_1_distance', 'float'),
+            ('core_2_discharge', 'core_2_discharge', 'float'),
+            ('core_2_distance', 'core_2_distance', 'float'),
+            ('core_3_discharge', 'core_3_discharge', 'float'),
+            ('core_3_distance', 'core_3_distance', 'float'),
+        ],
+    },
+    'tests': {
+        'model': HighVoltageTest,
+        'cable_path': 'cable_line',
+        'date_lookup': 'test_date',
+        'ordering': ['id'],
+        'columns': [
+            ('cable_number', 'cable_line__number', 'string'),
+            ('test_id', 'id', 'int'),
+            ('test_date', 'test_date', 'date'),
+            ('test_voltage', 'test_voltage', 'float'),
+            ('insulation_resistance', 'insulation_resistance', 'float'),
+            ('created_at', 'created_at', 'datetime'),
+        ],
+    },
+    'accidents': {
+        'model': Accident,
+        'cable_path': 'cable_line',
+        'date_lookup': 'accident_date__date',
+        'ordering': ['id'],
+        'columns': [
+            ('cable_number', 'cable_line__number', 'string'),
+            ('accident_id', 'id', 'int'),
+            ('accident_date', 'accident_date', 'datetime'),
+            ('accident_type', 'accident_type', 'string'),
+            ('description', 'description', 'string'),
+            ('downtime_seconds', 'downtime', 'duration'),
+        ],
+    },
+}
+
+
+def export_rows(dataset, enterprise=None, date_from=None, date_to=None, cable_numbers=None, chunk_size=None):
+    """Строки набора данных, читаемые из БД порциями по chunk_size (по умолчанию EXPORT_CHUNK_SIZE).
+
+    Порции выбираются по курсору (keyset) по полям сортировки набора, а не через
+    QuerySet.iterator: mysqlclient читает результат запроса в память клиента целиком,
+    поэтому память ограничена только размером порции.
+    """
+    spec = DATASETS[dataset]
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    queryset = spec['model'].objects.all()
+    if enterprise is not None:
+        queryset = queryset.filter(**{f"{spec['cable_path']}__enterprise": enterprise})
+    if date_from:
+        queryset = queryset.filter(**{f"{spec['date_lookup']}__gte": date_from})
+    if date_to:
+        queryset = queryset.filter(**{f"{spec['date_lookup']}__lte": date_to})
+    if cable_numbers:
+        queryset = queryset.filter(**{f"{spec['cable_path']}__number__in": cable_numbers})
+
+    # Поля сортировки выбираются последними столбцами: по ним строится условие следующей порции
+    ordering = spec['ordering']
+    paths = [path for _, path, _ in spec['columns']]
+    queryset = queryset.order_by(*ordering).values_list(*paths, *ordering)
+
+    last = None
+    while True:
+        chunk = queryset if last is None else queryset.filter(keyset_filter(ordering, last))
+        rows = list(chunk[:chunk_size])
+        for row in rows:
+            yield row[:len(paths)]
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][len(paths):]
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'total_seconds'):
+        return value.total_seconds()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(dataset, rows):
+    """CSV-файл порциями байтов"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _, _ in DATASETS[dataset]['columns']])
+    for row in rows:
+        writer.writerow([csv_value(value) for value in row])
+        if buffer.tell() >= CSV_FLUSH_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def gzip_chunks(chunks):
+    """Сжатие потока порций в формат gzip на лету"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Файл только для записи, из которого записанные байты забираются порциями"""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def parquet_chunks(dataset, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Файл Parquet (столбцовый, сжатый), по группе строк на каждую порцию из БД"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_types = {
+        'string': pa.string(),
+        'int': pa.int64(),
+        'float': pa.float64(),
+        'date': pa.date32(),
+        'datetime': pa.timestamp('us', tz='UTC'),
+        'duration': pa.float64(),
+    }
+    columns = DATASETS[dataset]['columns']
+    schema = pa.schema([(name, arrow_types[kind]) for name, _, kind in columns])
+    durations = [i for i, (_, _, kind) in enumerate(columns) if kind == 'duration']
+
+    def write_batch(writer, batch):
+        values = list(zip(*batch))
+        for i in durations:
+            values[i] = [value.total_seconds() if value is not None else None for value in values[i]]
+        writer.write_batch(pa.record_batch(
+            [pa.array(column, type=field.type) for column, field in zip(values, schema)], schema=schema
+        ))
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            write_batch(writer, batch)
+            batch = []
+            yield sink.take()
+    if batch:
+        write_batch(writer, batch)
+    writer.close()
+    yield sink.take()
+
+
+def parquet_available():
+    """Установлен ли необязательный пакет pyarrow"""
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def export_chunks(dataset, fmt, rows):
+    """Порции байтов выгрузки набора данных в заданном формате"""
+    if fmt == 'parquet':
+        if not parquet_available():
+            raise ValueError("Для выгрузки в Parquet нужен пакет pyarrow")
+        return parquet_chunks(dataset, rows)
+    chunks = csv_chunks(dataset, rows)
+    if fmt == 'csv.gz':
+        return gzip_chunks(chunks)
+    return chunks
@@ -0,0 +1,322 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from .models import CableLine, PDDMeasurementSession, SinglePDMeasurement, PDTrace, CableHotSpotProfile, \
+    SessionHotSpotBins
+from .pd_traces import load_trace
+
+
+# Версия схемы профилей: увеличивается при изменении правил разбиения или взвешивания
+HOTSPOT_SCHEMA_VERSION = 1
+
+# Длина интервала разбиения линии (м)
+HOTSPOT_BIN_LENGTH = 10.0
+
+# Интервал считается устойчивым, если ЧР в нём были не менее чем в HOTSPOT_MIN_SESSIONS сессиях
+# и не менее чем в доле HOTSPOT_PERSISTENCE всех сессий линии
+HOTSPOT_MIN_SESSIONS = 2
+HOTSPOT_PERSISTENCE = 0.5
+
+# Устойчивые интервалы, разделённые не более чем HOTSPOT_MAX_GAP_BINS пустыми, объединяются в один очаг
+HOTSPOT_MAX_GAP_BINS = 1
+
+# Очаг относится к соединительной муфте, если муфта не дальше HOTSPOT_JOINT_TOLERANCE (м) от его границ
+HOTSPOT_JOINT_TOLERANCE = 20.0
+
+HOTSPOT_BATCH_SIZE = 500
+
+BINS_DTYPE = np.dtype('<u4')
+WEIGHTS_DTYPE = np.dtype('<f8')
+
+CORE_FIELDS = [
+    ('core_1_discharge', 'core_1_distance'),
+    ('core_2_discharge', 'core_2_distance'),
+    ('core_3_discharge', 'core_3_distance'),
+]
+
+HotSpotCluster = namedtuple('HotSpotCluster', ['start', 'end', 'center', 'charge', 'persistence', 'joints'])
+
+
+def bin_count_for(length, bin_length=HOTSPOT_BIN_LENGTH):
+    """Количество интервалов разбиения линии заданной длины"""
+    return max(1, math.ceil((length or 0) / bin_length))
+
+
+def located_discharges(session_ids):
+    """Места и заряды ЧР сессий: DataFrame (session_id, distance, charge).
+
+    Для сессий с трассами берутся отдельные импульсы, для остальных — значения
+    по жилам из SinglePDMeasurement. Записи без расстояния или заряда отбрасываются.
+    """
+    parts = []
+
+    traced = set()
+    for trace in PDTrace.objects.filter(session_id__in=session_ids).order_by('session_id', 'pk').iterator():
+        traced.add(trace.session_id)
+        pulses = load_trace(trace)
+        parts.append(pd.DataFrame({
+            'session_id': trace.session_id,
+            'distance': pulses[1].astype(float),
+            'charge': np.abs(pulses[0].astype(float)),
+        }))
+
+    fields = [field for pair in CORE_FIELDS for field in pair]
+    measurements = pd.DataFrame.from_records(
+        SinglePDMeasurement.objects.filter(session_id__in=session_ids).exclude(session_id__in=traced).values(
+            'session_id', *fields),
+        columns=['session_id'] + fields,
+    )
+    for discharge_field, distance_field in CORE_FIELDS:
+        parts.append(pd.DataFrame({
+            'session_id': measurements['session_id'],
+            'distance': measurements[distance_field].astype(float),
+            'charge': measurements[discharge_field].astype(float).abs(),
+        }))
+
+    located = pd.concat(parts, ignore_index=True)
+    return located[(located['distance'].fillna(0) > 0) & (located['charge'].fillna(0) > 0)]
+
+
+def session_contributions(session_ids):
+    """Вклады сессий в профили их линий.
+
+    Возвращает DataFrame сессий (session_id, cable_line_id, bin_count) и DataFrame
+    вкладов (session_id, bin, weight) — суммарный заряд ЧР сессии по интервалам.
+    """
+    sessions = pd.DataFrame.from_records(
+        PDDMeasurementSession.objects.filter(pk__in=session_ids).values_list('pk', 'cable_line_id', 'cable_line__length'),
+        columns=['session_id', 'cable_line_id', 'length'],
+    )
+    sessions['bin_count'] = [bin_count_for(length) for length in sessions['length']]
+
+    located = located_discharges(list(sessions['session_id'])).merge(
+        sessions[['session_id', 'bin_count']], on='session_id'
+    )
+    # Места за пределами указанной длины линии относятся к последнему интервалу
+    located['bin'] = np.minimum(
+        (located['distance'].to_numpy() // HOTSPOT_BIN_LENGTH).astype(np.int64),
+        located['bin_count'].to_numpy() - 1,
+    )
+    contributions = located.groupby(['session_id', 'bin'], as_index=False)['charge'].sum().rename(
+        columns={'charge': 'weight'}
+    )
+    return sessions[['session_id', 'cable_line_id', 'bin_count']], contributions
+
+
+def session_bins_records(sessions, contributions):
+    """Записи SessionHotSpotBins по рассчитанным вкладам"""
+    grouped = {session_id: group for session_id, group in contributions.groupby('session_id')}
+    records = []
+    for session_id, cable_line_id in zip(sessions['session_id'], sessions['cable_line_id']):
+        group = grouped.get(session_id)
+        bins = group['bin'].to_numpy(dtype=BINS_DTYPE) if group is not None else np.empty(0, dtype=BINS_DTYPE)
+        weights = group['weight'].to_numpy(dtype=WEIGHTS_DTYPE) if group is not None else np.empty(0, dtype=WEIGHTS_DTYPE)
+        records.append(SessionHotSpotBins(
+            session_id=session_id, cable_line_id=cable_line_id, bins=bins.tobytes(), weights=weights.tobytes(),
+        ))
+    return records
+
+
+def build_profiles(cable_ids):
+    """Полный расчёт профилей мест ЧР линий по всей истории измерений"""
+    cables = dict(CableLine.objects.filter(pk__in=cable_ids).values_list('pk', 'length'))
+    session_ids = list(PDDMeasurementSession.objects.filter(cable_line_id__in=cables).values_list('pk', flat=True))
+    sessions, contributions = session_contributions(session_ids)
+
+    contributions = contributions.merge(sessions[['session_id', 'cable_line_id']], on='session_id')
+    per_bin = contributions.groupby(['cable_line_id', 'bin']).agg(weight=('weight', 'sum'), hits=('weight', 'size'))
+    session_counts = sessions.groupby('cable_line_id').size()
+
+    located_cables = set(per_bin.index.get_level_values(0))
+    profiles = []
+    for cable_id, length in cables.items():
+        weights = np.zeros(bin_count_for(length), dtype=WEIGHTS_DTYPE)
+        hits = np.zeros(len(weights), dtype=BINS_DTYPE)
+        if cable_id in located_cables:
+            cable_bins = per_bin.loc[cable_id]
+            weights[cable_bins.index.to_numpy()] = cable_bins['weight'].to_numpy()
+            hits[cable_bins.index.to_numpy()] = cable_bins['hits'].to_numpy()
+        profiles.append(CableHotSpotProfile(
+            cable_line_id=cable_id,
+            schema_version=HOTSPOT_SCHEMA_VERSION,
+            bin_length=HOTSPOT_BIN_LENGTH,
+            session_count=int(session_counts.get(cable_id, 0)),
+            weights=weights.tobytes(),
+            hits=hits.tobytes(),
+        ))
+
+    with transaction.atomic():
+        SessionHotSpotBins.objects.filter(cable_line_id__in=cables).delete()
+        SessionHotSpotBins.objects.bulk_create(session_bins_records(sessions, contributions))
+        CableHotSpotProfile.objects.filter(cable_line_id__in=cables).delete()
+        CableHotSpotProfile.objects.bulk_create(profiles)
+
+    return profiles
+
+
+def profile_outdated(profile, length):
+    """Профиля нет или он рассчитан по другой схеме, длине интервала или длине линии"""
+    return (profile is None or profile.schema_version != HOTSPOT_SCHEMA_VERSION
+            or profile.bin_length != HOTSPOT_BIN_LENGTH
+            or len(profile.hits) // BINS_DTYPE.itemsize != bin_count_for(length))
+
+
+def profile_arrays(profile):
+    """Суммарный заряд и число сессий с ЧР по интервалам профиля (копии, доступные для записи)"""
+    return (np.frombuffer(profile.weights, dtype=WEIGHTS_DTYPE).copy(),
+            np.frombuffer(profile.hits, dtype=BINS_DTYPE).astype(np.int64))
+
+
+def apply_session_delta(profile, bins, weights, sign):
+    """Добавление (sign=1) или вычитание (sign=-1) вклада одной сессии в профиль"""
+    profile_weights, profile_hits = profile_arrays(profile)
+    bins = np.frombuffer(bins, dtype=BINS_DTYPE).astype(np.intp)
+    weights = np.frombuffer(weights, dtype=WEIGHTS_DTYPE)
+    np.add.at(profile_weights, bins, sign * weights)
+    np.add.at(profile_hits, bins, sign)
+    profile.weights = np.maximum(profile_weights, 0).astype(WEIGHTS_DTYPE).tobytes()
+    profile.hits = np.maximum(profile_hits, 0).astype(BINS_DTYPE).tobytes()
+    profile.session_count = max(0, profile.session_count + sign)
+
+
+def update_hotspots(session_ids):
+    """Инкрементальное обновление профилей по изменившимся сессиям.
+
+    Из профиля линии вычитается прежний вклад каждой сессии и добавляется новый,
+    история остальных сессий не перечитывается. Профили, которых ещё нет,
+    устарели по схеме или длине линии, рассчитываются заново целиком.
+    """
+    with transaction.atomic():
+        old = {record.session_id: record for record in SessionHotSpotBins.objects.filter(session_id__in=session_ids)}
+        sessions, contributions = session_contributions(session_ids)
+        new = {record.session_id: record for record in session_bins_records(sessions, contributions)}
+
+        cable_ids = {record.cable_line_id for record in old.values()} | {record.cable_line_id for record in new.values()}
+        lengths = dict(CableLine.objects.filter(pk__in=cable_ids).values_list('pk', 'length'))
+        profiles = {
+            profile.cable_line_id: profile
+            for profile in CableHotSpotProfile.objects.select_for_update().filter(cable_line_id__in=cable_ids)
+        }
+
+        rebuild = {cable_id for cable_id in cable_ids if profile_outdated(profiles.get(cable_id), lengths.get(cable_id))}
+
+        changed = {}
+        for session_id in set(session_ids):
+            for record, sign in ((old.get(session_id), -1), (new.get(session_id), 1)):
+                if record is None or record.cable_line_id in rebuild:
+                    continue
+                profile = profiles[record.cable_line_id]
+                apply_session_delta(profile, record.bins, record.weights, sign)
+                changed[profile.pk] = profile
+
+        for profile in changed.values():
+            profile.save(update_fields=['weights', 'hits', 'session_count', 'updated_at'])
+
+        SessionHotSpotBins.objects.filter(session_id__in=session_ids).exclude(cable_line_id__in=rebuild).delete()
+        SessionHotSpotBins.objects.bulk_create(
+            [record for record in new.values() if record.cable_line_id not in rebuild]
+        )
+
+        rebuild &= set(lengths)
+        if rebuild:
+            build_profiles(list(rebuild))
+
+
+def remove_session_hotspots(session):
+    """Вычитание вклада удаляемой сессии из профиля её линии"""
+    with transaction.atomic():
+        record = SessionHotSpotBins.objects.filter(session=session).first()
+        if record is None:
+            return
+        profile = CableHotSpotProfile.objects.select_for_update().filter(cable_line_id=record.cable_line_id).first()
+        if profile is not None:
+            apply_session_delta(profile, record.bins, record.weights, -1)
+            profile.save(update_fields=['weights', 'hits', 'session_count', 'updated_at'])
+        record.delete()
+
+
+def cable_joints(cable):
+    """Соединительные муфты линии с известным расстоянием: (название, марка, расстояние)"""
+    joints = []
+    for i in (1, 2, 3):
+        position = getattr(cable, f'connect_muff_{i}_position')
+        if position is not None:
+            joints.append((f'Соединительная муфта {i}', getattr(cable, f'connect_muff_{i}') or '', position))
+    return joints
+
+
+def find_clusters(profile, joints=()):
+    """Устойчивые очаги ЧР профиля, по убыванию суммарного заряда"""
+    weights, hits = profile_arrays(profile)
+    if profile.session_count == 0:
+        return []
+
+    threshold = max(HOTSPOT_MIN_SESSIONS, math.ceil(HOTSPOT_PERSISTENCE * profile.session_count))
+    persistent = np.flatnonzero(hits >= threshold)
+    if persistent.size == 0:
+        return []
+
+    bin_length = profile.bin_length
+    centers = (np.arange(len(weights)) + 0.5) * bin_length
+    breaks = np.flatnonzero(np.diff(persistent) > HOTSPOT_MAX_GAP_BINS + 1)
+    clusters = []
+    for group in np.split(persistent, breaks + 1):
+        first, last = group[0], group[-1] + 1
+        charge = float(weights[first:last].sum())
+        center = float(np.dot(weights[first:last], centers[first:last]) / charge) if charge > 0 else \
+            float(centers[first:last].mean())
+        start, end = float(first * bin_length), float(last * bin_length)
+        clusters.append(HotSpotCluster(
+            start=start,
+            end=end,
+            center=center,
+            charge=charge,
+            persistence=float(hits[first:last].max()) / profile.session_count,
+            joints=[joint for joint in joints
+                    if start - HOTSPOT_JOINT_TOLERANCE <= joint[2] <= end + HOTSPOT_JOINT_TOLERANCE],
+        ))
+    clusters.sort(key=lambda cluster: cluster.charge, reverse=True)
+    return clusters
+
+
+def cable_hotspots(cable):
+    """Очаги ЧР одной линии (профиль рассчитывается при первом обращении и после изменения длины линии)"""
+    profile = CableHotSpotProfile.objects.filter(cable_line=cable).first()
+    if profile_outdated(profile, cable.length):
+        build_profiles([cable.pk])
+        profile = CableHotSpotProfile.objects.get(cable_line=cable)
+    return find_clusters(profile, cable_joints(cable))
+
+
+def fleet_hotspots(cable_lines=None, batch_size=HOTSPOT_BATCH_SIZE, rebuild=False):
+    """Очаги ЧР по всему парку (или набору линий) пакетами: [(линия, [очаги])]"""
+    if cable_lines is None:
+        cable_lines = CableLine.objects.all()
+    cable_ids = list(cable_lines.order_by('pk').values_list('pk', flat=True))
+
+    results = []
+    for start in range(0, len(cable_ids), batch_size):
+        batch = cable_ids[start:start + batch_size]
+        profiles = {
+            profile.cable_line_id: profile
+            for profile in CableHotSpotProfile.objects.filter(cable_line_id__in=batch).select_related('cable_line')
+        }
+        outdated = [
+            cable_id for cable_id in batch
+            if rebuild or cable_id not in profiles
+            or profile_outdated(profiles[cable_id], profiles[cable_id].cable_line.length)
+        ]
+        if outdated:
+            build_profiles(outdated)
+            profiles.update({
+                profile.cable_line_id: profile
+                for profile in CableHotSpotProfile.objects.filter(cable_line_id__in=outdated).select_related('cable_line')
+            })
+        for cable_id in batch:
+            profile = profiles[cable_id]
+            results.append((profile.cable_line, find_clusters(profile, cable_joints(profile.cable_line))))
+    return results
@@ -0,0 +1,62 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from cable_manager.models import CableLine
+from cable_manager.server_benchmark import run_benchmark, throughput
+
+
+class Command(BaseCommand):
+    help = ('Сравнение пропускной способности одного процесса под WSGI (потоки) и ASGI (цикл событий) '
+            'на страницах пользователя')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Имя пользователя, от которого открываются страницы')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Адрес страницы (можно несколько; по умолчанию статистика, ИИ-анализ '
+                                 'и карточка первой линии предприятия)')
+        parser.add_argument('--requests', type=int, default=200, help='Количество запросов в каждом режиме')
+        parser.add_argument('--concurrency', type=int, default=16, help='Количество одновременных запросов')
+        parser.add_argument('--mode', choices=['wsgi', 'asgi', 'both'], default='both', help='Какие режимы замерить')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Без кэша страниц (DummyCache): замер полного построения страниц')
+        parser.add_argument('--json', action='store_true', help='Вывести результаты в JSON')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.select_related('userprofile__enterprise').get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"Пользователь {options['user']} не найден")
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('Количество запросов и одновременных запросов должно быть положительным')
+
+        paths = options['paths']
+        if not paths:
+            cable = CableLine.objects.filter(enterprise=user.userprofile.enterprise).order_by('pk').first()
+            if cable is None:
+                raise CommandError('У предприятия пользователя нет кабельных линий')
+            paths = [reverse('statistics'), reverse('ai_analysis'), reverse('cable_line_detail', args=[cable.pk])]
+
+        modes = ('wsgi', 'asgi') if options['mode'] == 'both' else (options['mode'],)
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}} if options['no_cache'] else None
+        with override_settings(**({'CACHES': caches} if caches else {})):
+            results = run_benchmark(paths, user.username, modes=modes, requests=options['requests'],
+                                    concurrency=options['concurrency'])
+
+        if options['json']:
+            self.stdout.write(json.dumps([dict(result._asdict(), throughput=throughput(result))
+                                          for result in results], ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(f"Страницы: {', '.join(paths)}")
+        for result in results:
+            self.stdout.write(
+                f'{result.mode.upper()}: {throughput(result):.1f} запросов/с, медиана {result.p50 * 1000:.0f} мс, '
+                f'95% {result.p95 * 1000:.0f} мс, ошибок {result.errors} из {result.requests}'
+            )
+        if len(results) == 2 and throughput(results[0]):
+            self.stdout.write(self.style.SUCCESS(
+                f'ASGI/WSGI по пропускной способности: {throughput(results[1]) / throughput(results[0]):.2f}'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cable_manager.compiled_model import save_compiled_model
+from cable_manager.model_registry import registry
+
+
+class Command(BaseCommand):
+    help = 'Компиляция сохранённой модели ИИ в массивы NumPy (.npz) для прогноза без scikit-learn'
+
+    def handle(self, *args, **options):
+        version = registry.stored_version()
+        estimators = registry.estimators(version)
+        if estimators is None:
+            raise CommandError('Сохранённая модель не найдена')
+
+        model, scaler = estimators
+        save_compiled_model(model, scaler, version, registry.compiled_path)
+        self.stdout.write(self.style.SUCCESS(f'Модель {version} скомпилирована: {registry.compiled_path}'))
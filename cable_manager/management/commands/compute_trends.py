@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from cable_manager.trends import rebuild_trends, TREND_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт трендов частичных разрядов по всем кабельным линиям'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=TREND_BATCH_SIZE,
+                            help='Количество линий в одном пакете')
+
+    def handle(self, *args, **options):
+        stored = rebuild_trends(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Тренды ЧР пересчитаны: {stored} записей'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cable_manager.hotspots import fleet_hotspots, HOTSPOT_BATCH_SIZE
+from cable_manager.models import CableLine, Enterprise
+
+
+class Command(BaseCommand):
+    help = 'Поиск устойчивых очагов ЧР по длине кабельных линий всего парка'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enterprise', type=int, help='id предприятия (по умолчанию все)')
+        parser.add_argument('--rebuild', action='store_true', help='Пересчитать профили по всей истории измерений')
+        parser.add_argument('--joints-only', action='store_true', help='Выводить только очаги рядом с муфтами')
+        parser.add_argument('--batch-size', type=int, default=HOTSPOT_BATCH_SIZE,
+                            help='Количество линий в одном пакете')
+
+    def handle(self, *args, **options):
+        cable_lines = CableLine.objects.all()
+        if options['enterprise'] is not None:
+            if not Enterprise.objects.filter(pk=options['enterprise']).exists():
+                raise CommandError(f"Предприятие {options['enterprise']} не найдено")
+            cable_lines = cable_lines.filter(enterprise_id=options['enterprise'])
+
+        results = fleet_hotspots(cable_lines, batch_size=options['batch_size'], rebuild=options['rebuild'])
+
+        cluster_count = 0
+        joint_count = 0
+        for cable, clusters in results:
+            for cluster in clusters:
+                cluster_count += 1
+                if cluster.joints:
+                    joint_count += 1
+                elif options['joints_only']:
+                    continue
+                joints = '; '.join(f'{name} ({position} м)' for name, _, position in cluster.joints)
+                self.stdout.write(
+                    f'{cable.number}: {cluster.start:.0f}–{cluster.end:.0f} м, центр {cluster.center:.1f} м, '
+                    f'заряд {cluster.charge:.1f} пКл, повторяемость {cluster.persistence:.0%}'
+                    + (f', рядом: {joints}' if joints else '')
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено линий: {len(results)}, очагов: {cluster_count}, из них рядом с муфтами: {joint_count}'
+        ))
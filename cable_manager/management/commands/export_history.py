@@ -0,0 +1,62 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from cable_manager.history_export import DATASETS, EXPORT_FORMATS, EXPORT_CHUNK_SIZE, export_rows, export_chunks
+from cable_manager.models import Enterprise
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка истории измерений ЧР, испытаний и аварий в файлы CSV / CSV.gz / Parquet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='Каталог для файлов выгрузки')
+        parser.add_argument('--enterprise', type=int, help='id предприятия (по умолчанию все)')
+        parser.add_argument('--dataset', action='append', choices=list(DATASETS),
+                            help='Набор данных (можно указать несколько раз, по умолчанию все)')
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv', help='Формат файлов')
+        parser.add_argument('--date-from', help='Начальная дата (ГГГГ-ММ-ДД)')
+        parser.add_argument('--date-to', help='Конечная дата (ГГГГ-ММ-ДД)')
+        parser.add_argument('--cable', action='append', help='Номер кабельной линии (можно несколько раз)')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                            help='Количество строк, читаемых из БД за один раз')
+
+    def handle(self, *args, **options):
+        enterprise = None
+        if options['enterprise'] is not None:
+            try:
+                enterprise = Enterprise.objects.get(pk=options['enterprise'])
+            except Enterprise.DoesNotExist:
+                raise CommandError(f"Предприятие {options['enterprise']} не найдено")
+
+        dates = {}
+        for name in ('date_from', 'date_to'):
+            value = options[name]
+            try:
+                dates[name] = parse_date(value) if value else None
+            except ValueError:
+                dates[name] = None
+            # parse_date возвращает None для строк не в формате ГГГГ-ММ-ДД
+            if value and dates[name] is None:
+                raise CommandError(f"Некорректная дата --{name.replace('_', '-')}: '{value}'")
+        date_from, date_to = dates['date_from'], dates['date_to']
+
+        os.makedirs(options['output_dir'], exist_ok=True)
+        _, extension = EXPORT_FORMATS[options['format']]
+
+        for dataset in options['dataset'] or list(DATASETS):
+            rows = export_rows(dataset, enterprise=enterprise, date_from=date_from, date_to=date_to,
+                               cable_numbers=options['cable'], chunk_size=options['chunk_size'])
+            path = os.path.join(options['output_dir'], f'{dataset}.{extension}')
+            try:
+                chunks = export_chunks(dataset, options['format'], rows)
+            except ValueError as e:
+                raise CommandError(str(e))
+
+            size = 0
+            with open(path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            self.stdout.write(self.style.SUCCESS(f'{dataset}: {path} ({size} байт)'))
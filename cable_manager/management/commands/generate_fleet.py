@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cable_manager.fleet_generator import generate_fleet, GENERATOR_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Генерация парка кабельных линий с историей измерений для нагрузочного тестирования'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enterprises', type=int, default=10, help='Количество предприятий')
+        parser.add_argument('--cables', type=int, default=100000, help='Количество кабельных линий (всего)')
+        parser.add_argument('--sessions', type=int, default=8,
+                            help='Среднее количество сессий измерений ЧР на линию')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Начальное значение генератора: при том же значении данные совпадают')
+        parser.add_argument('--prefix', default='НТ-', help='Префикс номеров линий и имён пользователей')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Количество процессов (предприятия генерируются параллельно)')
+        parser.add_argument('--batch-size', type=int, default=GENERATOR_BATCH_SIZE,
+                            help='Количество линий в одной транзакции')
+        parser.add_argument('--password', help='Пароль пользователей предприятий (без него вход невозможен)')
+
+    def handle(self, *args, **options):
+        if options['enterprises'] < 1 or options['cables'] < options['enterprises']:
+            raise CommandError('Нужно хотя бы одно предприятие и не меньше одной линии на предприятие')
+
+        try:
+            result = generate_fleet(
+                options['enterprises'], options['cables'], sessions_per_cable=options['sessions'],
+                seed=options['seed'], prefix=options['prefix'], workers=options['workers'],
+                batch_size=options['batch_size'], password=options['password'],
+            )
+        except ValueError as e:
+            raise CommandError(f'Генерация невозможна: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Предприятий: {result.enterprises}, линий: {result.cables}, сессий: {result.sessions}, '
+            f'измерений: {result.measurements}, испытаний: {result.tests}, аварий: {result.accidents}, '
+            f'замен муфт: {result.muff_changes}'
+        ))
+        self.stdout.write('Для расчёта признаков, трендов и оценок риска выполните rebuild_feature_store, '
+                          'compute_trends и rescore_cables')
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cable_manager.models import Enterprise
+from cable_manager.pd_import import import_measurements, IMPORT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Импорт измерений ЧР из CSV-файла испытательной установки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к CSV-файлу')
+        parser.add_argument('--enterprise', type=int,
+                            help='id предприятия: искать кабельные линии только среди его линий')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                            help='Количество строк в одном пакете вставки')
+
+    def handle(self, *args, **options):
+        enterprise = None
+        if options['enterprise'] is not None:
+            try:
+                enterprise = Enterprise.objects.get(pk=options['enterprise'])
+            except Enterprise.DoesNotExist:
+                raise CommandError(f"Предприятие {options['enterprise']} не найдено")
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as f:
+                result = import_measurements(f, enterprise=enterprise, batch_size=options['batch_size'])
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise CommandError(f'Не удалось импортировать файл: {e}')
+
+        for line, message in result.errors:
+            self.stderr.write(f'Строка {line}: {message}')
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'... и ещё {result.error_count - len(result.errors)} ошибок')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк: {result.rows}, сессий создано: {result.sessions_created}, '
+            f'измерений: {result.measurements_created}, ошибок: {result.error_count}'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from cable_manager.feature_store import rebuild_feature_store, REBUILD_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Перестройка хранилища векторов признаков сессий измерений ЧР'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE,
+                            help='Количество сессий в одном пакете')
+
+    def handle(self, *args, **options):
+        stored = rebuild_feature_store(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Хранилище признаков перестроено: {stored} векторов'))
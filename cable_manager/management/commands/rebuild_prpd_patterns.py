@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from cable_manager.prpd import rebuild_prpd_patterns, PRPD_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Перестройка фазовых образов ЧР (PRPD) по трассам импульсов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PRPD_BATCH_SIZE,
+                            help='Количество сессий в одном пакете')
+
+    def handle(self, *args, **options):
+        stored = rebuild_prpd_patterns(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Фазовые образы ЧР перестроены: {stored} сессий'))
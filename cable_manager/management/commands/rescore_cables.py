@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from cable_manager.ai_analyzer import CableAIAnalyzer, RESCORE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Полный пересчёт сохранённых оценок риска всех кабельных линий'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=RESCORE_BATCH_SIZE,
+                            help='Количество кабельных линий в одном пакете')
+
+    def handle(self, *args, **options):
+        CableAIAnalyzer().rescore_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Оценки риска пересчитаны'))
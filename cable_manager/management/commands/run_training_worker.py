@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cable_manager.training_jobs import claim_next_job, fail_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Воркер фонового обучения ИИ-модели: выполняет задачи из очереди TrainingJob'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить не более одной задачи и завершиться')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Пауза между проверками очереди (секунды)')
+
+    def handle(self, *args, **options):
+        while True:
+            failed = fail_stale_jobs()
+            if failed:
+                self.stdout.write(self.style.WARNING(f'Зависших задач помечено как ошибочные: {failed}'))
+
+            job = claim_next_job()
+            if job is not None:
+                self.stdout.write(f'Запуск обучения #{job.pk}')
+                job = run_job(job)
+                self.stdout.write(f'Обучение #{job.pk}: {job.get_status_display()} — {job.message}')
+
+            if options['once']:
+                return
+            if job is None:
+                time.sleep(options['poll_interval'])
@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cable_manager.startup import startup_report
+
+
+class Command(BaseCommand):
+    help = 'Отчёт о времени запуска процесса: django.setup(), импорт модулей и загрузка модели ИИ'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help='Сколько самых долгих импортов выводить')
+        parser.add_argument('--json', action='store_true', help='Вывести отчёт в JSON (для отслеживания регрессий)')
+        parser.add_argument('--max-setup-ms', type=float,
+                            help='Завершиться с ошибкой, если django.setup() и загрузка URL дольше (мс)')
+
+    def handle(self, *args, **options):
+        report = startup_report()
+        startup_ms = (report['setup'] + report['urls']) * 1000
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        else:
+            self.stdout.write(f"django.setup(): {report['setup'] * 1000:.0f} мс")
+            self.stdout.write(f"Загрузка URL и представлений: {report['urls'] * 1000:.0f} мс")
+            self.stdout.write("Первое обращение к ИИ:")
+            for name, seconds in report['first_use'].items():
+                self.stdout.write(f"  {'загрузка модели' if name == 'model' else name}: {seconds * 1000:.0f} мс")
+
+            self.stdout.write(f"Самые долгие импорты (накопительно, {options['top']}):")
+            imports = sorted(report['imports'].items(), key=lambda item: item[1][1], reverse=True)
+            for module, (own, cumulative) in imports[:options['top']]:
+                self.stdout.write(f"  {module}: {cumulative * 1000:.1f} мс (собственное {own * 1000:.1f} мс)")
+
+        if report['heavy_at_start']:
+            self.stdout.write(self.style.WARNING(
+                f"При запуске загружены тяжёлые модули: {', '.join(report['heavy_at_start'])}"))
+        if options['max_setup_ms'] is not None and startup_ms > options['max_setup_ms']:
+            raise CommandError(f"Запуск занял {startup_ms:.0f} мс, допустимо {options['max_setup_ms']:.0f} мс")
+        if not options['json']:
+            self.stdout.write(self.style.SUCCESS(f"Запуск процесса: {startup_ms:.0f} мс"))
@@ -0,0 +1,278 @@
+import bisect
+import glob
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.apps import apps
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Каталог файлов с показателями процессов, как часто процесс переписывает свой файл (секунды),
+# через сколько секунд удалять файлы, которые давно не обновлялись, и как долго кэшировать число строк
+METRICS_DIR = getattr(settings, 'CABLE_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'cable_manager_metrics'))
+WRITE_INTERVAL = getattr(settings, 'CABLE_METRICS_WRITE_INTERVAL', 5.0)
+FILE_TTL = getattr(settings, 'CABLE_METRICS_FILE_TTL', 7 * 24 * 3600)
+ROW_COUNT_TTL = getattr(settings, 'CABLE_METRICS_ROW_COUNT_TTL', 60.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TRAINING_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+SAMPLE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Гистограмма Prometheus: счётчики по корзинам, сумма и количество наблюдений для каждого набора меток"""
+
+    type = 'histogram'
+
+    def __init__(self, collector, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.collector = collector
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+        collector.register(self)
+
+    def empty(self):
+        # Счётчики корзин (не накопительные), сумма, количество
+        return [0] * len(self.buckets) + [0.0, 0]
+
+    def observe(self, value, **labels):
+        # NaN не попадает ни в одну корзину и испортил бы сумму, такое наблюдение пропускается
+        if math.isnan(value):
+            return
+        key = tuple(str(labels[name]) for name in self.labels)
+        # Первая корзина с границей не меньше значения (границы включаются, последняя — +Inf)
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self.collector.lock:
+            values = self.collector.series(self).setdefault(key, self.empty())
+            values[bucket] += 1
+            values[-2] += value
+            values[-1] += 1
+        self.collector.write_if_due()
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self, series):
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                yield (f'{self.name}_bucket{format_labels(self.labels, key, [("le", format_value(bound))])} '
+                       f'{cumulative}')
+            yield f'{self.name}_sum{format_labels(self.labels, key)} {format_value(values[-2])}'
+            yield f'{self.name}_count{format_labels(self.labels, key)} {values[-1]}'
+
+
+class MetricsCollector:
+    """Показатели процесса с общим представлением для всех воркеров.
+
+    Каждый процесс копит показатели в памяти и не чаще раза в WRITE_INTERVAL секунд
+    атомарно переписывает свой файл metrics-<pid>.json в METRICS_DIR; страница
+    показателей суммирует файлы всех процессов (вместо своего — текущие значения из памяти).
+    Файлы завершившихся процессов остаются, чтобы накопленные значения не уменьшались;
+    при развёртывании каталог можно очистить.
+    """
+
+    def __init__(self, directory=METRICS_DIR, write_interval=WRITE_INTERVAL):
+        self.directory = directory
+        self.write_interval = write_interval
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self._series = {}
+        self._pid = os.getpid()
+        self._written_at = time.monotonic()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def series(self, metric):
+        # После fork (gunicorn --preload) процесс начинает с нуля: значения мастера остаются в его файле
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._series = {}
+        return self._series.setdefault(metric.name, {})
+
+    def path(self, pid=None):
+        return os.path.join(self.directory, f'metrics-{pid or os.getpid()}.json')
+
+    def snapshot(self):
+        with self.lock:
+            if os.getpid() != self._pid:
+                return {}
+            return {name: [[list(key), list(values)] for key, values in series.items()]
+                    for name, series in self._series.items()}
+
+    def write(self):
+        """Атомарная запись показателей процесса в его файл"""
+        self._written_at = time.monotonic()
+        path = self.path()
+        tmp_path = f"{path}.tmp.{threading.get_ident()}"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Ошибка записи показателей: %s", e)
+
+    def write_if_due(self):
+        if time.monotonic() - self._written_at >= self.write_interval:
+            self.write()
+
+    def collect(self):
+        """Сумма показателей всех процессов: {имя: {метки: значения}}"""
+        snapshots = [self.snapshot()]
+        own_path = self.path()
+        now = time.time()
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            if path == own_path:
+                continue
+            try:
+                if now - os.path.getmtime(path) > FILE_TTL:
+                    os.remove(path)
+                    continue
+                with open(path, encoding='utf-8') as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+        total = {}
+        for snapshot in snapshots:
+            for name, series in snapshot.items():
+                merged = total.setdefault(name, {})
+                for key, values in series:
+                    key = tuple(key)
+                    if key in merged:
+                        merged[key] = [a + b for a, b in zip(merged[key], values)]
+                    else:
+                        merged[key] = list(values)
+        return total
+
+
+collector = MetricsCollector()
+
+request_latency = Histogram(
+    collector, 'cable_http_request_duration_seconds', 'Время ответа по имени маршрута',
+    labels=['url_name', 'method', 'status'],
+)
+predict_latency = Histogram(
+    collector, 'cable_ai_predict_duration_seconds',
+    'Время прогноза риска: single — predict_risk, batch — predict_risk_batch',
+    labels=['operation'],
+)
+predict_rows = Histogram(
+    collector, 'cable_ai_predict_rows', 'Количество кабельных линий в пакете прогноза',
+    buckets=(1, 10, 100, 1000, 10000, 100000),
+)
+training_duration = Histogram(
+    collector, 'cable_ai_training_duration_seconds', 'Длительность train_model по итоговому режиму',
+    labels=['mode'], buckets=TRAINING_BUCKETS,
+)
+training_samples = Histogram(
+    collector, 'cable_ai_training_samples', 'Количество образцов в выборке обучения',
+    labels=['mode'], buckets=SAMPLE_BUCKETS,
+)
+model_load_duration = Histogram(
+    collector, 'cable_ai_model_load_duration_seconds', 'Время загрузки модели в процесс',
+    labels=['source'],
+)
+
+_row_counts = {'checked_at': None, 'counts': {}}
+
+
+def row_counts():
+    """Количество строк по моделям приложения (кэшируется на ROW_COUNT_TTL секунд)"""
+    checked_at = _row_counts['checked_at']
+    if checked_at is None or time.monotonic() - checked_at >= ROW_COUNT_TTL:
+        _row_counts['counts'] = {
+            model.__name__: model.objects.count()
+            for model in apps.get_app_config('cable_manager').get_models()
+        }
+        _row_counts['checked_at'] = time.monotonic()
+    return _row_counts['counts']
+
+
+def render():
+    """Показатели в текстовом формате Prometheus"""
+    collector.write()
+    totals = collector.collect()
+    lines = []
+    for name, metric in collector.metrics.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        lines.extend(metric.render(totals.get(name, {})))
+
+    lines.append('# HELP cable_rows Количество строк в таблицах')
+    lines.append('# TYPE cable_rows gauge')
+    for model_name, count in sorted(row_counts().items()):
+        lines.append(f'cable_rows{format_labels(["model"], [model_name])} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """Время ответа по имени маршрута (гистограмма request_latency)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, started)
+        return response
+
+    def observe(self, request, response, started):
+        match = request.resolver_match
+        request_latency.observe(
+            time.perf_counter() - started,
+            url_name=match.url_name or match.view_name if match is not None else 'не найдено',
+            method=request.method,
+            status=response.status_code,
+        )
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cable_manager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CableRiskScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('risk_level', models.CharField(max_length=50, verbose_name='Уровень риска')),
+                ('probability', models.FloatField(default=0, verbose_name='Вероятность аварии')),
+                ('model_version', models.CharField(blank=True, max_length=50, verbose_name='Версия модели')),
+                ('scored_at', models.DateTimeField(verbose_name='Дата расчёта')),
+                ('cable_line', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='risk_score', to='cable_manager.cableline', verbose_name='Кабельная линия')),
+            ],
+            options={
+                'verbose_name': 'Оценка риска',
+                'verbose_name_plural': 'Оценки риска',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cable_manager', '0002_cableriskscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionFeatureVector',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('schema_version', models.PositiveSmallIntegerField(verbose_name='Версия схемы признаков')),
+                ('vector', models.BinaryField(verbose_name='Вектор признаков (float64)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата расчёта')),
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='feature_vector', to='cable_manager.pddmeasurementsession', verbose_name='Сессия измерений')),
+            ],
+            options={
+                'verbose_name': 'Вектор признаков сессии',
+                'verbose_name_plural': 'Векторы признаков сессий',
+            },
+        ),
+    ]
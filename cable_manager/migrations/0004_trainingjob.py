@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cable_manager', '0003_sessionfeaturevector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('succeeded', 'Завершено'), ('failed', 'Ошибка')], db_index=True, default='queued', max_length=20, verbose_name='Статус')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='Прогресс (%)')),
+                ('message', models.CharField(blank=True, max_length=255, verbose_name='Сообщение')),
+                ('model_version', models.CharField(blank=True, max_length=50, verbose_name='Версия модели')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата постановки в очередь')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начало обучения')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Окончание обучения')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Запустил')),
+            ],
+            options={
+                'verbose_name': 'Задача обучения модели',
+                'verbose_name_plural': 'Задачи обучения модели',
+            },
+        ),
+    ]
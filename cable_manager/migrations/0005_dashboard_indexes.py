@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cable_manager', '0004_trainingjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cableline',
+            index=models.Index(fields=['enterprise', 'number'], name='cable_ent_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cableline',
+            index=models.Index(fields=['enterprise', 'commissioning_date', 'id'], name='cable_ent_commissioning_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cableline',
+            index=models.Index(fields=['enterprise', 'cable_brand'], name='cable_ent_brand_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cableline',
+            index=models.Index(fields=['enterprise', 'core_count'], name='cable_ent_cores_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cableriskscore',
+            index=models.Index(fields=['risk_level'], name='risk_score_level_idx'),
+        ),
+    ]
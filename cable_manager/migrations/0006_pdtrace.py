@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:32
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cable_manager', '0005_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PDTrace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('voltage_level', models.FloatField(validators=[django.core.validators.MinValueValidator(0.0)], verbose_name='Уровень напряжения (кВ)')),
+                ('core', models.PositiveSmallIntegerField(choices=[(1, 'Жила 1'), (2, 'Жила 2'), (3, 'Жила 3')], verbose_name='Жила')),
+                ('pulse_count', models.PositiveIntegerField(verbose_name='Количество импульсов')),
+                ('data', models.BinaryField(blank=True, null=True, verbose_name='Импульсы (float32: заряд, расстояние, фаза)')),
+                ('file_path', models.CharField(blank=True, max_length=255, verbose_name='Файл импульсов')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания записи')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='traces', to='cable_manager.pddmeasurementsession', verbose_name='Сессия измерений')),
+            ],
+            options={
+                'verbose_name': 'Трасса импульсов ЧР',
+                'verbose_name_plural': 'Трассы импульсов ЧР',
+                'constraints': [models.UniqueConstraint(fields=('session', 'voltage_level', 'core'), name='unique_pd_trace_step')],
+            },
+        ),
+    ]
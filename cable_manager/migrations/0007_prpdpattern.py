@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cable_manager', '0006_pdtrace'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PRPDPattern',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('schema_version', models.PositiveSmallIntegerField(verbose_name='Версия схемы')),
+                ('pulse_count', models.PositiveIntegerField(verbose_name='Количество импульсов')),
+                ('histogram', models.BinaryField(verbose_name='Гистограмма фаза × заряд (uint32)')),
+                ('features', models.BinaryField(verbose_name='Статистики образа (float64)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата расчёта')),
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='prpd_pattern', to='cable_manager.pddmeasurementsession', verbose_name='Сессия измерений')),
+            ],
+            options={
+                'verbose_name': 'Фазовый образ ЧР',
+                'verbose_name_plural': 'Фазовые образы ЧР',
+            },
+        ),
+    ]
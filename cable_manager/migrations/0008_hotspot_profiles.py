@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:38
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cable_manager', '0007_prpdpattern'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cableline',
+            name='connect_muff_1_position',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0.0)], verbose_name='Расстояние до 1-й соединительной муфты (м)'),
+        ),
+        migrations.AddField(
+            model_name='cableline',
+            name='connect_muff_2_position',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0.0)], verbose_name='Расстояние до 2-й соединительной муфты (м)'),
+        ),
+        migrations.AddField(
+            model_name='cableline',
+            name='connect_muff_3_position',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0.0)], verbose_name='Расстояние до 3-й соединительной муфты (м)'),
+        ),
+        migrations.CreateModel(
+            name='CableHotSpotProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('schema_version', models.PositiveSmallIntegerField(verbose_name='Версия схемы')),
+                ('bin_length', models.FloatField(verbose_name='Длина интервала (м)')),
+                ('session_count', models.PositiveIntegerField(default=0, verbose_name='Количество сессий')),
+                ('weights', models.BinaryField(verbose_name='Суммарный заряд по интервалам (float64)')),
+                ('hits', models.BinaryField(verbose_name='Количество сессий с ЧР по интервалам (uint32)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('cable_line', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='hotspot_profile', to='cable_manager.cableline', verbose_name='Кабельная линия')),
+            ],
+            options={
+                'verbose_name': 'Профиль мест ЧР',
+                'verbose_name_plural': 'Профили мест ЧР',
+            },
+        ),
+        migrations.CreateModel(
+            name='SessionHotSpotBins',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bins', models.BinaryField(verbose_name='Номера интервалов (uint32)')),
+                ('weights', models.BinaryField(verbose_name='Заряд по интервалам (float64)')),
+                ('cable_line', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cable_manager.cableline', verbose_name='Кабельная линия')),
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='hotspot_bins', to='cable_manager.pddmeasurementsession', verbose_name='Сессия измерений')),
+            ],
+            options={
+                'verbose_name': 'Вклад сессии в профиль мест ЧР',
+                'verbose_name_plural': 'Вклады сессий в профили мест ЧР',
+            },
+        ),
+    ]
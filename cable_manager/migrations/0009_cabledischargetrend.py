@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cable_manager', '0008_hotspot_profiles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CableDischargeTrend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('core', models.PositiveSmallIntegerField(choices=[(1, 'Жила 1'), (2, 'Жила 2'), (3, 'Жила 3')], verbose_name='Жила')),
+                ('growth_rate', models.FloatField(verbose_name='Относительный рост ЧР (в год)')),
+                ('slope', models.FloatField(verbose_name='Наклон ЧР по последним сессиям (пКл/год)')),
+                ('acceleration', models.FloatField(verbose_name='Ускорение роста ЧР (пКл/год²)')),
+                ('session_count', models.PositiveIntegerField(verbose_name='Сессий в окне')),
+                ('last_session_date', models.DateField(verbose_name='Дата последней сессии')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Дата расчёта')),
+                ('cable_line', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='discharge_trends', to='cable_manager.cableline', verbose_name='Кабельная линия')),
+            ],
+            options={
+                'verbose_name': 'Тренд ЧР',
+                'verbose_name_plural': 'Тренды ЧР',
+                'constraints': [models.UniqueConstraint(fields=('cable_line', 'core'), name='unique_discharge_trend_core')],
+            },
+        ),
+    ]
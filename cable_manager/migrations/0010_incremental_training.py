@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cable_manager', '0009_cabledischargetrend'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=50, unique=True, verbose_name='Версия модели')),
+                ('mode', models.CharField(choices=[('full', 'Полное обучение'), ('incremental', 'Дообучение'), ('synthetic', 'Демонстрационные данные')], max_length=20, verbose_name='Режим обучения')),
+                ('parent_version', models.CharField(blank=True, max_length=50, verbose_name='Предыдущая версия')),
+                ('base_version', models.CharField(blank=True, max_length=50, verbose_name='Версия последнего полного обучения')),
+                ('trained_at', models.DateTimeField(verbose_name='Дата обучения')),
+                ('data_watermark', models.DateTimeField(blank=True, null=True, verbose_name='Данные учтены по состоянию на')),
+                ('sample_count', models.PositiveIntegerField(default=0, verbose_name='Образцов в выборке')),
+                ('trained_sample_count', models.PositiveIntegerField(default=0, verbose_name='Образцов в обучении версии')),
+                ('new_sample_count', models.PositiveIntegerField(default=0, verbose_name='Новых и изменённых образцов')),
+                ('tree_count', models.PositiveIntegerField(default=0, verbose_name='Деревьев в ансамбле')),
+                ('extra_features', models.CharField(blank=True, max_length=255, verbose_name='Дополнительные признаки')),
+            ],
+            options={
+                'verbose_name': 'Версия модели ИИ',
+                'verbose_name_plural': 'Версии модели ИИ',
+            },
+        ),
+        migrations.AddField(
+            model_name='trainingjob',
+            name='mode',
+            field=models.CharField(choices=[('auto', 'Автоматически'), ('full', 'Полное переобучение'), ('incremental', 'Дообучение на новых данных')], default='auto', max_length=20, verbose_name='Режим обучения'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cable_manager', '0010_incremental_training'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelversion',
+            name='precision',
+            field=models.FloatField(blank=True, null=True, verbose_name='Точность по авариям'),
+        ),
+        migrations.AddField(
+            model_name='modelversion',
+            name='recall',
+            field=models.FloatField(blank=True, null=True, verbose_name='Полнота по авариям'),
+        ),
+        migrations.AddField(
+            model_name='modelversion',
+            name='roc_auc',
+            field=models.FloatField(blank=True, null=True, verbose_name='ROC-AUC (проверка во времени)'),
+        ),
+        migrations.AlterField(
+            model_name='modelversion',
+            name='mode',
+            field=models.CharField(choices=[('full', 'Полное обучение'), ('incremental', 'Дообучение'), ('search', 'Подбор параметров'), ('synthetic', 'Демонстрационные данные')], max_length=20, verbose_name='Режим обучения'),
+        ),
+        migrations.AlterField(
+            model_name='trainingjob',
+            name='mode',
+            field=models.CharField(choices=[('auto', 'Автоматически'), ('full', 'Полное переобучение'), ('incremental', 'Дообучение на новых данных'), ('search', 'Подбор параметров')], default='auto', max_length=20, verbose_name='Режим обучения'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cable_manager', '0011_model_evaluation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accident',
+            index=models.Index(fields=['cable_line', 'accident_date'], name='accident_cable_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='highvoltagetest',
+            index=models.Index(fields=['cable_line', 'test_date'], name='test_cable_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pddmeasurementsession',
+            index=models.Index(fields=['cable_line', 'session_date'], name='session_cable_date_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cable_manager', '0012_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(max_length=200, verbose_name='Представление')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.CharField(max_length=500, verbose_name='Адрес')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Код ответа')),
+                ('duration', models.FloatField(verbose_name='Время (с)')),
+                ('query_count', models.PositiveIntegerField(verbose_name='SQL-запросов')),
+                ('sql_time', models.FloatField(verbose_name='Время SQL (с)')),
+                ('stats', models.TextField(verbose_name='Статистика cProfile')),
+                ('created_at', models.DateTimeField(verbose_name='Дата запроса')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса (cProfile)',
+                'verbose_name_plural': 'Профили запросов (cProfile)',
+            },
+        ),
+        migrations.CreateModel(
+            name='ViewProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(max_length=200, verbose_name='Представление')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('period', models.DateTimeField(verbose_name='Час')),
+                ('request_count', models.PositiveIntegerField(default=0, verbose_name='Запросов')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='Ответов с ошибкой (5xx)')),
+                ('total_time', models.FloatField(default=0, verbose_name='Суммарное время (с)')),
+                ('max_time', models.FloatField(default=0, verbose_name='Максимальное время (с)')),
+                ('query_count', models.PositiveIntegerField(default=0, verbose_name='SQL-запросов всего')),
+                ('max_queries', models.PositiveIntegerField(default=0, verbose_name='Максимум SQL-запросов')),
+                ('sql_time', models.FloatField(default=0, verbose_name='Суммарное время SQL (с)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Профиль представления',
+                'verbose_name_plural': 'Профили представлений',
+                'constraints': [models.UniqueConstraint(fields=('view_name', 'method', 'period'), name='unique_view_profile_period')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:18
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_active_job(apps, schema_editor):
+    """Отметка получает самая ранняя активная задача, лишние активные задачи снимаются"""
+    TrainingJob = apps.get_model('cable_manager', 'TrainingJob')
+    active = list(TrainingJob.objects.filter(status__in=['queued', 'running']).order_by('created_at', 'pk'))
+    if not active:
+        return
+    TrainingJob.objects.filter(pk=active[0].pk).update(active_slot=True)
+    TrainingJob.objects.filter(pk__in=[job.pk for job in active[1:]]).update(
+        status='failed', message="Повторная задача снята из очереди", finished_at=timezone.now(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cable_manager', '0014_training_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingjob',
+            name='active_slot',
+            field=models.BooleanField(blank=True, editable=False, null=True, unique=True, verbose_name='Активная задача'),
+        ),
+        migrations.RunPython(mark_active_job, migrations.RunPython.noop),
+    ]
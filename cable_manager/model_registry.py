@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+import joblib
+from django.conf import settings
+
+from .compiled_model import load_compiled_model
+from .metrics import model_load_duration
+
+
+LoadedModel = namedtuple('LoadedModel', ['model', 'scaler', 'version', 'extra_features'])
+
+
+def atomic_dump(obj, path):
+    """Запись pickle через временный файл, чтобы читатели не видели недописанный файл"""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def atomic_write_json(data, path):
+    """Атомарная запись JSON-файла"""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    """Общий для процесса реестр обученной модели.
+
+    Модель и масштабатор загружаются с диска один раз на процесс и отдаются всем
+    запросам из памяти. Не чаще чем раз в check_interval секунд реестр сверяет
+    отметку файлов (mtime + версия из файла метаданных) и при появлении новой модели
+    загружает её и подменяет целиком одной операцией присваивания.
+
+    Если рядом с моделью есть скомпилированная копия той же версии (compiled_path,
+    см. compiled_model), для прогноза загружается она и scikit-learn в процессе
+    не импортируется; исходные модели scikit-learn нужны только для обучения (estimators).
+    """
+
+    def __init__(self, model_path, scaler_path, metadata_path, compiled_path=None, check_interval=5.0):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.metadata_path = metadata_path
+        self.compiled_path = compiled_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._loaded = None
+        self._stamp = None
+        self._checked_at = None
+
+    def get(self):
+        """Текущая модель (LoadedModel) или None, если модель не обучена"""
+        checked_at = self._checked_at
+        if checked_at is not None and time.monotonic() - checked_at < self.check_interval:
+            return self._loaded
+
+        with self._lock:
+            stamp = self._read_stamp()
+            if stamp != self._stamp:
+                self._load(stamp)
+            self._checked_at = time.monotonic()
+            return self._loaded
+
+    def reload(self):
+        """Принудительная перезагрузка модели с диска"""
+        with self._lock:
+            self._load(self._read_stamp())
+            self._checked_at = time.monotonic()
+            return self._loaded
+
+    def publish(self, model, scaler, version, extra_features=()):
+        """Публикация только что сохранённой модели без повторного чтения с диска"""
+        with self._lock:
+            self._loaded = LoadedModel(model, scaler, version, list(extra_features))
+            self._stamp = self._read_stamp()
+            self._checked_at = time.monotonic()
+
+    def stored_version(self):
+        """Версия модели, сохранённой на диске (None, если модели нет)"""
+        stamp = self._read_stamp()
+        if stamp[0] is None or stamp[1] is None:
+            return None
+        return self._version(stamp)
+
+    def estimators(self, version):
+        """Исходные модель и масштабатор scikit-learn версии version (или None)"""
+        if version is None or self.stored_version() != version:
+            return None
+        try:
+            return joblib.load(self.model_path), joblib.load(self.scaler_path)
+        except Exception as e:
+            print(f"Ошибка загрузки модели: {e}")
+            return None
+
+    def metadata(self):
+        """Метаданные сохранённой модели"""
+        try:
+            with open(self.metadata_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _read_stamp(self):
+        stamp = []
+        for path in (self.model_path, self.scaler_path, self.metadata_path, self.compiled_path):
+            if path is None:
+                stamp.append(None)
+                continue
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _load(self, stamp):
+        if stamp[0] is None or stamp[1] is None:
+            self._loaded = None
+            self._stamp = stamp
+            return
+
+        metadata = self.metadata()
+        version = self._version(stamp, metadata)
+        started = time.perf_counter()
+        try:
+            compiled = self._load_compiled(stamp, version)
+            if compiled is not None:
+                model, scaler = compiled
+            else:
+                model = joblib.load(self.model_path)
+                scaler = joblib.load(self.scaler_path)
+        except Exception as e:
+            print(f"Ошибка загрузки модели: {e}")
+            self._loaded = None
+            self._stamp = stamp
+            return
+
+        model_load_duration.observe(time.perf_counter() - started,
+                                    source='compiled' if compiled is not None else 'pickle')
+        # Если файлы сменились во время чтения, перечитаем их при следующей проверке
+        self._stamp = stamp if self._read_stamp() == stamp else None
+        # Модели, обученные до появления дополнительных признаков, метаданных о них не содержат
+        self._loaded = LoadedModel(model, scaler, version, metadata.get('extra_features', []))
+        print(f"Модель загружена (версия {version}{', скомпилированная' if compiled is not None else ''})")
+
+    def _version(self, stamp, metadata=None):
+        if metadata is None:
+            metadata = self.metadata()
+        return metadata.get('version') or str(stamp[0])
+
+    def _load_compiled(self, stamp, version):
+        """Скомпилированная модель той же версии, что и исходная (или None)"""
+        if stamp[3] is None:
+            return None
+        try:
+            forest, scaler, compiled_version = load_compiled_model(self.compiled_path)
+        except Exception as e:
+            print(f"Скомпилированная модель не загружена: {e}")
+            return None
+        if compiled_version != version:
+            return None
+        return forest, scaler
+
+
+registry = ModelRegistry(
+    model_path=os.path.join(settings.BASE_DIR, 'cable_ai_model.pkl'),
+    scaler_path=os.path.join(settings.BASE_DIR, 'cable_scaler.pkl'),
+    metadata_path=os.path.join(settings.BASE_DIR, 'cable_ai_model.json'),
+    compiled_path=os.path.join(settings.BASE_DIR, 'cable_ai_model.npz'),
+    check_interval=getattr(settings, 'CABLE_AI_MODEL_CHECK_INTERVAL', 5.0),
+)
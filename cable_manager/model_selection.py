@@ -0,0 +1,188 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import ParameterSampler
+from sklearn.preprocessing import StandardScaler
+
+
+# Параметры случайного леса, которые использовались до подбора
+DEFAULT_MODEL_PARAMS = {
+    'n_estimators': 50,
+    'max_depth': 5,
+    'min_samples_leaf': 1,
+    'class_weight': None,
+}
+
+# Пространство поиска гиперпараметров
+PARAM_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [3, 5, 8, 12, None],
+    'min_samples_leaf': [1, 2, 5],
+    'class_weight': [None, 'balanced'],
+}
+
+
+# Порог вероятности для точности и полноты по авариям (как у model.predict)
+DECISION_THRESHOLD = 0.5
+
+
+def cv_folds():
+    """Число проверочных блоков (CABLE_AI_CV_FOLDS)"""
+    return getattr(settings, 'CABLE_AI_CV_FOLDS', 4)
+
+
+def search_candidate_count():
+    """Число кандидатов подбора (CABLE_AI_SEARCH_CANDIDATES)"""
+    return getattr(settings, 'CABLE_AI_SEARCH_CANDIDATES', 12)
+
+
+def search_budget():
+    """Бюджет времени подбора в секундах (CABLE_AI_SEARCH_BUDGET)"""
+    return getattr(settings, 'CABLE_AI_SEARCH_BUDGET', 300)
+
+
+def search_workers():
+    """Число процессов подбора (CABLE_AI_SEARCH_WORKERS, по умолчанию — число ядер)"""
+    return getattr(settings, 'CABLE_AI_SEARCH_WORKERS', None) or os.cpu_count() or 1
+
+
+def time_series_folds(dates, labels, n_splits=None, gap=None):
+    """Разбиения выборки для проверки во времени (расширяющееся окно).
+
+    Даты сессий делятся на n_splits + 1 последовательных блоков; в k-м разбиении
+    модель обучается на сессиях раньше блока k + 1 и проверяется на нём. Сессии,
+    отстоящие от начала проверочного блока меньше чем на gap (горизонт прогноза),
+    из обучения исключаются: их метки зависят от аварий проверочного периода.
+    Разбиения, где в обучении или проверке нет обоих классов, отбрасываются.
+    Возвращает список пар (индексы обучения, индексы проверки).
+    """
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy()
+    labels = np.asarray(labels)
+    unique_dates = np.unique(dates)
+    n_splits = min(n_splits or cv_folds(), len(unique_dates) - 1)
+    if n_splits < 1:
+        return []
+
+    gap = np.timedelta64(gap or pd.Timedelta(0))
+    folds = []
+    for block in np.array_split(unique_dates, n_splits + 1)[1:]:
+        train = np.flatnonzero(dates < block[0] - gap)
+        test = np.flatnonzero((dates >= block[0]) & (dates <= block[-1]))
+        if len(np.unique(labels[train])) == 2 and len(np.unique(labels[test])) == 2:
+            folds.append((train, test))
+    return folds
+
+
+def search_candidates(current_params=None, count=None, random_state=42):
+    """Кандидаты поиска: текущие параметры, параметры по умолчанию и случайная выборка из PARAM_GRID"""
+    count = count or search_candidate_count()
+    candidates = []
+    for params in [current_params, DEFAULT_MODEL_PARAMS] + list(ParameterSampler(
+            PARAM_GRID, n_iter=count, random_state=random_state)):
+        if params and params not in candidates:
+            candidates.append(dict(params))
+    return candidates[:max(count, 1)]
+
+
+def build_model(params, n_jobs=None):
+    """Случайный лес с заданными гиперпараметрами"""
+    return RandomForestClassifier(random_state=42, min_samples_split=2, n_jobs=n_jobs, **params)
+
+
+# Данные обучения в процессе подбора: передаются один раз при запуске процесса, а не с каждой задачей
+_worker_data = None
+
+
+def _init_worker(features, labels):
+    global _worker_data
+    _worker_data = (features, labels)
+
+
+def _evaluate_fold(params, train, test):
+    """Вероятности аварии на проверочном блоке для модели, обученной на блоке обучения"""
+    features, labels = _worker_data
+    scaler = StandardScaler().fit(features[train])
+    model = build_model(params, n_jobs=1).fit(scaler.transform(features[train]), labels[train])
+    return model.predict_proba(scaler.transform(features[test]))[:, 1]
+
+
+def evaluation_metrics(labels, probabilities, folds):
+    """ROC-AUC (среднее по блокам), точность и полнота по авариям (по всем блокам)"""
+    fold_auc = [roc_auc_score(labels[test], probabilities[k]) for k, (_, test) in enumerate(folds)]
+    y_true = np.concatenate([labels[test] for _, test in folds])
+    y_pred = (np.concatenate(probabilities) >= DECISION_THRESHOLD).astype(int)
+    return {
+        'roc_auc': float(np.mean(fold_auc)),
+        'fold_roc_auc': [float(value) for value in fold_auc],
+        'precision': float(precision_score(y_true, y_pred, zero_division=0)),
+        'recall': float(recall_score(y_true, y_pred, zero_division=0)),
+    }
+
+
+def search_parameters(features, labels, folds, candidates, budget=None, workers=None, progress=None):
+    """Оценка кандидатов на разбиениях folds параллельно в пуле процессов.
+
+    По умолчанию budget — search_budget(), workers — search_workers().
+    Задачи (кандидат, блок) ставятся в очередь по порядку кандидатов, поэтому первые
+    кандидаты оцениваются раньше. По истечении budget секунд незапущенные задачи
+    отменяются, а уже запущенные дорабатывают до возврата из функции, чтобы не занимать
+    ядра во время обучения итоговой модели; кандидаты, оценённые не на всех блоках,
+    в результат не попадают. Процессы пула запускаются через spawn: fork процесса
+    с потоками (например, потоком сигналов задачи обучения) небезопасен.
+    progress(оценено, всего) вызывается по мере оценки кандидатов.
+    Возвращает (результаты от лучшего к худшему, исчерпан ли бюджет).
+    """
+    deadline = time.monotonic() + (search_budget() if budget is None else budget)
+    workers = workers or search_workers()
+    probabilities = [[None] * len(folds) for _ in candidates]
+
+    def completed(index):
+        return all(value is not None for value in probabilities[index])
+
+    if workers == 1:
+        _init_worker(features, labels)
+        for i, params in enumerate(candidates):
+            for k, (train, test) in enumerate(folds):
+                if time.monotonic() > deadline:
+                    break
+                probabilities[i][k] = _evaluate_fold(params, train, test)
+            if progress is not None:
+                progress(i + 1, len(candidates))
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_worker, initargs=(features, labels))
+        try:
+            futures = {
+                executor.submit(_evaluate_fold, params, train, test): (i, k)
+                for i, params in enumerate(candidates)
+                for k, (train, test) in enumerate(folds)
+            }
+            pending = set(futures)
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, k = futures[future]
+                    probabilities[i][k] = future.result()
+                    if progress is not None and completed(i):
+                        progress(sum(completed(j) for j in range(len(candidates))), len(candidates))
+        finally:
+            # Незапущенные задачи отменяются, выполняющиеся дорабатывают (их результат не используется)
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    results = []
+    for i, params in enumerate(candidates):
+        if completed(i):
+            results.append({'params': params, 'probabilities': probabilities[i],
+                            **evaluation_metrics(labels, probabilities[i], folds)})
+    results.sort(key=lambda result: result['roc_auc'], reverse=True)
+    return results, len(results) < len(candidates)
@@ -37,6 +37,12 @@ class CableLine(models.Model):
     connect_muff_1 = models.CharField(max_length=255, blank=True, null=True, verbose_name="1-я соединительная муфта")
     connect_muff_2 = models.CharField(max_length=255, blank=True, null=True, verbose_name="2-я соединительная муфта")
     connect_muff_3 = models.CharField(max_length=255, blank=True, null=True, verbose_name="3-я соединительная муфта")
+    connect_muff_1_position = models.FloatField(blank=True, null=True, validators=[MinValueValidator(0.0)],
+                                                verbose_name="Расстояние до 1-й соединительной муфты (м)")
+    connect_muff_2_position = models.FloatField(blank=True, null=True, validators=[MinValueValidator(0.0)],
+                                                verbose_name="Расстояние до 2-й соединительной муфты (м)")
+    connect_muff_3_position = models.FloatField(blank=True, null=True, validators=[MinValueValidator(0.0)],
+                                                verbose_name="Расстояние до 3-й соединительной муфты (м)")
     length = models.FloatField(validators=[MinValueValidator(0.0)], verbose_name="Длина кабеля (м)")
     core_count = models.PositiveIntegerField(verbose_name="Количество жил")
     commissioning_date = models.DateField(verbose_name="Дата ввода в эксплуатацию")
@@ -49,6 +55,13 @@ class CableLine(models.Model):
     class Meta:
         verbose_name = 'Кабельная линия'
         verbose_name_plural = 'Кабельные линии'
+        indexes = [
+            # Сортировки, фильтры и поиск по префиксу на дашборде предприятия
+            models.Index(fields=['enterprise', 'number'], name='cable_ent_number_idx'),
+            models.Index(fields=['enterprise', 'commissioning_date', 'id'], name='cable_ent_commissioning_idx'),
+            models.Index(fields=['enterprise', 'cable_brand'], name='cable_ent_brand_idx'),
+            models.Index(fields=['enterprise', 'core_count'], name='cable_ent_cores_idx'),
+        ]
 
 
 class MuffChangeLog(models.Model):
@@ -85,6 +98,10 @@ class PDDMeasurementSession(models.Model):
     class Meta:
         verbose_name = 'Сессия измерений ЧР'
         verbose_name_plural = 'Сессии измерений ЧР'
+        indexes = [
+            # История линии от новых к старым, последняя сессия линии и дата последнего измерения
+            models.Index(fields=['cable_line', 'session_date'], name='session_cable_date_idx'),
+        ]
 
 
 class SinglePDMeasurement(models.Model):
@@ -120,6 +137,9 @@ class HighVoltageTest(models.Model):
     class Meta:
         verbose_name = 'Высоковольтное испытание'
         verbose_name_plural = 'Высоковольтные испытания'
+        indexes = [
+            models.Index(fields=['cable_line', 'test_date'], name='test_cable_date_idx'),
+        ]
 
 
 class Accident(models.Model):
@@ -141,4 +161,270 @@ class Accident(models.Model):
 
     class Meta:
         verbose_name = 'Авария'
-        verbose_name_plural = 'Аварии'
\ No newline at end of file
+        verbose_name_plural = 'Аварии'
+        indexes = [
+            # История аварий линии и поиск ближайшей аварии после измерений
+            models.Index(fields=['cable_line', 'accident_date'], name='accident_cable_date_idx'),
+        ]
+
+class CableRiskScore(models.Model):
+    cable_line = models.OneToOneField(CableLine, on_delete=models.CASCADE, related_name='risk_score',
+                                      verbose_name="Кабельная линия")
+    risk_level = models.CharField(max_length=50, verbose_name="Уровень риска")
+    probability = models.FloatField(default=0, verbose_name="Вероятность аварии")
+    model_version = models.CharField(max_length=50, blank=True, verbose_name="Версия модели")
+    scored_at = models.DateTimeField(verbose_name="Дата расчёта")
+
+    def __str__(self):
+        return f"Риск {self.cable_line.number}: {self.risk_level} ({self.probability:.1%})"
+
+    class Meta:
+        verbose_name = 'Оценка риска'
+        verbose_name_plural = 'Оценки риска'
+        indexes = [
+            models.Index(fields=['risk_level'], name='risk_score_level_idx'),
+        ]
+
+
+class SessionFeatureVector(models.Model):
+    session = models.OneToOneField(PDDMeasurementSession, on_delete=models.CASCADE, related_name='feature_vector',
+                                   verbose_name="Сессия измерений")
+    schema_version = models.PositiveSmallIntegerField(verbose_name="Версия схемы признаков")
+    vector = models.BinaryField(verbose_name="Вектор признаков (float64)")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата расчёта")
+
+    def __str__(self):
+        return f"Признаки сессии {self.session_id} (схема {self.schema_version})"
+
+    class Meta:
+        verbose_name = 'Вектор признаков сессии'
+        verbose_name_plural = 'Векторы признаков сессий'
+
+
+class TrainingJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUSES = [
+        (STATUS_QUEUED, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_SUCCEEDED, 'Завершено'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+    ACTIVE_STATUSES = [STATUS_QUEUED, STATUS_RUNNING]
+
+    MODE_AUTO = 'auto'
+    MODE_FULL = 'full'
+    MODE_INCREMENTAL = 'incremental'
+    MODE_SEARCH = 'search'
+    MODES = [
+        (MODE_AUTO, 'Автоматически'),
+        (MODE_FULL, 'Полное переобучение'),
+        (MODE_INCREMENTAL, 'Дообучение на новых данных'),
+        (MODE_SEARCH, 'Подбор параметров'),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUSES, default=STATUS_QUEUED, db_index=True,
+                              verbose_name="Статус")
+    mode = models.CharField(max_length=20, choices=MODES, default=MODE_AUTO, verbose_name="Режим обучения")
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name="Прогресс (%)")
+    message = models.CharField(max_length=255, blank=True, verbose_name="Сообщение")
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True,
+                                     verbose_name="Запустил")
+    model_version = models.CharField(max_length=50, blank=True, verbose_name="Версия модели")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата постановки в очередь")
+    started_at = models.DateTimeField(blank=True, null=True, verbose_name="Начало обучения")
+    heartbeat_at = models.DateTimeField(blank=True, null=True, verbose_name="Последний сигнал воркера")
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name="Окончание обучения")
+    # True у единственной задачи в очереди или выполняющейся, NULL у остальных: уникальный индекс
+    # не даёт одновременно поставить вторую задачу (NULL в уникальном индексе не сравниваются)
+    active_slot = models.BooleanField(blank=True, null=True, unique=True, editable=False,
+                                      verbose_name="Активная задача")
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    def __str__(self):
+        return f"Обучение #{self.pk} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = 'Задача обучения модели'
+        verbose_name_plural = 'Задачи обучения модели'
+
+
+class ModelVersion(models.Model):
+    MODES = [
+        ('full', 'Полное обучение'),
+        ('incremental', 'Дообучение'),
+        ('search', 'Подбор параметров'),
+        ('synthetic', 'Демонстрационные данные'),
+    ]
+
+    version = models.CharField(max_length=50, unique=True, verbose_name="Версия модели")
+    mode = models.CharField(max_length=20, choices=MODES, verbose_name="Режим обучения")
+    parent_version = models.CharField(max_length=50, blank=True, verbose_name="Предыдущая версия")
+    base_version = models.CharField(max_length=50, blank=True, verbose_name="Версия последнего полного обучения")
+    trained_at = models.DateTimeField(verbose_name="Дата обучения")
+    data_watermark = models.DateTimeField(blank=True, null=True, verbose_name="Данные учтены по состоянию на")
+    sample_count = models.PositiveIntegerField(default=0, verbose_name="Образцов в выборке")
+    trained_sample_count = models.PositiveIntegerField(default=0, verbose_name="Образцов в обучении версии")
+    new_sample_count = models.PositiveIntegerField(default=0, verbose_name="Новых и изменённых образцов")
+    tree_count = models.PositiveIntegerField(default=0, verbose_name="Деревьев в ансамбле")
+    extra_features = models.CharField(max_length=255, blank=True, verbose_name="Дополнительные признаки")
+    roc_auc = models.FloatField(blank=True, null=True, verbose_name="ROC-AUC (проверка во времени)")
+    precision = models.FloatField(blank=True, null=True, verbose_name="Точность по авариям")
+    recall = models.FloatField(blank=True, null=True, verbose_name="Полнота по авариям")
+
+    def __str__(self):
+        return f"Модель {self.version} ({self.get_mode_display()})"
+
+    class Meta:
+        verbose_name = 'Версия модели ИИ'
+        verbose_name_plural = 'Версии модели ИИ'
+
+
+class PDTrace(models.Model):
+    CORES = [
+        (1, 'Жила 1'),
+        (2, 'Жила 2'),
+        (3, 'Жила 3'),
+    ]
+
+    session = models.ForeignKey(PDDMeasurementSession, on_delete=models.CASCADE, related_name='traces',
+                                verbose_name="Сессия измерений")
+    voltage_level = models.FloatField(validators=[MinValueValidator(0.0)], verbose_name="Уровень напряжения (кВ)")
+    core = models.PositiveSmallIntegerField(choices=CORES, verbose_name="Жила")
+    pulse_count = models.PositiveIntegerField(verbose_name="Количество импульсов")
+    data = models.BinaryField(blank=True, null=True,
+                              verbose_name="Импульсы (float32: заряд, расстояние, фаза)")
+    file_path = models.CharField(max_length=255, blank=True, verbose_name="Файл импульсов")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания записи")
+
+    def __str__(self):
+        return f"Трасса ЧР жилы {self.core} при {self.voltage_level} кВ (сессия {self.session_id})"
+
+    class Meta:
+        verbose_name = 'Трасса импульсов ЧР'
+        verbose_name_plural = 'Трассы импульсов ЧР'
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'voltage_level', 'core'], name='unique_pd_trace_step'),
+        ]
+
+
+class PRPDPattern(models.Model):
+    session = models.OneToOneField(PDDMeasurementSession, on_delete=models.CASCADE, related_name='prpd_pattern',
+                                   verbose_name="Сессия измерений")
+    schema_version = models.PositiveSmallIntegerField(verbose_name="Версия схемы")
+    pulse_count = models.PositiveIntegerField(verbose_name="Количество импульсов")
+    histogram = models.BinaryField(verbose_name="Гистограмма фаза × заряд (uint32)")
+    features = models.BinaryField(verbose_name="Статистики образа (float64)")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата расчёта")
+
+    def __str__(self):
+        return f"Фазовый образ ЧР сессии {self.session_id}"
+
+    class Meta:
+        verbose_name = 'Фазовый образ ЧР'
+        verbose_name_plural = 'Фазовые образы ЧР'
+
+
+class CableHotSpotProfile(models.Model):
+    cable_line = models.OneToOneField(CableLine, on_delete=models.CASCADE, related_name='hotspot_profile',
+                                      verbose_name="Кабельная линия")
+    schema_version = models.PositiveSmallIntegerField(verbose_name="Версия схемы")
+    bin_length = models.FloatField(verbose_name="Длина интервала (м)")
+    session_count = models.PositiveIntegerField(default=0, verbose_name="Количество сессий")
+    weights = models.BinaryField(verbose_name="Суммарный заряд по интервалам (float64)")
+    hits = models.BinaryField(verbose_name="Количество сессий с ЧР по интервалам (uint32)")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    def __str__(self):
+        return f"Профиль мест ЧР линии {self.cable_line_id}"
+
+    class Meta:
+        verbose_name = 'Профиль мест ЧР'
+        verbose_name_plural = 'Профили мест ЧР'
+
+
+class SessionHotSpotBins(models.Model):
+    session = models.OneToOneField(PDDMeasurementSession, on_delete=models.CASCADE, related_name='hotspot_bins',
+                                   verbose_name="Сессия измерений")
+    cable_line = models.ForeignKey(CableLine, on_delete=models.CASCADE, verbose_name="Кабельная линия")
+    bins = models.BinaryField(verbose_name="Номера интервалов (uint32)")
+    weights = models.BinaryField(verbose_name="Заряд по интервалам (float64)")
+
+    def __str__(self):
+        return f"Вклад сессии {self.session_id} в профиль мест ЧР"
+
+    class Meta:
+        verbose_name = 'Вклад сессии в профиль мест ЧР'
+        verbose_name_plural = 'Вклады сессий в профили мест ЧР'
+
+
+class CableDischargeTrend(models.Model):
+    cable_line = models.ForeignKey(CableLine, on_delete=models.CASCADE, related_name='discharge_trends',
+                                   verbose_name="Кабельная линия")
+    core = models.PositiveSmallIntegerField(choices=PDTrace.CORES, verbose_name="Жила")
+    growth_rate = models.FloatField(verbose_name="Относительный рост ЧР (в год)")
+    slope = models.FloatField(verbose_name="Наклон ЧР по последним сессиям (пКл/год)")
+    acceleration = models.FloatField(verbose_name="Ускорение роста ЧР (пКл/год²)")
+    session_count = models.PositiveIntegerField(verbose_name="Сессий в окне")
+    last_session_date = models.DateField(verbose_name="Дата последней сессии")
+    computed_at = models.DateTimeField(auto_now=True, verbose_name="Дата расчёта")
+
+    def __str__(self):
+        return f"Тренд ЧР линии {self.cable_line_id}, жила {self.core}"
+
+    class Meta:
+        verbose_name = 'Тренд ЧР'
+        verbose_name_plural = 'Тренды ЧР'
+        constraints = [
+            models.UniqueConstraint(fields=['cable_line', 'core'], name='unique_discharge_trend_core'),
+        ]
+
+
+class ViewProfile(models.Model):
+    """Сводка времени ответа и запросов к базе по представлению за час"""
+    view_name = models.CharField(max_length=200, verbose_name="Представление")
+    method = models.CharField(max_length=10, verbose_name="Метод")
+    period = models.DateTimeField(verbose_name="Час")
+    request_count = models.PositiveIntegerField(default=0, verbose_name="Запросов")
+    error_count = models.PositiveIntegerField(default=0, verbose_name="Ответов с ошибкой (5xx)")
+    total_time = models.FloatField(default=0, verbose_name="Суммарное время (с)")
+    max_time = models.FloatField(default=0, verbose_name="Максимальное время (с)")
+    query_count = models.PositiveIntegerField(default=0, verbose_name="SQL-запросов всего")
+    max_queries = models.PositiveIntegerField(default=0, verbose_name="Максимум SQL-запросов")
+    sql_time = models.FloatField(default=0, verbose_name="Суммарное время SQL (с)")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    def __str__(self):
+        return f"{self.method} {self.view_name} ({self.period:%Y-%m-%d %H:00})"
+
+    class Meta:
+        verbose_name = 'Профиль представления'
+        verbose_name_plural = 'Профили представлений'
+        constraints = [
+            models.UniqueConstraint(fields=['view_name', 'method', 'period'], name='unique_view_profile_period'),
+        ]
+
+
+class ProfileSample(models.Model):
+    """Профиль cProfile выборочного запроса"""
+    view_name = models.CharField(max_length=200, verbose_name="Представление")
+    method = models.CharField(max_length=10, verbose_name="Метод")
+    path = models.CharField(max_length=500, verbose_name="Адрес")
+    status_code = models.PositiveSmallIntegerField(verbose_name="Код ответа")
+    duration = models.FloatField(verbose_name="Время (с)")
+    query_count = models.PositiveIntegerField(verbose_name="SQL-запросов")
+    sql_time = models.FloatField(verbose_name="Время SQL (с)")
+    stats = models.TextField(verbose_name="Статистика cProfile")
+    created_at = models.DateTimeField(verbose_name="Дата запроса")
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration * 1000:.0f} мс)"
+
+    class Meta:
+        verbose_name = 'Профиль запроса (cProfile)'
+        verbose_name_plural = 'Профили запросов (cProfile)'
@@ -0,0 +1,78 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .concurrency import run_query
+
+
+# Время хранения данных страниц и фрагментов шаблонов (секунды). Изменения данных предприятия
+# делают его кэш недействительным сразу (см. invalidate_enterprises), время ограничивает размер кэша
+PAGE_CACHE_TIMEOUT = getattr(settings, 'CABLE_PAGE_CACHE_TIMEOUT', 3600)
+
+KEY_PREFIX = 'cable_manager'
+
+
+def version_key(enterprise_id):
+    return f'{KEY_PREFIX}:enterprise:{enterprise_id}:version'
+
+
+def enterprise_version(enterprise_id):
+    """Текущая версия данных предприятия (случайная метка, меняется при каждом изменении)"""
+    version = cache.get(version_key(enterprise_id))
+    if version is None:
+        # add не перезапишет метку, которую одновременно создал другой процесс
+        cache.add(version_key(enterprise_id), uuid.uuid4().hex, timeout=None)
+        version = cache.get(version_key(enterprise_id))
+    return version
+
+
+def invalidate_enterprises(enterprise_ids):
+    """Сброс кэша страниц предприятий после фиксации транзакции.
+
+    Метка версии заменяется новой случайной (а не увеличивается), поэтому одновременные
+    сбросы из разных процессов не могут вернуть прежнее значение; старые записи
+    кэша перестают читаться и удаляются по истечении PAGE_CACHE_TIMEOUT.
+    """
+    enterprise_ids = {enterprise_id for enterprise_id in enterprise_ids if enterprise_id is not None}
+    if enterprise_ids:
+        transaction.on_commit(lambda: cache.set_many(
+            {version_key(enterprise_id): uuid.uuid4().hex for enterprise_id in enterprise_ids}, timeout=None,
+        ))
+
+
+def cache_version(enterprise_id, model_version=None):
+    """Составная версия для ключей кэша: данные предприятия и (для результатов ИИ) версия модели"""
+    version = enterprise_version(enterprise_id)
+    return version if model_version is None else f'{version}:{model_version}'
+
+
+def page_key(name, enterprise_id, version, *parts):
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'{KEY_PREFIX}:page:{name}:{enterprise_id}:{version}:{digest}'
+
+
+def cached_page_data(name, enterprise_id, version, build, *parts):
+    """Данные страницы из кэша или build() (результат сохраняется в кэше).
+
+    Ключ составляется из имени страницы, предприятия, версии (cache_version) и parts —
+    например, параметров запроса, от которых зависят данные.
+    """
+    key = page_key(name, enterprise_id, version, *parts)
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, PAGE_CACHE_TIMEOUT)
+    return data
+
+
+async def acached_page_data(name, enterprise_id, version, build, *parts):
+    """cached_page_data для асинхронных представлений: build — корутина, кэш читается в пуле запросов"""
+    key = page_key(name, enterprise_id, version, *parts)
+    data = await run_query(cache.get, key)
+    if data is None:
+        data = await build()
+        await run_query(cache.set, key, data, PAGE_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,69 @@
+import base64
+import json
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+KeysetPage = namedtuple('KeysetPage', ['items', 'next_cursor'])
+
+
+def encode_cursor(values):
+    """Непрозрачный курсор из значений полей сортировки последней записи"""
+    data = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, model, order_fields):
+    """Значения полей сортировки из курсора (None, если курсор пустой или повреждён)"""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        if not isinstance(values, list) or len(values) != len(order_fields):
+            return None
+        return [
+            model._meta.get_field(field.lstrip('-')).to_python(value)
+            for field, value in zip(order_fields, values)
+        ]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def keyset_filter(order_fields, values):
+    """Условие "строго после" записи с данными значениями полей сортировки.
+
+    Для сортировки (a, b) это (a > x) OR (a = x AND b > y); поля с префиксом "-"
+    сравниваются в обратную сторону. Такое условие использует составной индекс
+    по полям сортировки и не зависит от номера страницы, в отличие от OFFSET.
+    """
+    condition = Q()
+    for i, field in enumerate(order_fields):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        step = Q(**{f'{name}__{lookup}': values[i]})
+        for previous, value in zip(order_fields[:i], values[:i]):
+            step &= Q(**{previous.lstrip('-'): value})
+        condition |= step
+    return condition
+
+
+def keyset_page(queryset, order_fields, cursor=None, page_size=50):
+    """Страница выборки по курсору (keyset-пагинация).
+
+    Последнее поле order_fields должно быть уникальным (обычно id).
+    """
+    values = decode_cursor(cursor, queryset.model, order_fields)
+    queryset = queryset.order_by(*order_fields)
+    if values is not None:
+        queryset = queryset.filter(keyset_filter(order_fields, values))
+
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, field.lstrip('-')) for field in order_fields])
+
+    return KeysetPage(items, next_cursor)
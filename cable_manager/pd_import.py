@@ -0,0 +1,244 @@
+import csv
+import logging
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.utils.dateparse import parse_date
+
+from .models import CableLine, PDDMeasurementSession, SinglePDMeasurement
+from .page_cache import invalidate_enterprises
+
+
+logger = logging.getLogger(__name__)
+
+
+# Размер пакета строк файла: столько измерений вставляется одним bulk_create
+IMPORT_BATCH_SIZE = 1000
+
+# Сколько ошибок по строкам хранить в отчёте
+MAX_REPORTED_ERRORS = 500
+
+REQUIRED_COLUMNS = ['cable_number', 'session_date', 'voltage_level']
+VALUE_COLUMNS = [
+    'core_1_discharge', 'core_1_distance',
+    'core_2_discharge', 'core_2_distance',
+    'core_3_discharge', 'core_3_distance',
+]
+
+
+class ImportResult:
+    """Итог импорта файла измерений ЧР"""
+
+    def __init__(self):
+        self.rows = 0
+        self.sessions_created = 0
+        self.sessions_updated = 0
+        self.measurements_created = 0
+        self.error_count = 0
+        self.errors = []
+        self.session_ids = []
+        self.cable_ids = set()
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def parse_session_date(value):
+    """Дата сессии в формате ГГГГ-ММ-ДД или ДД.ММ.ГГГГ"""
+    value = value.strip()
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        try:
+            parsed = datetime.strptime(value, '%d.%m.%Y').date()
+        except ValueError:
+            raise ValueError(f"некорректная дата сессии '{value}'")
+    return parsed
+
+
+def parse_float(value, column, required=False):
+    """Число из ячейки CSV (допускается десятичная запятая)"""
+    value = (value or '').strip().replace(',', '.')
+    if not value:
+        if required:
+            raise ValueError(f"не заполнено поле {column}")
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"некорректное число в поле {column}: '{value}'")
+    if number < 0:
+        raise ValueError(f"отрицательное значение в поле {column}")
+    return number
+
+
+def read_rows(lines):
+    """Потоковое чтение CSV: (номер строки, словарь значений); разделитель ';' или ','"""
+    lines = iter(lines)
+    header = next(lines, '')
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    columns = [column.strip().lstrip('\ufeff') for column in next(csv.reader([header], delimiter=delimiter))]
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"В файле нет обязательных столбцов: {', '.join(missing)}")
+
+    for line_number, row in enumerate(csv.reader(lines, delimiter=delimiter), start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        yield line_number, dict(zip(columns, row))
+
+
+class MeasurementImporter:
+    """Импорт измерений ЧР пакетами.
+
+    Строки группируются в сессии по (линия, дата сессии); измерения добавляются
+    в уже сохранённую сессию линии за эту дату, иначе сессия создаётся один раз
+    на файл. Измерения вставляются bulk_create пакетами по batch_size.
+    Ошибочные строки пропускаются и попадают в отчёт, остальные импортируются.
+    """
+
+    def __init__(self, enterprise=None, batch_size=IMPORT_BATCH_SIZE):
+        self.enterprise = enterprise
+        self.batch_size = batch_size
+        self.result = ImportResult()
+        self.cables = {}
+        self.sessions = {}
+
+    def run(self, lines):
+        with transaction.atomic():
+            batch = []
+            for line_number, row in read_rows(lines):
+                self.result.rows += 1
+                batch.append((line_number, row))
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch)
+                    batch = []
+            if batch:
+                self.import_batch(batch)
+            # Строки вставляются без сигналов моделей, поэтому кэш страниц предприятий сбрасывается явно
+            invalidate_enterprises(CableLine.objects.filter(pk__in=self.result.cable_ids).values_list(
+                'enterprise_id', flat=True))
+
+        self.refresh_derived_data()
+        return self.result
+
+    def resolve_cables(self, numbers):
+        """Кабельные линии по номерам одним запросом на пакет"""
+        unknown = {number for number in numbers if number not in self.cables}
+        if not unknown:
+            return
+        cables = CableLine.objects.filter(number__in=unknown)
+        if self.enterprise is not None:
+            cables = cables.filter(enterprise=self.enterprise)
+        for cable_id, number in cables.values_list('id', 'number'):
+            self.cables[number] = cable_id
+        for number in unknown:
+            self.cables.setdefault(number, None)
+
+    def import_batch(self, batch):
+        self.resolve_cables({row.get('cable_number', '').strip() for _, row in batch})
+
+        parsed = []
+        for line_number, row in batch:
+            try:
+                number = row.get('cable_number', '').strip()
+                cable_id = self.cables.get(number)
+                if cable_id is None:
+                    raise ValueError(f"кабельная линия '{number}' не найдена")
+                values = {column: parse_float(row.get(column), column) for column in VALUE_COLUMNS}
+                values['voltage_level'] = parse_float(row.get('voltage_level'), 'voltage_level', required=True)
+                key = (cable_id, parse_session_date(row.get('session_date', '')))
+                parsed.append((key, (row.get('notes') or '').strip(), values))
+            except ValueError as e:
+                self.result.add_error(line_number, str(e))
+
+        self.create_sessions([(key, notes) for key, notes, _ in parsed])
+
+        SinglePDMeasurement.objects.bulk_create(
+            [SinglePDMeasurement(session_id=self.sessions[key], **values) for key, _, values in parsed],
+            batch_size=self.batch_size,
+        )
+        self.result.measurements_created += len(parsed)
+
+    def create_sessions(self, keys):
+        """Поиск сохранённых и создание новых сессий, впервые встретившихся в файле"""
+        notes_by_key = {}
+        for key, notes in keys:
+            if key not in self.sessions:
+                notes_by_key.setdefault(key, notes)
+        if not notes_by_key:
+            return
+
+        # Сохранённые сессии пакета одним запросом; при дублях по дате берётся первая
+        existing = PDDMeasurementSession.objects.filter(
+            cable_line_id__in={cable_id for cable_id, _ in notes_by_key},
+            session_date__in={session_date for _, session_date in notes_by_key},
+        ).order_by('-pk').values_list('pk', 'cable_line_id', 'session_date')
+        existing = list(existing)
+        found = {(cable_id, session_date): session_id for session_id, cable_id, session_date in existing}
+        for key in notes_by_key.keys() & found.keys():
+            self.sessions[key] = found[key]
+            self.result.session_ids.append(found[key])
+            self.result.cable_ids.add(key[0])
+        self.result.sessions_updated += len(notes_by_key.keys() & found.keys())
+
+        new_sessions = {
+            key: PDDMeasurementSession(cable_line_id=key[0], session_date=key[1], notes=notes or "Импорт из файла")
+            for key, notes in notes_by_key.items() if key not in found
+        }
+        if not new_sessions:
+            return
+
+        PDDMeasurementSession.objects.bulk_create(new_sessions.values())
+        if connection.features.can_return_rows_from_bulk_insert:
+            created = {key: session.pk for key, session in new_sessions.items()}
+        else:
+            # id читаются запросом, а не из bulk_create: MySQL не возвращает их после вставки
+            created = {}
+            rows = PDDMeasurementSession.objects.filter(
+                cable_line_id__in={cable_id for cable_id, _ in new_sessions},
+                session_date__in={session_date for _, session_date in new_sessions},
+            ).exclude(pk__in=[session_id for session_id, _, _ in existing]).values_list(
+                'pk', 'cable_line_id', 'session_date')
+            for session_id, cable_id, session_date in rows:
+                if (cable_id, session_date) in new_sessions:
+                    created[(cable_id, session_date)] = session_id
+
+        for key, session_id in created.items():
+            self.sessions[key] = session_id
+            self.result.session_ids.append(session_id)
+            self.result.cable_ids.add(key[0])
+        self.result.sessions_created += len(new_sessions)
+
+    def refresh_derived_data(self):
+        """Пересчёт векторов признаков, профилей мест ЧР, трендов и оценок риска затронутых линий пакетами"""
+        if not self.result.session_ids:
+            return
+
+        from .ai_analyzer import CableAIAnalyzer, RESCORE_BATCH_SIZE
+        from .feature_store import refresh_session_features, REBUILD_BATCH_SIZE
+        from .hotspots import update_hotspots
+        from .trends import update_cable_trends
+
+        session_ids = self.result.session_ids
+        cable_ids = sorted(self.result.cable_ids)
+        try:
+            for start in range(0, len(session_ids), REBUILD_BATCH_SIZE):
+                refresh_session_features(session_ids[start:start + REBUILD_BATCH_SIZE])
+                update_hotspots(session_ids[start:start + REBUILD_BATCH_SIZE])
+            analyzer = CableAIAnalyzer()
+            for start in range(0, len(cable_ids), RESCORE_BATCH_SIZE):
+                update_cable_trends(cable_ids[start:start + RESCORE_BATCH_SIZE])
+                analyzer.update_risk_scores(CableLine.objects.filter(pk__in=cable_ids[start:start + RESCORE_BATCH_SIZE]))
+        except Exception:
+            logger.exception("Ошибка пересчёта оценок после импорта")
+
+
+def import_measurements(lines, enterprise=None, batch_size=IMPORT_BATCH_SIZE):
+    """Импорт измерений ЧР из строк CSV-файла"""
+    return MeasurementImporter(enterprise=enterprise, batch_size=batch_size).run(lines)
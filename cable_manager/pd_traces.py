@@ -0,0 +1,109 @@
+import os
+import uuid
+
+import numpy as np
+from django.conf import settings
+
+from .models import PDTrace
+
+
+# Порядок строк в упакованном массиве трассы: каждая строка — непрерывный массив float32
+TRACE_FIELDS = ('charge', 'location', 'phase')
+TRACE_DTYPE = np.dtype('<f4')
+
+# Трассы до этого числа импульсов хранятся в БД, более длинные — в файлах .npy
+TRACE_INLINE_MAX_PULSES = getattr(settings, 'PD_TRACE_INLINE_MAX_PULSES', 65536)
+TRACE_ROOT = getattr(settings, 'PD_TRACE_ROOT', os.path.join(settings.MEDIA_ROOT, 'pd_traces'))
+
+
+def pack_trace(charge, location, phase):
+    """Упаковка импульсов в массив float32 формы (3, n)"""
+    trace = np.empty((len(TRACE_FIELDS), len(charge)), dtype=TRACE_DTYPE)
+    trace[0] = charge
+    trace[1] = location
+    trace[2] = phase
+    return trace
+
+
+def save_trace(session, core, voltage_level, charge, location, phase):
+    """Сохранение трассы импульсов ЧР одной жилы на одной ступени напряжения"""
+    trace = pack_trace(charge, location, phase)
+    pulse_count = trace.shape[1]
+
+    # Запись собирается целиком и сохраняется одним save(), чтобы post_save сработал один раз
+    record = PDTrace.objects.filter(session=session, voltage_level=voltage_level, core=core).first()
+    if record is None:
+        record = PDTrace(session=session, voltage_level=voltage_level, core=core)
+    old_file = record.file_path
+    record.pulse_count = pulse_count
+
+    if pulse_count <= TRACE_INLINE_MAX_PULSES:
+        record.data = trace.tobytes()
+        record.file_path = ''
+    else:
+        # Новое имя при каждой записи: прежний файл удаляется только после сохранения записи
+        relative_path = os.path.join(str(session.pk), f'{core}_{voltage_level:g}_{uuid.uuid4().hex}.npy')
+        path = os.path.join(TRACE_ROOT, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp.npy'
+        np.save(tmp_path, trace)
+        os.replace(tmp_path, path)
+        record.data = None
+        record.file_path = relative_path
+
+    record.save()
+    if old_file and old_file != record.file_path:
+        remove_trace_file(old_file)
+    return record
+
+
+def load_trace(trace):
+    """Массив импульсов трассы (3, n) только для чтения, без копирования данных.
+
+    Короткие трассы читаются прямо из буфера значения BinaryField (np.frombuffer),
+    длинные отображаются в память из файла .npy (mmap_mode='r').
+    """
+    if trace.file_path:
+        return np.load(os.path.join(TRACE_ROOT, trace.file_path), mmap_mode='r')
+    if not trace.data:
+        return np.empty((len(TRACE_FIELDS), 0), dtype=TRACE_DTYPE)
+    return np.frombuffer(trace.data, dtype=TRACE_DTYPE).reshape(len(TRACE_FIELDS), trace.pulse_count)
+
+
+def remove_trace_file(relative_path):
+    """Удаление файла трассы с диска"""
+    try:
+        os.remove(os.path.join(TRACE_ROOT, relative_path))
+    except OSError:
+        pass
+
+
+def trace_aggregates(trace):
+    """Агрегаты трассы в терминах SinglePDMeasurement: (заряд ЧР, расстояние) для жилы.
+
+    Заряд — максимальный кажущийся заряд импульсов на ступени, расстояние —
+    среднее место импульсов, взвешенное по заряду. Для пустой трассы (None, None).
+    """
+    pulses = load_trace(trace)
+    charge = np.abs(pulses[0])
+    if charge.size == 0:
+        return None, None
+
+    total = charge.sum(dtype=np.float64)
+    if total > 0:
+        distance = float(np.dot(charge, pulses[1]) / total)
+    else:
+        distance = float(pulses[1].mean(dtype=np.float64))
+    return float(charge.max()), distance
+
+
+def trace_measurement_rows(traces):
+    """Строки в формате SinglePDMeasurement.values() по трассам: одна строка на ступень напряжения"""
+    rows = {}
+    for trace in traces.order_by('session_id', 'voltage_level', 'core').iterator():
+        key = (trace.session_id, trace.voltage_level)
+        row = rows.setdefault(key, {'session_id': trace.session_id, 'voltage_level': trace.voltage_level})
+        discharge, distance = trace_aggregates(trace)
+        row[f'core_{trace.core}_discharge'] = discharge
+        row[f'core_{trace.core}_distance'] = distance
+    return list(rows.values())
@@ -0,0 +1,237 @@
+import contextvars
+import cProfile
+import io
+import logging
+import pstats
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import IntegrityError, connection, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+# Профилирование включено, период сброса сводки в базу (секунды), доля запросов под cProfile
+# и сколько последних профилей cProfile хранить
+PROFILING_ENABLED = getattr(settings, 'CABLE_PROFILING', True)
+FLUSH_INTERVAL = getattr(settings, 'CABLE_PROFILE_FLUSH_INTERVAL', 60.0)
+SAMPLE_RATE = getattr(settings, 'CABLE_PROFILE_SAMPLE_RATE', 0.0)
+SAMPLES_KEPT = getattr(settings, 'CABLE_PROFILE_SAMPLES_KEPT', 500)
+
+# Сколько строк статистики cProfile (по накопленному времени) сохранять
+PROFILE_STATS_LINES = 40
+
+
+class QueryTimer:
+    """Обёртка выполнения SQL (connection.execute_wrapper): количество запросов и их суммарное время"""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            # Асинхронное представление выполняет запросы одновременно в нескольких потоках
+            with self._lock:
+                self.time += time.perf_counter() - started
+                self.count += 1
+
+
+# Счётчик запросов текущего HTTP-запроса: асинхронные представления (и под ASGI, и под WSGI)
+# выполняют запросы к базе в потоках пулов (cable_manager.concurrency), куда контекст
+# передаётся вместе с этой переменной
+request_queries = contextvars.ContextVar('request_queries', default=None)
+
+
+def count_request_query(execute, sql, params, many, context):
+    queries = request_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    return queries(execute, sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    # Обёртка ставится на соединение каждого потока при подключении и без запроса ничего не делает
+    if count_request_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_request_query)
+
+
+class ProfileAggregator:
+    """Сводка по представлениям в памяти процесса со сбросом в ViewProfile.
+
+    Запросы складываются в словарь по (представление, метод, час); раз в flush_interval
+    секунд накопленное прибавляется к строкам ViewProfile. Прибавление выполняется
+    в базе (F-выражения), поэтому процессы могут сбрасывать сводку одновременно.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._flushed_at = time.monotonic()
+
+    def record(self, view_name, method, status_code, duration, query_count, sql_time):
+        period = timezone.now().replace(minute=0, second=0, microsecond=0)
+        with self._lock:
+            stats = self._stats.setdefault((view_name, method, period), {
+                'request_count': 0, 'error_count': 0, 'total_time': 0.0, 'max_time': 0.0,
+                'query_count': 0, 'max_queries': 0, 'sql_time': 0.0,
+            })
+            stats['request_count'] += 1
+            stats['error_count'] += status_code >= 500
+            stats['total_time'] += duration
+            stats['max_time'] = max(stats['max_time'], duration)
+            stats['query_count'] += query_count
+            stats['max_queries'] = max(stats['max_queries'], query_count)
+            stats['sql_time'] += sql_time
+
+    def flush_due(self):
+        return time.monotonic() - self._flushed_at >= self.flush_interval
+
+    def flush(self):
+        """Запись накопленной сводки в базу; возвращает количество обновлённых строк ViewProfile"""
+        from .models import ViewProfile
+
+        with self._lock:
+            pending, self._stats = self._stats, {}
+            self._flushed_at = time.monotonic()
+
+        for (view_name, method, period), stats in pending.items():
+            key = {'view_name': view_name, 'method': method, 'period': period}
+            increments = {
+                'request_count': F('request_count') + stats['request_count'],
+                'error_count': F('error_count') + stats['error_count'],
+                'total_time': F('total_time') + stats['total_time'],
+                'max_time': Greatest('max_time', stats['max_time']),
+                'query_count': F('query_count') + stats['query_count'],
+                'max_queries': Greatest('max_queries', stats['max_queries']),
+                'sql_time': F('sql_time') + stats['sql_time'],
+                'updated_at': timezone.now(),
+            }
+            if ViewProfile.objects.filter(**key).update(**increments):
+                continue
+            try:
+                with transaction.atomic():
+                    ViewProfile.objects.create(**key, **stats)
+            except IntegrityError:
+                # Строку за этот час успел создать другой процесс
+                ViewProfile.objects.filter(**key).update(**increments)
+        return len(pending)
+
+
+aggregator = ProfileAggregator()
+
+
+def save_sample(request, view_name, status_code, duration, queries, profiler):
+    """Сохранение профиля cProfile запроса и удаление старых профилей сверх SAMPLES_KEPT"""
+    from .models import ProfileSample
+
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(PROFILE_STATS_LINES)
+    ProfileSample.objects.create(
+        view_name=view_name,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        status_code=status_code,
+        duration=duration,
+        query_count=queries.count,
+        sql_time=queries.time,
+        stats=output.getvalue(),
+        created_at=timezone.now(),
+    )
+    stale = ProfileSample.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)[SAMPLES_KEPT:]
+    ProfileSample.objects.filter(pk__in=list(stale)).delete()
+
+
+class ProfilingMiddleware:
+    """Замер времени ответа, количества и времени SQL-запросов каждого представления.
+
+    Запросы к базе считаются через connection.execute_wrapper; у потоковых ответов
+    замер заканчивается после выдачи последнего фрагмента. Доля SAMPLE_RATE запросов
+    выполняется под cProfile, их статистика сохраняется в ProfileSample.
+    Сводка копится в памяти и сбрасывается в ViewProfile после ответа раз в FLUSH_INTERVAL секунд;
+    несброшенная часть при остановке процесса теряется.
+
+    Запросы считаются через контекстную переменную request_queries и обёртку count_request_query
+    на соединениях всех потоков, поэтому учитываются и запросы асинхронных представлений
+    из потоков пулов. Под ASGI cProfile не используется: он видит только свой поток,
+    а представление выполняется в нескольких.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        connection_created.connect(install_query_counter, dispatch_uid='cable_profiling_query_counter')
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profiler = cProfile.Profile() if SAMPLE_RATE and random.random() < SAMPLE_RATE else None
+        queries = QueryTimer()
+        # Соединение потока запроса могло открыться до подключения обработчика connection_created
+        install_query_counter(sender=None, connection=connection)
+        token = request_queries.set(queries)
+        started = time.perf_counter()
+
+        if profiler is not None:
+            profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            request_queries.reset(token)
+
+        if response.streaming and not getattr(response, 'is_async', False):
+            response.streaming_content = self.stream(request, response, response.streaming_content, queries, started)
+        else:
+            self.finish(request, response, queries, started, profiler)
+        return response
+
+    async def __acall__(self, request):
+        queries = QueryTimer()
+        token = request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_queries.reset(token)
+        # Сброс сводки пишет в базу
+        await sync_to_async(self.finish)(request, response, queries, started)
+        return response
+
+    def stream(self, request, response, content, queries, started):
+        with connection.execute_wrapper(queries):
+            yield from content
+        self.finish(request, response, queries, started)
+
+    def finish(self, request, response, queries, started, profiler=None):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view_name = match.view_name if match is not None else 'не найдено'
+        aggregator.record(view_name, request.method, response.status_code, duration, queries.count, queries.time)
+        try:
+            if profiler is not None:
+                save_sample(request, view_name, response.status_code, duration, queries, profiler)
+            if aggregator.flush_due():
+                aggregator.flush()
+        except Exception:
+            logger.exception("Ошибка сохранения профилей представлений")
@@ -0,0 +1,248 @@
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from .models import PDDMeasurementSession, PDTrace, PRPDPattern
+from .pd_traces import load_trace
+
+
+# Версия схемы сохранённых образов: увеличивается при изменении сетки или состава статистик
+PRPD_SCHEMA_VERSION = 1
+
+# Сетка гистограммы: 36 интервалов фазы по 10° и 20 логарифмических интервалов заряда 1 пКл .. 100 нКл
+PRPD_PHASE_BINS = 36
+PRPD_CHARGE_EDGES = np.logspace(0, 5, 21)
+PRPD_CHARGE_BINS = len(PRPD_CHARGE_EDGES) - 1
+
+HISTOGRAM_DTYPE = np.dtype('<u4')
+FEATURES_DTYPE = np.dtype('<f8')
+
+# Статистики фазового образа сессии (используются и как дополнительные признаки модели)
+PRPD_FEATURE_COLUMNS = [
+    'prpd_pulse_count',
+    'prpd_positive_share',
+    'prpd_charge_mean',
+    'prpd_charge_max',
+    'prpd_charge_skew',
+    'prpd_charge_kurt',
+    'prpd_phase_skew_pos',
+    'prpd_phase_kurt_pos',
+    'prpd_phase_skew_neg',
+    'prpd_phase_kurt_neg',
+]
+
+PRPD_FEATURE_LABELS = {
+    'prpd_pulse_count': 'Количество импульсов ЧР',
+    'prpd_positive_share': 'Доля импульсов в положительном полупериоде',
+    'prpd_charge_mean': 'Средний заряд импульса',
+    'prpd_charge_max': 'Максимальный заряд импульса',
+    'prpd_charge_skew': 'Асимметрия распределения заряда',
+    'prpd_charge_kurt': 'Эксцесс распределения заряда',
+    'prpd_phase_skew_pos': 'Асимметрия фазы (+ полупериод)',
+    'prpd_phase_kurt_pos': 'Эксцесс фазы (+ полупериод)',
+    'prpd_phase_skew_neg': 'Асимметрия фазы (- полупериод)',
+    'prpd_phase_kurt_neg': 'Эксцесс фазы (- полупериод)',
+}
+
+PRPD_BATCH_SIZE = 500
+
+
+def grouped_moments(values, groups, group_count):
+    """Число значений, среднее, максимум, асимметрия и эксцесс по группам.
+
+    Все группы считаются сразу через np.bincount; моменты берутся от отклонений
+    от среднего группы, чтобы не терять точность на больших зарядах.
+    Для групп с нулевой дисперсией асимметрия и эксцесс равны нулю.
+    """
+    counts = np.bincount(groups, minlength=group_count).astype(float)
+    safe_counts = np.maximum(counts, 1)
+    mean = np.bincount(groups, weights=values, minlength=group_count) / safe_counts
+
+    maximum = np.zeros(group_count)
+    np.maximum.at(maximum, groups, values)
+
+    deviation = values - mean[groups]
+    squared = deviation * deviation
+    m2 = np.bincount(groups, weights=squared, minlength=group_count) / safe_counts
+    m3 = np.bincount(groups, weights=squared * deviation, minlength=group_count) / safe_counts
+    m4 = np.bincount(groups, weights=squared * squared, minlength=group_count) / safe_counts
+
+    spread = m2 > 1e-12
+    skew = np.zeros(group_count)
+    kurt = np.zeros(group_count)
+    skew[spread] = m3[spread] / m2[spread] ** 1.5
+    kurt[spread] = m4[spread] / m2[spread] ** 2 - 3
+    return counts, mean, maximum, skew, kurt
+
+
+def compute_patterns(phases, charges, groups, group_count):
+    """Гистограммы фаза × заряд и статистики для group_count сессий за один проход.
+
+    phases — фаза импульсов в градусах, charges — кажущийся заряд в пКл,
+    groups — номер сессии (0..group_count-1) для каждого импульса.
+    Возвращает массив гистограмм (group_count, PRPD_PHASE_BINS, PRPD_CHARGE_BINS)
+    и матрицу статистик (group_count, len(PRPD_FEATURE_COLUMNS)).
+    """
+    phases = np.mod(np.asarray(phases, dtype=float), 360.0)
+    charges = np.abs(np.asarray(charges, dtype=float))
+    groups = np.asarray(groups, dtype=np.intp)
+
+    phase_bins = np.minimum((phases * (PRPD_PHASE_BINS / 360.0)).astype(np.intp), PRPD_PHASE_BINS - 1)
+    charge_bins = np.clip(np.searchsorted(PRPD_CHARGE_EDGES, charges, side='right') - 1, 0, PRPD_CHARGE_BINS - 1)
+    cells = (groups * PRPD_PHASE_BINS + phase_bins) * PRPD_CHARGE_BINS + charge_bins
+    histograms = np.bincount(cells, minlength=group_count * PRPD_PHASE_BINS * PRPD_CHARGE_BINS).reshape(
+        group_count, PRPD_PHASE_BINS, PRPD_CHARGE_BINS
+    )
+
+    counts, charge_mean, charge_max, charge_skew, charge_kurt = grouped_moments(charges, groups, group_count)
+
+    # Фазовые статистики считаются отдельно для положительного и отрицательного полупериодов
+    negative = phases >= 180.0
+    half_groups = groups * 2 + negative
+    half_counts, _, _, phase_skew, phase_kurt = grouped_moments(
+        np.where(negative, phases - 180.0, phases), half_groups, group_count * 2
+    )
+
+    features = np.column_stack([
+        counts,
+        half_counts[0::2] / np.maximum(counts, 1),
+        charge_mean,
+        charge_max,
+        charge_skew,
+        charge_kurt,
+        phase_skew[0::2],
+        phase_kurt[0::2],
+        phase_skew[1::2],
+        phase_kurt[1::2],
+    ])
+    return histograms, features
+
+
+def session_patterns(traces):
+    """Фазовые образы сессий по их трассам импульсов: DataFrame статистик и словарь гистограмм"""
+    session_ids, phases, charges, groups = [], [], [], []
+    positions = {}
+    for trace in traces.order_by('session_id', 'pk').iterator():
+        if trace.pulse_count == 0:
+            continue
+        position = positions.setdefault(trace.session_id, len(positions))
+        if position == len(session_ids):
+            session_ids.append(trace.session_id)
+        pulses = load_trace(trace)
+        charges.append(pulses[0])
+        phases.append(pulses[2])
+        groups.append(np.full(pulses.shape[1], position, dtype=np.intp))
+
+    if not session_ids:
+        return pd.DataFrame(columns=PRPD_FEATURE_COLUMNS, index=pd.Index([], name='session_id')), {}
+
+    histograms, features = compute_patterns(
+        np.concatenate(phases), np.concatenate(charges), np.concatenate(groups), len(session_ids)
+    )
+    frame = pd.DataFrame(features, index=pd.Index(session_ids, name='session_id'), columns=PRPD_FEATURE_COLUMNS)
+    return frame, dict(zip(session_ids, histograms))
+
+
+def store_patterns(frame, histograms):
+    """Сохранение рассчитанных фазовых образов"""
+    if frame.empty:
+        return
+
+    matrix = frame[PRPD_FEATURE_COLUMNS].to_numpy(dtype=FEATURES_DTYPE)
+    patterns = [
+        PRPDPattern(
+            session_id=session_id,
+            schema_version=PRPD_SCHEMA_VERSION,
+            pulse_count=int(row[0]),
+            histogram=histograms[session_id].astype(HISTOGRAM_DTYPE).tobytes(),
+            features=row.tobytes(),
+        )
+        for session_id, row in zip(frame.index, matrix)
+    ]
+
+    with transaction.atomic():
+        PRPDPattern.objects.filter(session_id__in=list(frame.index)).delete()
+        PRPDPattern.objects.bulk_create(patterns)
+
+
+def refresh_prpd_patterns(session_ids):
+    """Пересчёт фазовых образов сессий по их трассам"""
+    frame, histograms = session_patterns(PDTrace.objects.filter(session_id__in=session_ids))
+    PRPDPattern.objects.filter(session_id__in=session_ids).exclude(session_id__in=list(frame.index)).delete()
+    store_patterns(frame, histograms)
+    return frame
+
+
+def load_prpd_features(session_ids=None):
+    """Статистики фазовых образов сессий (DataFrame по session_id).
+
+    Отсутствующие и устаревшие образы сессий с трассами рассчитываются и сохраняются.
+    Сессии без трасс в результат не попадают.
+    """
+    patterns = PRPDPattern.objects.filter(schema_version=PRPD_SCHEMA_VERSION)
+    if session_ids is not None:
+        patterns = patterns.filter(session_id__in=session_ids)
+    stored_ids, blobs = [], []
+    for session_id, blob in patterns.values_list('session_id', 'features'):
+        stored_ids.append(session_id)
+        blobs.append(bytes(blob))
+
+    stored = pd.DataFrame(
+        np.frombuffer(b''.join(blobs), dtype=FEATURES_DTYPE).reshape(-1, len(PRPD_FEATURE_COLUMNS)),
+        index=pd.Index(stored_ids, name='session_id'),
+        columns=PRPD_FEATURE_COLUMNS,
+    )
+
+    if session_ids is not None:
+        missing = PDTrace.objects.filter(session_id__in=set(session_ids) - set(stored_ids))
+    else:
+        missing = PDTrace.objects.exclude(session__prpd_pattern__schema_version=PRPD_SCHEMA_VERSION)
+    computed, histograms = session_patterns(missing)
+    store_patterns(computed, histograms)
+
+    if computed.empty:
+        return stored
+    if stored.empty:
+        return computed
+    return pd.concat([stored, computed])
+
+
+def pattern_histogram(pattern):
+    """Гистограмма сохранённого образа в виде массива (PRPD_PHASE_BINS, PRPD_CHARGE_BINS)"""
+    return np.frombuffer(pattern.histogram, dtype=HISTOGRAM_DTYPE).reshape(PRPD_PHASE_BINS, PRPD_CHARGE_BINS)
+
+
+def pattern_features(pattern):
+    """Статистики сохранённого образа в виде словаря"""
+    return dict(zip(PRPD_FEATURE_COLUMNS, np.frombuffer(pattern.features, dtype=FEATURES_DTYPE).tolist()))
+
+
+def latest_cable_pattern(cable_line):
+    """Фазовый образ последней сессии линии с записанными трассами (или None)"""
+    session = PDDMeasurementSession.objects.filter(
+        cable_line=cable_line, traces__isnull=False
+    ).order_by('-session_date', '-pk').first()
+    if session is None:
+        return None
+
+    pattern = PRPDPattern.objects.filter(session=session, schema_version=PRPD_SCHEMA_VERSION).first()
+    if pattern is None:
+        refresh_prpd_patterns([session.pk])
+        pattern = PRPDPattern.objects.filter(session=session).first()
+        if pattern is None:
+            return None
+    pattern.session = session
+    return pattern
+
+
+def rebuild_prpd_patterns(batch_size=PRPD_BATCH_SIZE):
+    """Полная перестройка фазовых образов пакетами сессий"""
+    session_ids = list(
+        PDDMeasurementSession.objects.filter(traces__isnull=False).distinct().order_by('pk').values_list('pk', flat=True)
+    )
+    PRPDPattern.objects.filter(session__traces__isnull=True).delete()
+    stored = 0
+    for start in range(0, len(session_ids), batch_size):
+        stored += len(refresh_prpd_patterns(session_ids[start:start + batch_size]))
+    print(f"Фазовые образы ЧР пересчитаны: {stored} сессий")
+    return stored
@@ -0,0 +1,135 @@
+import asyncio
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import Client
+
+
+BenchmarkResult = namedtuple('BenchmarkResult', ['mode', 'requests', 'errors', 'elapsed', 'p50', 'p95'])
+
+
+def throughput(result):
+    return result.requests / result.elapsed if result.elapsed else 0.0
+
+
+def session_cookie(username):
+    """Cookie сессии пользователя (сессия создаётся в базе, как при входе)"""
+    client = Client()
+    client.force_login(User.objects.get(username=username))
+    return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+
+def summarize(mode, timings, elapsed):
+    """Итоги прогона по списку (код ответа, время ответа)"""
+    durations = sorted(duration for _, duration in timings)
+    errors = sum(1 for status, _ in timings if status >= 400)
+
+    def percentile(share):
+        return durations[min(len(durations) - 1, int(share * len(durations)))] if durations else 0.0
+
+    return BenchmarkResult(mode, len(timings), errors, elapsed, percentile(0.5), percentile(0.95))
+
+
+def wsgi_request(handler, path, cookie):
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost', 'HTTP_COOKIE': cookie, 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    status = {}
+
+    def start_response(status_line, headers, exc_info=None):
+        status['code'] = int(status_line.split()[0])
+
+    started = time.perf_counter()
+    body = handler(environ, start_response)
+    try:
+        for _ in body:
+            pass
+    finally:
+        # Закрытие ответа отправляет request_finished: соединения с базой закрываются, как у сервера
+        body.close()
+    return status['code'], time.perf_counter() - started
+
+
+def benchmark_wsgi(paths, cookie, requests, concurrency):
+    """WSGI: concurrency потоков одного процесса, как у gunicorn --threads"""
+    handler = WSGIHandler()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        timings = list(pool.map(lambda i: wsgi_request(handler, paths[i % len(paths)], cookie), range(requests)))
+        elapsed = time.perf_counter() - started
+    return summarize('wsgi', timings, elapsed)
+
+
+async def asgi_request(handler, path, cookie):
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    received = False
+    status = {}
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Клиент не отключается: обработчик сам отменит ожидание после ответа
+        await asyncio.Future()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status['code'] = message['status']
+
+    started = time.perf_counter()
+    await handler(scope, receive, send)
+    return status['code'], time.perf_counter() - started
+
+
+def benchmark_asgi(paths, cookie, requests, concurrency):
+    """ASGI: concurrency одновременных запросов в цикле событий одного процесса, как у uvicorn"""
+    async def run():
+        handler = ASGIHandler()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(i):
+            async with semaphore:
+                return await asgi_request(handler, paths[i % len(paths)], cookie)
+
+        started = time.perf_counter()
+        timings = await asyncio.gather(*(limited(i) for i in range(requests)))
+        return summarize('asgi', timings, time.perf_counter() - started)
+
+    return asyncio.run(run())
+
+
+BENCHMARKS = {'wsgi': benchmark_wsgi, 'asgi': benchmark_asgi}
+
+
+def run_benchmark(paths, username, modes=('wsgi', 'asgi'), requests=200, concurrency=16):
+    """Пропускная способность одного процесса под WSGI и ASGI на одних и тех же страницах.
+
+    Перед замером каждая страница открывается один раз (загрузка модели, кэши), чтобы
+    сравнивались установившиеся режимы. Сетевой сервер не участвует: обработчики Django
+    вызываются напрямую, поэтому разница показывает именно обработку запросов в процессе.
+    """
+    cookie = session_cookie(username)
+    results = []
+    for mode in modes:
+        BENCHMARKS[mode](paths, cookie, len(paths), 1)
+        results.append(BENCHMARKS[mode](paths, cookie, requests, concurrency))
+    return results
@@ -0,0 +1,147 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .models import CableLine, PDDMeasurementSession, SinglePDMeasurement, PDTrace, HighVoltageTest, Accident
+from .page_cache import invalidate_enterprises
+
+
+# Изменённые за транзакцию сессии и линии: производные данные пересчитываются одним пакетом
+# после фиксации, а не отдельно на каждую сохранённую строку. Текущий пакет свой у каждого
+# потока (у каждого потока своё соединение и свои транзакции)
+_pending = threading.local()
+
+
+class RefreshBatch:
+    """Идентификаторы, изменённые в транзакции; вызов пакета выполняет пересчёт"""
+
+    def __init__(self):
+        self.prpd_session_ids = set()
+        self.feature_session_ids = set()
+        self.hotspot_session_ids = set()
+        self.cable_line_ids = set()
+
+    def __call__(self):
+        # Выполненный пакет больше не пополняется
+        if getattr(_pending, 'batch', None) is self:
+            _pending.batch = None
+
+        from .ai_analyzer import CableAIAnalyzer
+        from .feature_store import refresh_session_features
+        from .hotspots import update_hotspots
+        from .prpd import refresh_prpd_patterns
+        from .trends import update_cable_trends
+
+        steps = [
+            (refresh_prpd_patterns, self.prpd_session_ids, "фазового образа ЧР"),
+            (refresh_session_features, self.feature_session_ids, "признаков сессий"),
+            (update_hotspots, self.hotspot_session_ids, "профиля мест ЧР"),
+            (update_cable_trends, self.cable_line_ids, "трендов ЧР"),
+            (lambda ids: CableAIAnalyzer().update_risk_scores(CableLine.objects.filter(pk__in=ids)),
+             self.cable_line_ids, "оценки риска"),
+        ]
+        for refresh, ids, title in steps:
+            if ids:
+                try:
+                    refresh(sorted(ids))
+                except Exception as e:
+                    print(f"Ошибка пересчёта {title}: {e}")
+
+
+def schedule_refresh(cable_line_ids=(), hotspot_session_ids=(), feature_session_ids=(), prpd_session_ids=()):
+    """Пересчёт производных данных после фиксации транзакции (сразу, если транзакции нет).
+
+    На транзакцию ставится один обработчик on_commit; последующие изменения добавляются
+    в его пакет. Если транзакция откатилась, Django снимает обработчик вместе с пакетом,
+    и следующее изменение начинает новый.
+    """
+    batch = getattr(_pending, 'batch', None)
+    registered = batch is not None and any(
+        entry[1] is batch for entry in transaction.get_connection().run_on_commit
+    )
+    if not registered:
+        batch = _pending.batch = RefreshBatch()
+
+    batch.cable_line_ids.update(cable_line_id for cable_line_id in cable_line_ids if cable_line_id is not None)
+    batch.hotspot_session_ids.update(hotspot_session_ids)
+    batch.feature_session_ids.update(feature_session_ids)
+    batch.prpd_session_ids.update(prpd_session_ids)
+
+    if not registered:
+        transaction.on_commit(batch)
+
+
+def session_cable_line_id(session_id):
+    return PDDMeasurementSession.objects.filter(pk=session_id).values_list('cable_line_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=PDDMeasurementSession)
+def session_changed(sender, instance, **kwargs):
+    schedule_refresh(cable_line_ids=[instance.cable_line_id])
+
+
+@receiver(post_save, sender=PDDMeasurementSession)
+def session_saved(sender, instance, **kwargs):
+    schedule_refresh(hotspot_session_ids=[instance.pk])
+
+
+@receiver(pre_delete, sender=PDDMeasurementSession)
+def session_deleting(sender, instance, **kwargs):
+    # Вклад сессии вычитается до каскадного удаления, пока он ещё сохранён
+    from .hotspots import remove_session_hotspots
+
+    try:
+        remove_session_hotspots(instance)
+    except Exception as e:
+        print(f"Ошибка обновления профиля мест ЧР: {e}")
+
+
+@receiver([post_save, post_delete], sender=SinglePDMeasurement)
+def measurement_changed(sender, instance, **kwargs):
+    cable_line_id = session_cable_line_id(instance.session_id)
+    if cable_line_id is not None:
+        schedule_refresh(cable_line_ids=[cable_line_id], hotspot_session_ids=[instance.session_id],
+                         feature_session_ids=[instance.session_id])
+
+
+@receiver([post_save, post_delete], sender=PDTrace)
+def trace_changed(sender, instance, **kwargs):
+    cable_line_id = session_cable_line_id(instance.session_id)
+    if cable_line_id is not None:
+        schedule_refresh(cable_line_ids=[cable_line_id], hotspot_session_ids=[instance.session_id],
+                         feature_session_ids=[instance.session_id], prpd_session_ids=[instance.session_id])
+
+
+@receiver(post_delete, sender=PDTrace)
+def trace_deleted(sender, instance, **kwargs):
+    if instance.file_path:
+        from .pd_traces import remove_trace_file
+
+        file_path = instance.file_path
+        transaction.on_commit(lambda: remove_trace_file(file_path))
+
+
+def cable_enterprise_id(cable_line_id):
+    return CableLine.objects.filter(pk=cable_line_id).values_list('enterprise_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=CableLine)
+def cable_line_cache_changed(sender, instance, **kwargs):
+    invalidate_enterprises([instance.enterprise_id])
+
+
+@receiver([post_save, post_delete], sender=PDDMeasurementSession)
+@receiver([post_save, post_delete], sender=HighVoltageTest)
+@receiver([post_save, post_delete], sender=Accident)
+def cable_record_cache_changed(sender, instance, **kwargs):
+    # При каскадном удалении линии её предприятие уже сброшено сигналом самой линии
+    invalidate_enterprises([cable_enterprise_id(instance.cable_line_id)])
+
+
+@receiver([post_save, post_delete], sender=SinglePDMeasurement)
+def measurement_cache_changed(sender, instance, **kwargs):
+    invalidate_enterprises([PDDMeasurementSession.objects.filter(
+        pk=instance.session_id
+    ).values_list('cable_line__enterprise_id', flat=True).first()])
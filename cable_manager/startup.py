@@ -0,0 +1,101 @@
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+
+# Модули, которые загружаются при первом обращении к ИИ и анализу ЧР (их и предзагружает preload)
+PRELOAD_MODULES = [
+    'numpy',
+    'pandas',
+    'cable_manager.feature_store',
+    'cable_manager.prpd',
+    'cable_manager.hotspots',
+    'cable_manager.trends',
+    'cable_manager.ai_analyzer',
+]
+
+# Тяжёлые пакеты, которые не должны загружаться при запуске процесса
+HEAVY_MODULES = ['numpy', 'pandas', 'scipy', 'sklearn', 'pyarrow', 'joblib']
+
+# В отчёт попадают модули проекта и пакеты верхнего уровня (без их подмодулей)
+REPORTED_PREFIXES = ('cable_manager', 'cable_site')
+REPORTED_PACKAGES = ['django'] + HEAVY_MODULES
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| *(\S+)$')
+
+
+def preload():
+    """Загрузка модулей ИИ и модели в текущий процесс.
+
+    Вызывается в мастер-процессе gunicorn --preload до запуска воркеров (cable_site/wsgi.py),
+    чтобы воркеры получили уже загруженные модули и модель в общей памяти после fork.
+    Возвращает время загрузки по модулям и модели (секунды).
+    """
+    timings = {}
+    for module in PRELOAD_MODULES:
+        started = time.perf_counter()
+        importlib.import_module(module)
+        timings[module] = time.perf_counter() - started
+
+    from .model_registry import registry
+    started = time.perf_counter()
+    registry.get()
+    timings['model'] = time.perf_counter() - started
+
+    print("Предзагрузка: " + ", ".join(f"{name} {seconds * 1000:.0f} мс" for name, seconds in timings.items()))
+    # Показатели мастер-процесса (время загрузки модели) сохраняются до fork: воркеры начинают с нуля
+    from .metrics import collector
+    collector.write()
+    return timings
+
+
+# Замер выполняется в отдельном процессе, чтобы все модули импортировались заново
+STARTUP_PROBE = """
+import importlib, json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+from django.conf import settings
+importlib.import_module(settings.ROOT_URLCONF)
+urls_done = time.perf_counter()
+loaded_at_start = [name for name in {heavy!r} if name in sys.modules]
+from cable_manager.startup import preload
+timings = preload()
+print(json.dumps({{
+    'setup': setup_done - started,
+    'urls': urls_done - setup_done,
+    'heavy_at_start': loaded_at_start,
+    'first_use': timings,
+}}))
+"""
+
+
+def parse_import_times(stderr):
+    """Время импорта модулей по выводу python -X importtime: {модуль: (собственное, накопительное)} в секундах"""
+    times = {}
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            own, cumulative, module = match.groups()
+            times[module] = (int(own) / 1e6, int(cumulative) / 1e6)
+    return times
+
+
+def startup_report():
+    """Замер запуска процесса: django.setup(), загрузка URL, первое обращение к ИИ и время импорта модулей"""
+    env = dict(os.environ, PYTHONWARNINGS='ignore')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_PROBE.format(heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report['imports'] = {
+        module: times for module, times in parse_import_times(result.stderr).items()
+        if module in REPORTED_PACKAGES or module.split('.')[0] in REPORTED_PREFIXES
+    }
+    return report
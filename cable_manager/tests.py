@@ -1,3 +1,2096 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone as django_timezone
+
+from .history_export import export_rows, parquet_available
+from .model_registry import registry
+from .pd_import import import_measurements
+from .training_jobs import claim_next_job, enqueue_training, fail_stale_jobs, run_job
+from .models import Enterprise, UserProfile, CableLine, PDDMeasurementSession, SinglePDMeasurement, \
+    HighVoltageTest, Accident, CableRiskScore, ModelVersion, TrainingJob, CableHotSpotProfile, PDTrace, \
+    SessionFeatureVector
+
+
+def create_fleet(enterprise, cable_count, sessions_per_cable=2, prefix='КЛ'):
+    """Создание набора кабельных линий с измерениями, испытаниями и авариями"""
+    cables = []
+    for i in range(cable_count):
+        cable = CableLine.objects.create(
+            number=f'{prefix}-{i:04d}',
+            enterprise=enterprise,
+            cable_brand='ААБл-10 3х120',
+            start_muff='КНТп-10',
+            end_muff='КНТп-10',
+            length=100 + i,
+            core_count=3,
+            commissioning_date=date(2015, 1, 1) + timedelta(days=i),
+        )
+        for j in range(sessions_per_cable):
+            session = PDDMeasurementSession.objects.create(
+                cable_line=cable,
+                session_date=date(2024, 1, 1) + timedelta(days=30 * j),
+            )
+            for voltage in (5, 10):
+                SinglePDMeasurement.objects.create(
+                    session=session,
+                    voltage_level=voltage,
+                    core_1_discharge=10 * (i + 1),
+                    core_1_distance=5,
+                )
+        HighVoltageTest.objects.create(
+            cable_line=cable,
+            test_date=date(2024, 3, 1),
+            test_voltage=24,
+            insulation_resistance=500,
+        )
+        if i % 2 == 0:
+            Accident.objects.create(
+                cable_line=cable,
+                accident_date=datetime(2024, 2, 1, tzinfo=dt_timezone.utc),
+                accident_type='other',
+                description='Тестовая авария',
+            )
+        cables.append(cable)
+    return cables
+
+
+def create_bulk_fleet(enterprise, cable_count, sessions_per_cable=6, prefix='П'):
+    """Быстрое создание большого набора линий через bulk_create (без сигналов).
+
+    Сессии идут раз в 60 дней со сдвигом по линиям, у каждой третьей линии есть
+    авария после одной из сессий, поэтому в выборке обучения есть оба класса
+    во всех периодах для проверки во времени.
+    """
+    CableLine.objects.bulk_create([
+        CableLine(
+            number=f'{prefix}-{i:05d}',
+            enterprise=enterprise,
+            cable_brand='ААБл-10 3х120',
+            start_muff='КНТп-10',
+            end_muff='КНТп-10',
+            length=100 + i % 500,
+            core_count=3,
+            commissioning_date=date(2005, 1, 1) + timedelta(days=7 * i % 5000),
+        )
+        for i in range(cable_count)
+    ])
+    cables = list(CableLine.objects.filter(enterprise=enterprise, number__startswith=f'{prefix}-').order_by('number'))
+
+    PDDMeasurementSession.objects.bulk_create([
+        PDDMeasurementSession(cable_line=cable, session_date=date(2023, 1, 1) + timedelta(days=60 * j + i % 30))
+        for i, cable in enumerate(cables)
+        for j in range(sessions_per_cable)
+    ])
+    sessions = PDDMeasurementSession.objects.filter(cable_line__in=cables).order_by('cable_line__number', 'session_date')
+    SinglePDMeasurement.objects.bulk_create([
+        SinglePDMeasurement(
+            session=session,
+            voltage_level=voltage,
+            core_1_discharge=10 * (k % 17 + 1) + 3 * voltage,
+            core_1_distance=5 + k % 40,
+            core_2_discharge=7 * (k % 11),
+            core_2_distance=10,
+        )
+        for k, session in enumerate(sessions)
+        for voltage in (5, 10)
+    ])
+
+    HighVoltageTest.objects.bulk_create([
+        HighVoltageTest(cable_line=cable, test_date=date(2023, 6, 1) + timedelta(days=i % 30),
+                        test_voltage=24, insulation_resistance=300 + i % 400)
+        for i, cable in enumerate(cables)
+    ])
+    Accident.objects.bulk_create([
+        Accident(
+            cable_line=cable,
+            accident_date=datetime(2023, 1, 1, tzinfo=dt_timezone.utc)
+            + timedelta(days=60 * (i // 3 % sessions_per_cable) + i % 30 + 20),
+            accident_type='other',
+            description='Тестовая авария',
+        )
+        for i, cable in enumerate(cables) if i % 3 == 0
+    ])
+    return cables
+
+
+class IsolatedModelMixin:
+    """Файлы модели во временном каталоге, чтобы тесты не трогали модель проекта"""
+
+    def setUp(self):
+        super().setUp()
+        self.model_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.model_dir.cleanup)
+        # Очистки выполняются в обратном порядке: перезагрузка реестра — после возврата путей
+        self.addCleanup(registry.reload)
+        for attr, name in (('model_path', 'cable_ai_model.pkl'), ('scaler_path', 'cable_scaler.pkl'),
+                           ('metadata_path', 'cable_ai_model.json'), ('compiled_path', 'cable_ai_model.npz')):
+            patcher = mock.patch.object(registry, attr, os.path.join(self.model_dir.name, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        registry.reload()
+
+    def analyzer(self):
+        from .ai_analyzer import CableAIAnalyzer
+        return CableAIAnalyzer()
+
+
+# Кэш страниц — в памяти процесса, чтобы тесты не писали в файловый кэш проекта
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class EnterpriseUserTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        # Показатели процесса — с нуля, их файлы — во временном каталоге
+        from .metrics import collector
+        metrics_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(metrics_dir.cleanup)
+        for attr, value in (('directory', metrics_dir.name), ('_series', {})):
+            patcher = mock.patch.object(collector, attr, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # Асинхронные представления — в потоке теста: соединения пулов не видят данных транзакции TestCase
+        from . import concurrency
+        for attr in ('QUERY_WORKERS', 'SCORING_WORKERS'):
+            patcher = mock.patch.object(concurrency, attr, 0)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.enterprise = Enterprise.objects.create(name='Тестовое предприятие')
+        self.user = User.objects.create_user(username='engineer', password='secret')
+        UserProfile.objects.create(user=self.user, enterprise=self.enterprise, full_name='Инженер')
+        self.client.force_login(self.user)
+
+    def count_queries(self, url, status=200, cached=False):
+        """Количество SQL-запросов при повторном открытии страницы (без кэша страниц, если не cached)"""
+        if not cached:
+            cache.clear()
+        self.fetch(url)
+        if not cached:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.fetch(url)
+        self.assertEqual(response.status_code, status)
+        return len(queries.captured_queries)
+
+    def fetch(self, url):
+        """GET-запрос с чтением потокового ответа целиком (запросы выгрузки выполняются при чтении)"""
+        response = self.client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+
+class StatisticsQueryBudgetTest(EnterpriseUserTestCase):
+    QUERY_BUDGET = 10
+
+    def test_query_count_does_not_depend_on_fleet_size(self):
+        create_fleet(self.enterprise, 2, prefix='A')
+        small_fleet = self.count_queries(reverse('statistics'))
+
+        create_fleet(self.enterprise, 20, prefix='B')
+        large_fleet = self.count_queries(reverse('statistics'))
+
+        self.assertEqual(small_fleet, large_fleet)
+        self.assertLessEqual(large_fleet, self.QUERY_BUDGET)
+
+    def test_totals_and_per_cable_counts(self):
+        create_fleet(self.enterprise, 3, sessions_per_cable=2)
+
+        response = self.client.get(reverse('statistics'))
+
+        self.assertEqual(response.context['total_cables'], 3)
+        self.assertEqual(response.context['total_measurements'], 6)
+        self.assertEqual(response.context['total_tests'], 3)
+        self.assertEqual(response.context['total_accidents'], 2)
+        cable = response.context['cable_lines'][0]
+        self.assertEqual(cable.session_count, 2)
+        self.assertEqual(cable.test_count, 1)
+        self.assertEqual(cable.accident_count, 1)
+        self.assertEqual(cable.last_measurement_date, date(2024, 1, 31))
+
+
+class HistoryExportTest(EnterpriseUserTestCase):
+    def setUp(self):
+        super().setUp()
+        create_fleet(self.enterprise, 3, sessions_per_cable=2)
+        create_fleet(Enterprise.objects.create(name='Другое предприятие'), 2, prefix='Д')
+
+    def download(self, **params):
+        response = self.client.get(reverse('export_history'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def csv_rows(self, data):
+        return list(csv.reader(io.StringIO(data.decode('utf-8'))))
+
+    def test_csv_of_enterprise_only(self):
+        rows = self.csv_rows(self.download(dataset='measurements', format='csv'))
+
+        self.assertEqual(rows[0], ['cable_number', 'session_id', 'session_date', 'voltage_level',
+                                   'core_1_discharge', 'core_1_distance', 'core_2_discharge', 'core_2_distance',
+                                   'core_3_discharge', 'core_3_distance'])
+        self.assertEqual(len(rows) - 1, 12)
+        self.assertTrue(all(row[0].startswith('КЛ-') for row in rows[1:]))
+
+    def test_date_filter(self):
+        rows = self.csv_rows(self.download(dataset='sessions', format='csv', date_from='2024-01-15'))
+
+        self.assertEqual(len(rows) - 1, 3)
+        self.assertEqual({row[2] for row in rows[1:]}, {'2024-01-31'})
+
+    def test_gzip_matches_csv(self):
+        data = self.download(dataset='accidents', format='csv.gz')
+
+        self.assertEqual(gzip.decompress(data), self.download(dataset='accidents', format='csv'))
+        self.assertEqual(len(self.csv_rows(gzip.decompress(data))) - 1, 2)
+
+    @skipUnless(parquet_available(), 'нужен pyarrow')
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(io.BytesIO(self.download(dataset='tests', format='parquet')))
+
+        self.assertEqual(table.column_names, ['cable_number', 'test_id', 'test_date', 'test_voltage',
+                                              'insulation_resistance', 'created_at'])
+        self.assertEqual(table.num_rows, 3)
+
+    def test_rows_read_in_keyset_chunks(self):
+        expected = list(export_rows('measurements', enterprise=self.enterprise, chunk_size=1000))
+
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(export_rows('measurements', enterprise=self.enterprise, chunk_size=5))
+
+        self.assertEqual(rows, expected)
+        # 12 строк: порции 5, 5 и 2
+        self.assertEqual(len(queries.captured_queries), 3)
+        self.assertNotIn('OFFSET', queries.captured_queries[-1]['sql'].upper())
+
+    def test_command_rejects_bad_dates(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        with tempfile.TemporaryDirectory() as directory:
+            for option, value in (('date_from', '15.01.2024'), ('date_to', '2024-02-30'), ('date_to', 'вчера')):
+                with self.subTest(**{option: value}), self.assertRaisesMessage(CommandError, 'Некорректная дата'):
+                    call_command('export_history', directory, dataset=['sessions'], **{option: value})
+            self.assertEqual(os.listdir(directory), [])
+
+            call_command('export_history', directory, dataset=['sessions'], date_from='2024-01-15', stdout=io.StringIO())
+            with open(os.path.join(directory, 'sessions.csv'), encoding='utf-8') as f:
+                # Без --enterprise выгружаются оба предприятия
+                self.assertEqual(len(self.csv_rows(f.read().encode('utf-8'))) - 1, 5)
+
+
+class HistoryPaginationTest(EnterpriseUserTestCase):
+    """JSON-страницы истории линии: курсор, окно дат и проверка доступа"""
+
+    def setUp(self):
+        super().setUp()
+        self.cable = create_fleet(self.enterprise, 1)[0]
+        # Несколько записей на одну дату: порядок внутри даты задаёт id
+        PDDMeasurementSession.objects.bulk_create([
+            PDDMeasurementSession(cable_line=self.cable, session_date=date(2024, 1, 1) + timedelta(days=i // 3))
+            for i in range(10)
+        ])
+        HighVoltageTest.objects.bulk_create([
+            HighVoltageTest(cable_line=self.cable, test_date=date(2024, 2, 1) + timedelta(days=i // 4),
+                            test_voltage=24, insulation_resistance=500)
+            for i in range(9)
+        ])
+        Accident.objects.bulk_create([
+            Accident(cable_line=self.cable, accident_date=datetime(2024, 3, 1, 12, tzinfo=dt_timezone.utc)
+                     + timedelta(days=i // 2), accident_type='other', description=f'Авария {i}')
+            for i in range(7)
+        ])
+
+    def endpoints(self):
+        return [
+            ('cable_sessions_json', PDDMeasurementSession.objects.filter(cable_line=self.cable), 'session_date'),
+            ('cable_tests_json', HighVoltageTest.objects.filter(cable_line=self.cable), 'test_date'),
+            ('cable_accidents_json', Accident.objects.filter(cable_line=self.cable), 'accident_date'),
+        ]
+
+    def collect(self, url, **params):
+        """id всех записей, пройденных по курсору, и число страниц"""
+        ids, pages, cursor = [], 0, None
+        while True:
+            query = dict(params, **({'before': cursor} if cursor else {}))
+            response = self.client.get(url, query)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            ids.extend(item['id'] for item in data['items'])
+            pages += 1
+            cursor = data['next_cursor']
+            if cursor is None:
+                return ids, pages
+
+    def test_cursor_pages_have_no_duplicates_or_gaps(self):
+        for name, queryset, date_field in self.endpoints():
+            with self.subTest(endpoint=name):
+                expected = list(queryset.order_by(f'-{date_field}', '-id').values_list('id', flat=True))
+                ids, pages = self.collect(reverse(name, args=[self.cable.pk]), limit=3)
+                self.assertEqual(ids, expected)
+                self.assertEqual(pages, -(-len(expected) // 3))
+
+    def test_date_window(self):
+        for name, queryset, date_field in self.endpoints():
+            with self.subTest(endpoint=name):
+                dates = sorted({value.date() if isinstance(value, datetime) else value
+                                for value in queryset.values_list(date_field, flat=True)})
+                date_from, date_to = dates[1], dates[-2]
+                lookup = f'{date_field}__date' if date_field == 'accident_date' else date_field
+                expected = list(queryset.filter(**{f'{lookup}__gte': date_from, f'{lookup}__lte': date_to}).order_by(
+                    f'-{date_field}', '-id').values_list('id', flat=True))
+
+                ids, _ = self.collect(reverse(name, args=[self.cable.pk]), limit=2,
+                                      date_from=date_from.isoformat(), date_to=date_to.isoformat())
+                self.assertEqual(ids, expected)
+                self.assertLess(len(ids), queryset.count())
+
+    def test_rejects_bad_parameters_and_foreign_cable(self):
+        other = create_fleet(Enterprise.objects.create(name='Другое предприятие'), 1, prefix='Д')[0]
+        for name, _, _ in self.endpoints():
+            with self.subTest(endpoint=name):
+                url = reverse(name, args=[self.cable.pk])
+                self.assertEqual(self.client.get(url, {'before': 'не курсор'}).status_code, 400)
+                self.assertEqual(self.client.get(url, {'before': 'WzFd'}).status_code, 400)
+                self.assertEqual(self.client.get(url, {'date_from': '2024-13-01'}).status_code, 400)
+                self.assertEqual(self.client.get(url, {'date_to': 'вчера'}).status_code, 400)
+                self.assertEqual(self.client.get(reverse(name, args=[other.pk])).status_code, 404)
+
+
+class TrainingJobHeartbeatTest(IsolatedModelMixin, EnterpriseUserTestCase):
+    def running_job(self, started_ago, heartbeat_ago):
+        now = django_timezone.now()
+        return TrainingJob.objects.create(status=TrainingJob.STATUS_RUNNING, started_at=now - started_ago,
+                                          heartbeat_at=now - heartbeat_ago)
+
+    def test_stale_by_heartbeat_not_start_time(self):
+        long_run = self.running_job(timedelta(hours=5), timedelta(minutes=1))
+        silent = self.running_job(timedelta(minutes=30), timedelta(minutes=20))
+
+        self.assertEqual(fail_stale_jobs(), 1)
+        long_run.refresh_from_db()
+        silent.refresh_from_db()
+        self.assertEqual(long_run.status, TrainingJob.STATUS_RUNNING)
+        self.assertEqual(silent.status, TrainingJob.STATUS_FAILED)
+
+    def test_progress_updates_heartbeat(self):
+        job, _ = enqueue_training(self.user, mode=TrainingJob.MODE_FULL)
+        job = claim_next_job()
+        TrainingJob.objects.filter(pk=job.pk).update(heartbeat_at=django_timezone.now() - timedelta(minutes=20))
+
+        def train_model(analyzer, progress=None, mode='auto'):
+            progress(50, 'Обучение')
+            self.assertEqual(fail_stale_jobs(), 0)
+            return True
+
+        with mock.patch('cable_manager.ai_analyzer.CableAIAnalyzer.train_model', train_model):
+            job = run_job(job)
+        self.assertEqual(job.status, TrainingJob.STATUS_SUCCEEDED)
+
+    def test_abandoned_job_stops_and_keeps_failed_status(self):
+        job, _ = enqueue_training(self.user, mode=TrainingJob.MODE_FULL)
+        job = claim_next_job()
+        published = []
+
+        def train_model(analyzer, progress=None, mode='auto'):
+            TrainingJob.objects.filter(pk=job.pk).update(heartbeat_at=django_timezone.now() - timedelta(hours=1))
+            fail_stale_jobs()
+            progress(80, 'Сохранение модели и пересчёт оценок риска')
+            published.append(mode)
+            return True
+
+        with mock.patch('cable_manager.ai_analyzer.CableAIAnalyzer.train_model', train_model), \
+                mock.patch('cable_manager.ai_analyzer.CableAIAnalyzer.train_with_synthetic_data') as synthetic:
+            job = run_job(job)
+
+        self.assertEqual(published, [])
+        synthetic.assert_not_called()
+        self.assertEqual(job.status, TrainingJob.STATUS_FAILED)
+        self.assertEqual(job.message, 'Воркер не завершил обучение')
+
+    def test_final_status_written_only_while_running(self):
+        job, _ = enqueue_training(self.user, mode=TrainingJob.MODE_FULL)
+        job = claim_next_job()
+
+        def train_model(analyzer, progress=None, mode='auto'):
+            TrainingJob.objects.filter(pk=job.pk).update(status=TrainingJob.STATUS_FAILED, message='Зависла')
+            return True
+
+        with mock.patch('cable_manager.ai_analyzer.CableAIAnalyzer.train_model', train_model):
+            job = run_job(job)
+        self.assertEqual(job.status, TrainingJob.STATUS_FAILED)
+        self.assertEqual(job.message, 'Зависла')
+
+
+class TrainingQueueTest(IsolatedModelMixin, EnterpriseUserTestCase):
+    """Очередь обучения: не больше одной активной задачи и захват одним воркером"""
+
+    def test_single_active_job(self):
+        from django.db import IntegrityError, transaction
+
+        job, created = enqueue_training(self.user, mode=TrainingJob.MODE_FULL)
+        self.assertTrue(created)
+        self.assertEqual(enqueue_training(self.user), (job, False))
+
+        # Вставка второй активной задачи (как у одновременного запроса) отклоняется базой
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TrainingJob.objects.create(active_slot=True)
+
+        claimed = claim_next_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, TrainingJob.STATUS_RUNNING)
+        self.assertIsNone(claim_next_job())
+        self.assertEqual(enqueue_training(self.user), (claimed, False))
+        self.assertEqual(TrainingJob.objects.count(), 1)
+
+    def test_slot_released_when_job_finishes(self):
+        job, _ = enqueue_training(self.user)
+        job = claim_next_job()
+        with mock.patch('cable_manager.ai_analyzer.CableAIAnalyzer.train_model', return_value=True):
+            job = run_job(job)
+        self.assertEqual((job.status, job.active_slot), (TrainingJob.STATUS_SUCCEEDED, None))
+
+        stale, created = enqueue_training(self.user)
+        self.assertTrue(created)
+        claim_next_job()
+        TrainingJob.objects.filter(pk=stale.pk).update(heartbeat_at=django_timezone.now() - timedelta(hours=1))
+        self.assertEqual(fail_stale_jobs(), 1)
+        self.assertTrue(enqueue_training(self.user)[1])
+
+    def test_slot_of_job_finished_elsewhere_is_released(self):
+        job, _ = enqueue_training(self.user)
+        TrainingJob.objects.filter(pk=job.pk).update(status=TrainingJob.STATUS_FAILED)
+
+        new_job, created = enqueue_training(self.user)
+        self.assertTrue(created)
+        self.assertNotEqual(new_job.pk, job.pk)
+        job.refresh_from_db()
+        self.assertIsNone(job.active_slot)
+        self.assertEqual(claim_next_job().pk, new_job.pk)
+
+    def test_claim_is_conditional(self):
+        job, _ = enqueue_training(self.user)
+        original_update = type(TrainingJob.objects.all()).update
+
+        def update(queryset, **fields):
+            # Другой воркер захватывает задачу между её выбором и UPDATE
+            original_update(TrainingJob.objects.filter(pk=job.pk), status=TrainingJob.STATUS_RUNNING)
+            return original_update(queryset, **fields)
+
+        with mock.patch.object(type(TrainingJob.objects.all()), 'update', update):
+            self.assertIsNone(claim_next_job())
+
+
+class DerivedDataRefreshTest(EnterpriseUserTestCase):
+    """Пересчёт производных данных по сигналам — один пакет на транзакцию"""
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cable = create_fleet(self.enterprise, 1)[0]
+        self.refreshed = []
+        for target in ('cable_manager.feature_store.refresh_session_features',
+                       'cable_manager.hotspots.update_hotspots',
+                       'cable_manager.trends.update_cable_trends'):
+            patcher = mock.patch(target, side_effect=lambda ids, target=target: self.refreshed.append((target, ids)))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch('cable_manager.ai_analyzer.CableAIAnalyzer.update_risk_scores')
+        self.update_risk_scores = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_form_refreshes_once_per_transaction(self):
+        data = {
+            'cable_line': self.cable.pk, 'session_date': '2024-06-01', 'notes': '',
+            'singlepdmeasurement_set-TOTAL_FORMS': '3', 'singlepdmeasurement_set-INITIAL_FORMS': '0',
+            'singlepdmeasurement_set-MIN_NUM_FORMS': '0', 'singlepdmeasurement_set-MAX_NUM_FORMS': '1000',
+        }
+        for k, voltage in enumerate((5, 10, 15)):
+            data.update({f'singlepdmeasurement_set-{k}-voltage_level': voltage,
+                         f'singlepdmeasurement_set-{k}-core_1_discharge': 100 * voltage,
+                         f'singlepdmeasurement_set-{k}-core_1_distance': 20})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('add_measurement_session'), data)
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+        session = PDDMeasurementSession.objects.get(cable_line=self.cable, session_date=date(2024, 6, 1))
+        self.assertEqual(session.singlepdmeasurement_set.count(), 3)
+        self.assertEqual(self.refreshed, [
+            ('cable_manager.feature_store.refresh_session_features', [session.pk]),
+            ('cable_manager.hotspots.update_hotspots', [session.pk]),
+            ('cable_manager.trends.update_cable_trends', [self.cable.pk]),
+        ])
+        self.update_risk_scores.assert_called_once()
+        self.assertEqual(list(self.update_risk_scores.call_args.args[0]), [self.cable])
+
+    def test_batch_covers_every_changed_cable(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            other = create_fleet(self.enterprise, 1, prefix='Д')[0]
+        self.refreshed.clear()
+        self.update_risk_scores.reset_mock()
+        sessions = PDDMeasurementSession.objects.filter(cable_line__in=[self.cable, other]).order_by('pk')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for session in sessions:
+                SinglePDMeasurement.objects.create(session=session, voltage_level=15, core_1_discharge=200)
+
+        session_ids = [session.pk for session in sessions]
+        self.assertEqual(self.refreshed, [
+            ('cable_manager.feature_store.refresh_session_features', session_ids),
+            ('cable_manager.hotspots.update_hotspots', session_ids),
+            ('cable_manager.trends.update_cable_trends', sorted([self.cable.pk, other.pk])),
+        ])
+        self.update_risk_scores.assert_called_once()
+        self.assertCountEqual(self.update_risk_scores.call_args.args[0], [self.cable, other])
+
+
+class MeasurementImportTest(EnterpriseUserTestCase):
+    """Импорт CSV-файла измерений ЧР"""
+
+    def setUp(self):
+        super().setUp()
+        self.cable = create_fleet(self.enterprise, 1)[0]
+
+    def import_lines(self, text, **kwargs):
+        return import_measurements(io.StringIO(text), enterprise=self.enterprise, **kwargs)
+
+    def test_reimport_reuses_sessions(self):
+        text = ('cable_number,session_date,voltage_level,core_1_discharge\n'
+                'КЛ-0000,2024-06-01,5,100\n'
+                'КЛ-0000,2024-06-01,10,200\n'
+                'КЛ-0000,01.01.2024,15,300\n')
+        sessions = PDDMeasurementSession.objects.count()
+
+        first = self.import_lines(text)
+        self.assertEqual((first.sessions_created, first.sessions_updated, first.measurements_created), (1, 1, 3))
+        # Дата 01.01.2024 — сессия, созданная вне импорта
+        self.assertEqual(PDDMeasurementSession.objects.filter(
+            cable_line=self.cable, session_date=date(2024, 1, 1)).get().singlepdmeasurement_set.count(), 3)
+
+        second = self.import_lines(text, batch_size=1)
+        self.assertEqual((second.sessions_created, second.sessions_updated, second.measurements_created), (0, 2, 3))
+        self.assertEqual(PDDMeasurementSession.objects.count(), sessions + 1)
+        self.assertEqual(PDDMeasurementSession.objects.get(
+            cable_line=self.cable, session_date=date(2024, 6, 1)).singlepdmeasurement_set.count(), 4)
+
+    def test_row_errors_reported(self):
+        create_fleet(Enterprise.objects.create(name='Другое предприятие'), 1, prefix='Д')
+        result = self.import_lines(
+            'cable_number,session_date,voltage_level,core_1_discharge\n'
+            'КЛ-0000,2024-06-01,5,100\n'
+            'КЛ-9999,2024-06-01,5,100\n'
+            'Д-0000,2024-06-01,5,100\n'
+            '\n'
+            'КЛ-0000,2024-13-45,5,100\n'
+            'КЛ-0000,2024-06-01,,100\n'
+            'КЛ-0000,2024-06-01,5,-1\n'
+            'КЛ-0000,2024-06-01,5,много\n'
+            'КЛ-0000,2024-06-01,10,200\n'
+        )
+
+        self.assertEqual((result.rows, result.measurements_created, result.error_count), (8, 2, 6))
+        self.assertEqual([line for line, _ in result.errors], [3, 4, 6, 7, 8, 9])
+        self.assertIn("'КЛ-9999' не найдена", result.errors[0][1])
+        self.assertIn("'Д-0000' не найдена", result.errors[1][1])
+        self.assertIn('некорректная дата', result.errors[2][1])
+        self.assertIn('не заполнено поле voltage_level', result.errors[3][1])
+        self.assertIn('отрицательное значение', result.errors[4][1])
+        self.assertIn('некорректное число', result.errors[5][1])
+
+    def test_semicolon_delimiter_and_decimal_comma(self):
+        result = self.import_lines(
+            '\ufeffcable_number;session_date;voltage_level;core_1_discharge;core_1_distance;notes\n'
+            'КЛ-0000;15.07.2024;7,5;1234,5;12,25;Плановые\n'
+        )
+
+        self.assertEqual((result.measurements_created, result.error_count), (1, 0))
+        session = PDDMeasurementSession.objects.get(cable_line=self.cable, session_date=date(2024, 7, 15))
+        self.assertEqual(session.notes, 'Плановые')
+        measurement = session.singlepdmeasurement_set.get()
+        self.assertEqual((measurement.voltage_level, measurement.core_1_discharge, measurement.core_1_distance),
+                         (7.5, 1234.5, 12.25))
+
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(ValueError, 'session_date, voltage_level'):
+            self.import_lines('cable_number;core_1_discharge\nКЛ-0000;100\n')
+
+    def test_backend_without_returned_ids(self):
+        text = ('cable_number,session_date,voltage_level,core_1_discharge\n'
+                'КЛ-0000,2024-06-01,5,100\n'
+                'КЛ-0000,2024-07-01,5,200\n'
+                'КЛ-0000,2024-07-01,10,300\n')
+        receiver = mock.Mock()
+        post_save.connect(receiver, sender=PDDMeasurementSession, dispatch_uid='import_test_receiver')
+        self.addCleanup(post_save.disconnect, sender=PDDMeasurementSession, dispatch_uid='import_test_receiver')
+
+        # Как на MySQL: bulk_create не возвращает id, сессии не сохраняются по одной через save()
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert',
+                               new_callable=mock.PropertyMock, return_value=False):
+            result = self.import_lines(text)
+
+        receiver.assert_not_called()
+        self.assertEqual((result.sessions_created, result.measurements_created), (2, 3))
+        sessions = PDDMeasurementSession.objects.filter(cable_line=self.cable, session_date__gte=date(2024, 6, 1))
+        self.assertEqual(sorted(result.session_ids), sorted(sessions.values_list('pk', flat=True)))
+        self.assertEqual([session.singlepdmeasurement_set.count() for session in sessions.order_by('session_date')],
+                         [1, 2])
+
+    def test_import_invalidates_enterprise_cache(self):
+        from .page_cache import enterprise_version
+
+        version = enterprise_version(self.enterprise.pk)
+        # Сброс не зависит от пересчёта оценок риска после импорта
+        with self.captureOnCommitCallbacks(execute=True), \
+                mock.patch('cable_manager.pd_import.MeasurementImporter.refresh_derived_data'):
+            self.import_lines('cable_number,session_date,voltage_level\nКЛ-0000,2024-06-01,5\n')
+        self.assertNotEqual(enterprise_version(self.enterprise.pk), version)
+
+    def test_refresh_error_logged(self):
+        with mock.patch('cable_manager.feature_store.refresh_session_features', side_effect=RuntimeError('сбой')), \
+                self.assertLogs('cable_manager.pd_import', 'ERROR') as logs:
+            result = self.import_lines('cable_number,session_date,voltage_level\nКЛ-0000,2024-06-01,5\n')
+        self.assertEqual(result.measurements_created, 1)
+        self.assertIn('Ошибка пересчёта оценок после импорта', logs.output[0])
+        self.assertIn('RuntimeError', logs.output[0])
+
+
+class ModelSelectionTest(TestCase):
+    """Подбор гиперпараметров с проверкой во времени"""
+
+    def data(self):
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        dates = [date(2020, 1, 1) + timedelta(days=int(day)) for day in rng.integers(0, 1500, 400)]
+        features = rng.normal(size=(400, 5))
+        labels = (features[:, 0] + rng.normal(size=400) > 0.8).astype(int)
+        return dates, features, labels
+
+    def test_settings_read_at_call_time(self):
+        from .model_selection import search_candidates, time_series_folds
+
+        dates, _, labels = self.data()
+        with self.settings(CABLE_AI_CV_FOLDS=2, CABLE_AI_SEARCH_CANDIDATES=3):
+            self.assertEqual(len(time_series_folds(dates, labels)), 2)
+            self.assertEqual(len(search_candidates()), 3)
+        with self.settings(CABLE_AI_CV_FOLDS=5, CABLE_AI_SEARCH_CANDIDATES=6):
+            self.assertEqual(len(time_series_folds(dates, labels)), 5)
+            self.assertEqual(len(search_candidates()), 6)
+
+    def test_process_pool_matches_inline_search(self):
+        import numpy as np
+        from .model_selection import search_candidates, search_parameters, time_series_folds
+
+        dates, features, labels = self.data()
+        folds = time_series_folds(dates, labels, n_splits=2)
+        candidates = search_candidates(count=2)
+
+        inline, _ = search_parameters(features, labels, folds, candidates, budget=60, workers=1)
+        pooled, exhausted = search_parameters(features, labels, folds, candidates, budget=60, workers=2)
+
+        self.assertFalse(exhausted)
+        self.assertEqual([result['params'] for result in pooled], [result['params'] for result in inline])
+        for expected, actual in zip(inline, pooled):
+            self.assertEqual(actual['roc_auc'], expected['roc_auc'])
+            for expected_fold, actual_fold in zip(expected['probabilities'], actual['probabilities']):
+                np.testing.assert_array_equal(actual_fold, expected_fold)
+
+    def test_over_budget_tasks_finish_before_return(self):
+        from .model_selection import search_candidates, search_parameters, time_series_folds
+
+        dates, features, labels = self.data()
+        folds = time_series_folds(dates, labels, n_splits=2)
+        from concurrent.futures import ProcessPoolExecutor
+
+        with mock.patch.object(ProcessPoolExecutor, 'shutdown', autospec=True,
+                               side_effect=ProcessPoolExecutor.shutdown) as shutdown:
+            results, exhausted = search_parameters(features, labels, folds, search_candidates(count=4),
+                                                   budget=0, workers=2)
+        self.assertEqual((results, exhausted), ([], True))
+        self.assertEqual(shutdown.call_args.kwargs, {'wait': True, 'cancel_futures': True})
+
+
+class CompiledModelTest(TestCase):
+    """Скомпилированная модель даёт те же вероятности, что и исходный лес scikit-learn"""
+
+    def data(self, rows=600, seed=0):
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        features = rng.normal(size=(rows, 8)) * [1, 10, 100, 1e3, 0.01, 1, 1, 1]
+        # Повторяющиеся значения дают пороги ровно посередине между соседними значениями признака
+        features[:, 5] = rng.integers(0, 4, rows)
+        labels = (features[:, 0] + features[:, 5] / 2 + rng.normal(size=rows) > 1.2).astype(int)
+        return features, labels
+
+    def assertSameProbabilities(self, model, scaler, features):
+        import numpy as np
+        from .compiled_model import compile_model, load_compiled_model, save_compiled_model, CompiledForest, \
+            CompiledScaler
+
+        expected = model.predict_proba(scaler.transform(features))
+        arrays = compile_model(model, scaler)
+        forest = CompiledForest(
+            arrays['feature'], arrays['threshold'], arrays['children_left'], arrays['children_right'],
+            arrays['value'], arrays['roots'], arrays['max_depth'], arrays['classes'], arrays['feature_importances'],
+        )
+        compiled_scaler = CompiledScaler(arrays['mean'], arrays['scale'])
+        np.testing.assert_array_equal(forest.predict_proba(compiled_scaler.transform(features)), expected)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.npz')
+            save_compiled_model(model, scaler, 'v1', path)
+            loaded_forest, loaded_scaler, version = load_compiled_model(path)
+        self.assertEqual(version, 'v1')
+        np.testing.assert_array_equal(loaded_scaler.transform(features), scaler.transform(features))
+        np.testing.assert_array_equal(loaded_forest.predict_proba(loaded_scaler.transform(features)), expected)
+        np.testing.assert_array_equal(loaded_forest.predict(loaded_scaler.transform(features)),
+                                      model.predict(scaler.transform(features)))
+        np.testing.assert_array_equal(loaded_forest.feature_importances_, model.feature_importances_)
+
+    def fitted(self, model, features, labels):
+        from sklearn.preprocessing import StandardScaler
+
+        scaler = StandardScaler().fit(features)
+        return model.fit(scaler.transform(features), labels), scaler
+
+    def test_forests_match_sklearn(self):
+        from sklearn.ensemble import RandomForestClassifier
+
+        features, labels = self.data()
+        test_features, _ = self.data(rows=2000, seed=1)
+        forests = {
+            'default': RandomForestClassifier(n_estimators=20, random_state=0),
+            'deep': RandomForestClassifier(n_estimators=10, max_depth=None, min_samples_leaf=1, bootstrap=False,
+                                           random_state=0),
+            'class_weight': RandomForestClassifier(n_estimators=20, max_depth=6, class_weight='balanced',
+                                                   random_state=0),
+        }
+        for name, model in forests.items():
+            with self.subTest(forest=name):
+                model, scaler = self.fitted(model, features, labels)
+                # Обучающие строки проверяют пороги, попадающие ровно между значениями признаков
+                self.assertSameProbabilities(model, scaler, features)
+                self.assertSameProbabilities(model, scaler, test_features)
+
+    def test_warm_started_forest_matches_sklearn(self):
+        from sklearn.ensemble import RandomForestClassifier
+
+        features, labels = self.data()
+        model, scaler = self.fitted(RandomForestClassifier(n_estimators=10, random_state=0), features, labels)
+        more_features, more_labels = self.data(seed=2)
+        model.set_params(warm_start=True, n_estimators=25)
+        model.fit(scaler.transform(more_features), more_labels)
+
+        self.assertEqual(len(model.estimators_), 25)
+        self.assertSameProbabilities(model, scaler, self.data(rows=1000, seed=3)[0])
+
+    @mock.patch('cable_manager.compiled_model.PREDICT_BATCH_SIZE', 7)
+    def test_batched_prediction(self):
+        from sklearn.ensemble import RandomForestClassifier
+
+        features, labels = self.data(rows=100)
+        model, scaler = self.fitted(RandomForestClassifier(n_estimators=5, random_state=0), features, labels)
+        self.assertSameProbabilities(model, scaler, features)
+
+
+class ModelRegistryTest(TestCase):
+    """Публикация, перезагрузка по изменению файлов и откат при отсутствии или порче модели"""
+
+    def setUp(self):
+        from .metrics import collector
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        for attr, value in (('directory', os.path.join(self.directory, 'metrics')), ('_series', {})):
+            patcher = mock.patch.object(collector, attr, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.mtime = time.time_ns()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def new_registry(self, check_interval=0):
+        from .model_registry import ModelRegistry
+        return ModelRegistry(self.path('model.pkl'), self.path('scaler.pkl'), self.path('model.json'),
+                             check_interval=check_interval)
+
+    def save(self, version, extra_features=()):
+        """Сохранение модели как при обучении; отметки времени файлов растут на секунду при каждом сохранении"""
+        from .model_registry import atomic_dump, atomic_write_json
+        atomic_dump({'model': version}, self.path('model.pkl'))
+        atomic_dump({'scaler': version}, self.path('scaler.pkl'))
+        atomic_write_json({'version': version, 'extra_features': list(extra_features)}, self.path('model.json'))
+        self.touch('model.pkl', 'scaler.pkl', 'model.json')
+
+    def touch(self, *names):
+        self.mtime += 10 ** 9
+        for name in names:
+            os.utime(self.path(name), ns=(self.mtime, self.mtime))
+
+    def test_publish_serves_without_reading_files(self):
+        writer = self.new_registry(check_interval=60)
+        self.save('v1', ['trend'])
+        model, scaler = {'model': 'v1'}, {'scaler': 'v1'}
+
+        with mock.patch('cable_manager.model_registry.joblib.load') as load:
+            writer.publish(model, scaler, 'v1', ['trend'])
+            loaded = writer.get()
+        load.assert_not_called()
+        self.assertIs(loaded.model, model)
+        self.assertIs(loaded.scaler, scaler)
+        self.assertEqual((loaded.version, loaded.extra_features), ('v1', ['trend']))
+        self.assertEqual(writer.stored_version(), 'v1')
+
+    def test_other_registry_reloads_changed_files(self):
+        writer, reader = self.new_registry(), self.new_registry()
+        self.assertIsNone(reader.get())
+
+        self.save('v1')
+        writer.publish({'model': 'v1'}, {'scaler': 'v1'}, 'v1')
+        self.assertEqual(reader.get().model, {'model': 'v1'})
+
+        self.save('v2', ['trend'])
+        writer.publish({'model': 'v2'}, {'scaler': 'v2'}, 'v2', ['trend'])
+        loaded = reader.get()
+        self.assertEqual((loaded.model, loaded.version, loaded.extra_features), ({'model': 'v2'}, 'v2', ['trend']))
+
+        # Неизменённые файлы повторно не читаются
+        with mock.patch('cable_manager.model_registry.joblib.load') as load:
+            self.assertIs(reader.get(), loaded)
+        load.assert_not_called()
+
+    def test_touched_file_reloaded_after_check_interval(self):
+        self.save('v1')
+        reader = self.new_registry(check_interval=60)
+        first = reader.get()
+        self.assertEqual(first.version, 'v1')
+
+        self.touch('model.pkl')
+        self.assertIs(reader.get(), first)
+        with mock.patch('cable_manager.model_registry.time.monotonic', return_value=time.monotonic() + 61):
+            second = reader.get()
+        self.assertIsNot(second, first)
+        self.assertEqual(second.version, 'v1')
+
+    def test_missing_or_corrupt_files(self):
+        reader = self.new_registry()
+        self.save('v1')
+        self.assertEqual(reader.get().version, 'v1')
+
+        os.remove(self.path('scaler.pkl'))
+        self.assertIsNone(reader.get())
+        self.assertIsNone(reader.stored_version())
+
+        self.save('v2')
+        with open(self.path('model.pkl'), 'wb') as f:
+            f.write(b'not a pickle')
+        self.touch('model.pkl')
+        self.assertIsNone(reader.get())
+        self.assertIsNone(reader.estimators('v2'))
+
+        # Без метаданных версия берётся из отметки времени файла модели
+        self.save('v3')
+        with open(self.path('model.json'), 'w', encoding='utf-8') as f:
+            f.write('{')
+        self.touch('model.json')
+        loaded = reader.get()
+        self.assertEqual(loaded.model, {'model': 'v3'})
+        self.assertEqual(loaded.version, str(os.stat(self.path('model.pkl')).st_mtime_ns))
+        self.assertEqual(loaded.extra_features, [])
+
+
+class FeatureStoreTest(EnterpriseUserTestCase):
+    """Хранилище векторов признаков сессий"""
+
+    def setUp(self):
+        super().setUp()
+        self.cables = create_bulk_fleet(self.enterprise, 5)
+        self.sessions = list(PDDMeasurementSession.objects.order_by('pk'))
+
+    def on_the_fly(self, session_ids=None):
+        from .feature_store import session_features
+        measurements, traces = SinglePDMeasurement.objects.all(), PDTrace.objects.all()
+        if session_ids is not None:
+            measurements = measurements.filter(session_id__in=session_ids)
+            traces = traces.filter(session_id__in=session_ids)
+        return session_features(measurements, traces).sort_index()
+
+    def test_vector_round_trip_keeps_float64(self):
+        import numpy as np
+        from .feature_store import SESSION_FEATURE_COLUMNS, VECTOR_DTYPE, load_session_features
+
+        session = self.sessions[0]
+        # Значения, которые float32 не хранит без потерь
+        SinglePDMeasurement.objects.filter(session=session).update(core_1_discharge=123.456789012345678,
+                                                                   core_1_distance=1e-12)
+        computed = load_session_features([session.pk])
+
+        blob = bytes(SessionFeatureVector.objects.get(session=session).vector)
+        self.assertEqual(len(blob), len(SESSION_FEATURE_COLUMNS) * VECTOR_DTYPE.itemsize)
+        np.testing.assert_array_equal(np.frombuffer(blob, dtype=VECTOR_DTYPE), computed.loc[session.pk].to_numpy())
+
+        with CaptureQueriesContext(connection) as queries:
+            stored = load_session_features([session.pk])
+        self.assertNotIn('INSERT', ' '.join(query['sql'] for query in queries.captured_queries))
+        self.assertEqual(stored.loc[session.pk, 'core_1_discharge_max'], 123.456789012345678)
+        np.testing.assert_array_equal(stored.to_numpy(), self.on_the_fly([session.pk]).to_numpy())
+
+    def test_refreshed_on_session_change(self):
+        import numpy as np
+        from .feature_store import load_session_features
+
+        session = self.sessions[0]
+        load_session_features([session.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            SinglePDMeasurement.objects.create(session=session, voltage_level=20, core_3_discharge=500,
+                                               core_3_distance=42)
+
+        stored = load_session_features([session.pk])
+        self.assertEqual(stored.loc[session.pk, 'measurement_count'], 3)
+        self.assertEqual(stored.loc[session.pk, 'core_3_discharge_max'], 500)
+        np.testing.assert_array_equal(stored.to_numpy(), self.on_the_fly([session.pk]).to_numpy())
+
+        # Сессия без измерений из хранилища удаляется
+        with self.captureOnCommitCallbacks(execute=True):
+            for measurement in SinglePDMeasurement.objects.filter(session=session):
+                measurement.delete()
+        self.assertFalse(SessionFeatureVector.objects.filter(session=session).exists())
+
+    def test_rebuild_matches_on_the_fly_extraction(self):
+        import numpy as np
+        from .feature_store import load_session_features, rebuild_feature_store
+
+        # Вектор устаревшей схемы и вектор сессии, измерения которой изменены без сигналов
+        SessionFeatureVector.objects.create(session=self.sessions[0], schema_version=0, vector=b'')
+        load_session_features([self.sessions[1].pk])
+        SinglePDMeasurement.objects.filter(session=self.sessions[1]).update(voltage_level=35)
+
+        self.assertEqual(rebuild_feature_store(batch_size=7), len(self.sessions))
+
+        self.assertEqual(SessionFeatureVector.objects.exclude(schema_version=1).count(), 0)
+        expected = self.on_the_fly()
+        with CaptureQueriesContext(connection) as queries:
+            stored = load_session_features().sort_index()
+        self.assertNotIn('INSERT', ' '.join(query['sql'] for query in queries.captured_queries))
+        self.assertEqual(list(stored.index), list(expected.index))
+        np.testing.assert_array_equal(stored.to_numpy(), expected.to_numpy())
+        self.assertEqual(stored.loc[self.sessions[1].pk, 'voltage_max'], 35)
+
+
+class TrendTest(EnterpriseUserTestCase):
+    """Тренды ЧР по скользящему окну сессий"""
+
+    def test_grouped_regression_matches_polyfit(self):
+        import numpy as np
+        import pandas as pd
+        from .trends import session_trends, DAYS_PER_YEAR
+
+        rng = np.random.default_rng(0)
+        rows = []
+        for cable_id in range(1, 6):
+            day = 0
+            # Разное число сессий (в том числе меньше окна) и неравные интервалы между ними
+            for _ in range(cable_id * 2):
+                day += int(rng.integers(20, 400))
+                rows.append({'session_id': len(rows) + 1, 'cable_line_id': cable_id,
+                             'session_date': date(2018, 1, 1) + timedelta(days=day),
+                             **{f'core_{core}': float(rng.gamma(2, 300)) for core in (1, 2, 3)}})
+        sessions = pd.DataFrame(rows)
+        window = 5
+
+        trends = session_trends(sessions.sample(frac=1, random_state=0), window=window)
+
+        for cable_id, group in sessions.groupby('cable_line_id'):
+            for end in range(len(group)):
+                history = group.iloc[max(0, end - window + 1):end + 1]
+                current = group.iloc[end]
+                t = np.array([(d - current['session_date']).days / DAYS_PER_YEAR for d in history['session_date']])
+                trend = trends.loc[current['session_id']]
+                self.assertEqual(trend['window_sessions'], len(history))
+                for core in (1, 2, 3):
+                    y = history[f'core_{core}'].to_numpy()
+                    expected = {'slope': 0.0, 'growth': 0.0, 'accel': 0.0}
+                    if len(history) >= 2:
+                        expected['slope'] = np.polyfit(t, y, 1)[0]
+                        expected['growth'] = np.polyfit(t, np.log1p(y), 1)[0]
+                    if len(history) >= 3:
+                        expected['accel'] = 2 * np.polyfit(t, y, 2)[0]
+                    for metric, value in expected.items():
+                        with self.subTest(cable=cable_id, session=end, core=core, metric=metric):
+                            self.assertAlmostEqual(trend[f'trend_core_{core}_{metric}'], value,
+                                                   delta=1e-6 * max(1.0, abs(value)))
+
+    def test_session_values_aligned_with_sessions(self):
+        from django.db.models import Max
+        from .trends import cable_session_values, load_trend_features, update_cable_trends
+
+        create_bulk_fleet(self.enterprise, 6)
+        cable_ids = list(CableLine.objects.order_by('-pk').values_list('pk', flat=True)[:3])
+
+        values = cable_session_values(cable_ids)
+        # Индекс после слияния — позиционный: уровень session_id конфликтовал бы со столбцом
+        self.assertEqual(list(values.index), list(range(len(values))))
+        expected = {
+            session['pk']: (session['cable_line_id'], session['core_1'])
+            for session in PDDMeasurementSession.objects.filter(cable_line_id__in=cable_ids).values(
+                'pk', 'cable_line_id').annotate(core_1=Max('singlepdmeasurement__core_1_discharge'))
+        }
+        self.assertEqual({row.session_id: (row.cable_line_id, row.core_1) for row in values.itertuples()}, expected)
+
+        session_ids = list(expected)
+        self.assertEqual(sorted(load_trend_features(session_ids).index), sorted(session_ids))
+        records = update_cable_trends(cable_ids)
+        self.assertEqual(sorted({record.cable_line_id for record in records}), sorted(cable_ids))
+        self.assertTrue(all(record.session_count == 5 for record in records))
+
+        # Линия без сессий: пустой результат слияния раньше получал индекс session_id,
+        # и сортировка по одноимённому столбцу падала
+        empty = CableLine.objects.create(number='Пустая', enterprise=self.enterprise, length=100, core_count=3,
+                                         commissioning_date=date(2020, 1, 1))
+        self.assertIsNone(cable_session_values([empty.pk]).index.name)
+        self.assertEqual(update_cable_trends([empty.pk]), [])
+        self.assertTrue(load_trend_features([]).empty)
+
+
+class HotSpotTest(EnterpriseUserTestCase):
+    """Профили мест ЧР: инкрементальное обновление, перерасчёт и привязка очагов к муфтам"""
+
+    def setUp(self):
+        super().setUp()
+        self.cable = CableLine.objects.create(
+            number='КЛ-М', enterprise=self.enterprise, cable_brand='ААБл-10 3х120', start_muff='КНТп-10',
+            end_muff='КНТп-10', connect_muff_1='СТп-10', connect_muff_1_position=48, connect_muff_2='СТп-10',
+            connect_muff_2_position=90, length=150, core_count=3, commissioning_date=date(2015, 1, 1),
+        )
+
+    def add_session(self, day, *located):
+        """Сессия с измерениями (заряд, расстояние) по первой жиле; сигналы выполняются как после фиксации"""
+        with self.captureOnCommitCallbacks(execute=True):
+            session = PDDMeasurementSession.objects.create(
+                cable_line=self.cable, session_date=date(2024, 1, 1) + timedelta(days=day))
+            for voltage, (charge, distance) in enumerate(located, start=1):
+                SinglePDMeasurement.objects.create(session=session, voltage_level=5 * voltage,
+                                                   core_1_discharge=charge, core_1_distance=distance)
+        return session
+
+    def profile(self):
+        from .hotspots import profile_arrays
+
+        profile = CableHotSpotProfile.objects.get(cable_line=self.cable)
+        weights, hits = profile_arrays(profile)
+        return weights, hits, profile.session_count
+
+    def assertProfileEqual(self, actual, expected):
+        import numpy as np
+
+        np.testing.assert_allclose(actual[0], expected[0])
+        np.testing.assert_array_equal(actual[1], expected[1])
+        self.assertEqual(actual[2], expected[2])
+
+    def test_incremental_updates_match_rebuild(self):
+        from .hotspots import build_profiles
+
+        first = self.add_session(0, (100, 52), (300, 141))
+        self.add_session(30, (120, 55), (50, 12))
+        third = self.add_session(60, (80, 51))
+        self.add_session(90)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            measurement = first.singlepdmeasurement_set.get(core_1_distance=141)
+            measurement.core_1_distance = 75
+            measurement.save()
+            SinglePDMeasurement.objects.create(session=third, voltage_level=20, core_1_discharge=40,
+                                               core_1_distance=500)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.singlepdmeasurement_set.get(core_1_distance=52).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_session(120, (90, 53)).delete()
+
+        incremental = self.profile()
+        build_profiles([self.cable.pk])
+        self.assertProfileEqual(incremental, self.profile())
+        weights, hits, session_count = incremental
+        self.assertEqual(session_count, 4)
+        self.assertEqual(hits[5], 2)
+        # Место за пределами длины линии — в последнем интервале
+        self.assertEqual(weights[-1], 40)
+
+    def test_length_change_rebuilds_profile(self):
+        from .hotspots import cable_hotspots, fleet_hotspots
+
+        for day in (0, 30, 60):
+            self.add_session(day, (100, 52), (200, 240))
+        weights, hits, _ = self.profile()
+        self.assertEqual(len(hits), 15)
+        self.assertEqual(hits[-1], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cable.length = 300
+            self.cable.save()
+
+        clusters = cable_hotspots(self.cable)
+        weights, hits, session_count = self.profile()
+        self.assertEqual((len(hits), hits[24], hits[14], session_count), (30, 3, 0, 3))
+        self.assertEqual([(cluster.start, cluster.end) for cluster in clusters], [(240.0, 250.0), (50.0, 60.0)])
+
+        CableLine.objects.filter(pk=self.cable.pk).update(length=100)
+        [(cable, clusters)] = fleet_hotspots(CableLine.objects.filter(pk=self.cable.pk))
+        self.assertEqual(len(self.profile()[1]), 10)
+        self.assertEqual([(cluster.start, cluster.end) for cluster in clusters], [(90.0, 100.0), (50.0, 60.0)])
+
+    def test_clusters_flag_nearby_joints(self):
+        from .hotspots import cable_hotspots
+
+        for day in (0, 30, 60):
+            self.add_session(day, (100, 55), (40, 125))
+        # Разовая ЧР не образует очага
+        self.add_session(90, (500, 85))
+
+        clusters = cable_hotspots(self.cable)
+
+        self.assertEqual(len(clusters), 2)
+        joint_cluster, free_cluster = clusters
+        self.assertEqual((joint_cluster.start, joint_cluster.end, joint_cluster.persistence), (50.0, 60.0, 0.75))
+        self.assertEqual([joint[0] for joint in joint_cluster.joints], ['Соединительная муфта 1'])
+        self.assertEqual((free_cluster.start, free_cluster.end, free_cluster.joints), (120.0, 130.0, []))
+
+
+class PDTraceStorageTest(EnterpriseUserTestCase):
+    """Хранение трасс импульсов ЧР в БД и в файлах .npy"""
+
+    def setUp(self):
+        super().setUp()
+        trace_root = tempfile.TemporaryDirectory()
+        self.addCleanup(trace_root.cleanup)
+        self.trace_root = trace_root.name
+        for attr, value in (('TRACE_ROOT', self.trace_root), ('TRACE_INLINE_MAX_PULSES', 50)):
+            patcher = mock.patch(f'cable_manager.pd_traces.{attr}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.session = create_fleet(self.enterprise, 1, sessions_per_cable=1)[0].pddmeasurementsession_set.get()
+
+    def pulses(self, count):
+        import numpy as np
+
+        rng = np.random.default_rng(count)
+        return rng.gamma(2, 100, count), rng.uniform(0, 100, count), rng.uniform(0, 360, count)
+
+    def save(self, count):
+        from .pd_traces import save_trace
+
+        saved = mock.Mock()
+        post_save.connect(saved, sender=PDTrace)
+        self.addCleanup(post_save.disconnect, saved, sender=PDTrace)
+        trace = save_trace(self.session, 1, 10.0, *self.pulses(count))
+        self.assertEqual(saved.call_count, 1)
+        return PDTrace.objects.get(pk=trace.pk)
+
+    def assertTraceEqual(self, loaded, count):
+        import numpy as np
+
+        self.assertEqual(loaded.shape, (3, count))
+        self.assertFalse(loaded.flags.writeable)
+        np.testing.assert_array_equal(loaded, np.array(self.pulses(count), dtype=np.float32))
+
+    def test_inline_roundtrip(self):
+        from .pd_traces import load_trace
+
+        trace = self.save(40)
+        self.assertEqual((trace.pulse_count, trace.file_path), (40, ''))
+        self.assertEqual(len(bytes(trace.data)), 3 * 40 * 4)
+        self.assertTraceEqual(load_trace(trace), 40)
+
+    def test_file_roundtrip_and_replacement(self):
+        import numpy as np
+        from .pd_traces import load_trace
+
+        trace = self.save(120)
+        path = os.path.join(self.trace_root, trace.file_path)
+        self.assertIsNone(trace.data)
+        self.assertTrue(os.path.exists(path))
+        loaded = load_trace(trace)
+        self.assertIsInstance(loaded, np.memmap)
+        self.assertTraceEqual(loaded, 120)
+        del loaded
+
+        # Повторная запись той же ступени заменяет запись и удаляет прежний файл
+        replaced = self.save(80)
+        self.assertEqual(replaced.pk, trace.pk)
+        self.assertFalse(os.path.exists(path))
+        self.assertTraceEqual(load_trace(replaced), 80)
+
+        inline = self.save(10)
+        self.assertEqual((inline.pk, inline.file_path), (trace.pk, ''))
+        self.assertEqual(os.listdir(os.path.join(self.trace_root, str(self.session.pk))), [])
+        self.assertTraceEqual(load_trace(inline), 10)
+
+    def test_file_removed_with_trace(self):
+        trace = self.save(120)
+        path = os.path.join(self.trace_root, trace.file_path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            trace.delete()
+        self.assertFalse(os.path.exists(path))
+
+        trace = self.save(120)
+        path = os.path.join(self.trace_root, trace.file_path)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.session.delete()
+        self.assertFalse(os.path.exists(path))
+
+
+class PRPDPatternTest(TestCase):
+    """Фазовые образы ЧР"""
+
+    def test_histograms_match_histogram2d(self):
+        import numpy as np
+        from .prpd import compute_patterns, PRPD_CHARGE_EDGES, PRPD_PHASE_BINS
+
+        rng = np.random.default_rng(0)
+        # Случайные импульсы и значения на границах интервалов, за пределами сетки и с отрицательным знаком
+        phases = np.concatenate([rng.uniform(-360, 720, 5000), np.arange(0, 361, 10.0), [359.999, -0.5]])
+        charges = np.concatenate([
+            rng.lognormal(5, 3, 5000) * rng.choice([-1, 1], 5000),
+            PRPD_CHARGE_EDGES, [0.0, 0.3, 1e7, -2e5],
+        ])
+        charges = np.resize(charges, len(phases))
+        # Третья сессия без импульсов
+        groups = np.resize([0, 1, 0, 1, 1, 3], len(phases))
+
+        histograms, features = compute_patterns(phases, charges, groups, 4)
+
+        phase_edges = np.linspace(0, 360, PRPD_PHASE_BINS + 1)
+        wrapped = np.mod(phases, 360.0)
+        clipped = np.clip(np.abs(charges), PRPD_CHARGE_EDGES[0], PRPD_CHARGE_EDGES[-1])
+        self.assertEqual(histograms.shape, (4, PRPD_PHASE_BINS, len(PRPD_CHARGE_EDGES) - 1))
+        for group in range(4):
+            selected = groups == group
+            expected, _, _ = np.histogram2d(wrapped[selected], clipped[selected],
+                                            bins=[phase_edges, PRPD_CHARGE_EDGES])
+            np.testing.assert_array_equal(histograms[group], expected.astype(histograms.dtype), err_msg=str(group))
+            self.assertEqual(features[group, 0], selected.sum())
+        self.assertEqual(histograms.sum(), len(phases))
+
+
+class DashboardFilterTest(IsolatedModelMixin, EnterpriseUserTestCase):
+    """Фильтры дашборда"""
+
+    def numbers(self, **params):
+        return [cable.number for cable in self.client.get(reverse('dashboard'), params).context['cable_lines']]
+
+    def test_no_data_risk_includes_unscored_cables(self):
+        create_bulk_fleet(self.enterprise, 20)
+        self.assertTrue(self.analyzer().train_model(mode='full'))
+        self.analyzer().update_risk_scores(CableLine.objects.all())
+        CableLine.objects.bulk_create([
+            CableLine(number=number, enterprise=self.enterprise, cable_brand='ААБл-10 3х120', start_muff='КНТп-10',
+                      end_muff='КНТп-10', length=100, core_count=3, commissioning_date=date(2020, 1, 1))
+            for number in ('Б-1', 'Б-2')
+        ])
+        # Б-1 оценена без измерений, Б-2 ещё не оценена
+        self.analyzer().update_risk_scores(CableLine.objects.filter(number='Б-1'))
+        self.assertEqual(CableRiskScore.objects.get(cable_line__number='Б-1').risk_level, 'Нет данных измерений')
+
+        self.assertEqual(self.numbers(risk='Нет данных измерений'), ['Б-1', 'Б-2'])
+        scored = {level: self.numbers(risk=level) for level in ('Низкий', 'Средний', 'Высокий')}
+        self.assertEqual(sorted(sum(scored.values(), [])), sorted(
+            CableLine.objects.filter(number__startswith='П-').values_list('number', flat=True)))
+
+
+class ViewPerformanceTest(IsolatedModelMixin, EnterpriseUserTestCase):
+    """Число запросов и время ответа всех страниц на большом парке линий"""
+    LARGE_FLEET = 300
+    QUERY_BUDGET = 20
+    # Секунды на ответ на большом парке (с запасом для медленных машин CI)
+    LATENCY_BUDGET = 2.0
+
+    def urls(self, cable):
+        """(адрес, ожидаемый код ответа) для всех маршрутов cable_manager/urls.py, кроме выхода"""
+        return [
+            (reverse('home'), 200),
+            (reverse('login'), 200),
+            (reverse('dashboard'), 200),
+            (reverse('add_cable_line'), 200),
+            (reverse('add_measurement_session'), 200),
+            (reverse('import_measurements'), 200),
+            (reverse('add_high_voltage_test'), 200),
+            (reverse('cable_line_detail', args=[cable.pk]), 200),
+            (reverse('cable_sessions_json', args=[cable.pk]), 200),
+            (reverse('cable_tests_json', args=[cable.pk]), 200),
+            (reverse('cable_accidents_json', args=[cable.pk]), 200),
+            (reverse('ai_analysis'), 200),
+            (reverse('train_ai_model'), 302),
+            (reverse('training_status'), 200),
+            (reverse('statistics'), 200),
+            (reverse('export_history') + '?dataset=measurements&format=csv', 200),
+            (reverse('export_history') + '?dataset=sessions&format=csv', 200),
+            (reverse('export_history') + '?dataset=tests&format=csv', 200),
+            (reverse('export_history') + '?dataset=accidents&format=csv', 200),
+            (reverse('metrics'), 403),
+        ]
+
+    def query_counts(self, cable):
+        return {url: self.count_queries(url, status) for url, status in self.urls(cable)}
+
+    def train(self):
+        self.assertTrue(self.analyzer().train_model(mode='full'))
+
+    # Выгрузка читает строки порциями: на обоих парках — одна порция
+    @mock.patch('cable_manager.history_export.EXPORT_CHUNK_SIZE', 10 ** 6)
+    def test_query_count_does_not_depend_on_fleet_size(self):
+        cable = create_fleet(self.enterprise, 3, sessions_per_cable=3)[0]
+        create_bulk_fleet(self.enterprise, 20, prefix='A')
+        self.train()
+        small_fleet = self.query_counts(cable)
+
+        create_bulk_fleet(self.enterprise, self.LARGE_FLEET, prefix='B')
+        large_fleet = self.query_counts(cable)
+
+        for url, count in large_fleet.items():
+            with self.subTest(url=url):
+                self.assertEqual(small_fleet[url], count)
+                self.assertLessEqual(count, self.QUERY_BUDGET)
+
+    def test_latency_budget(self):
+        cable = create_fleet(self.enterprise, 1, sessions_per_cable=3)[0]
+        create_bulk_fleet(self.enterprise, self.LARGE_FLEET)
+        self.train()
+
+        for url, status in self.urls(cable):
+            with self.subTest(url=url):
+                self.fetch(url)
+                cache.clear()
+                started = time.perf_counter()
+                response = self.fetch(url)
+                elapsed = time.perf_counter() - started
+                self.assertEqual(response.status_code, status)
+                self.assertLess(elapsed, self.LATENCY_BUDGET)
+
+    def test_logout(self):
+        create_bulk_fleet(self.enterprise, 20)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('logout'))
+        self.assertEqual(response.status_code, 302)
+        self.assertLessEqual(len(queries.captured_queries), self.QUERY_BUDGET)
+
+
+class AnalyzerPerformanceTest(IsolatedModelMixin, EnterpriseUserTestCase):
+    """Число запросов и время работы точек входа CableAIAnalyzer"""
+    LARGE_FLEET = 300
+    QUERY_BUDGET = 15
+    # Секунды на пакетную оценку всего большого парка и на полное обучение
+    SCORING_BUDGET = 2.0
+    TRAINING_BUDGET = 20.0
+
+    def setUp(self):
+        super().setUp()
+        self.small_cables = create_bulk_fleet(self.enterprise, 20, prefix='A')
+
+    def count_calls(self, func, *args):
+        """Количество SQL-запросов при повторном вызове (первый вызов рассчитывает векторы признаков).
+
+        INSERT не считаются: bulk_create на SQLite делится на пакеты по ограничению числа параметров.
+        """
+        func(*args)
+        with CaptureQueriesContext(connection) as queries:
+            func(*args)
+        return sum(not query['sql'].startswith('INSERT') for query in queries.captured_queries)
+
+    def assertFleetIndependent(self, func, small_args, large_args):
+        small_fleet = self.count_calls(func, *small_args)
+        self.large_cables = create_bulk_fleet(self.enterprise, self.LARGE_FLEET, prefix='B')
+        large_fleet = self.count_calls(func, *large_args())
+        self.assertEqual(small_fleet, large_fleet)
+        self.assertLessEqual(large_fleet, self.QUERY_BUDGET)
+
+    def trained_analyzer(self):
+        analyzer = self.analyzer()
+        self.assertTrue(analyzer.train_model(mode='full'))
+        return analyzer
+
+    def test_build_training_frame(self):
+        analyzer = self.analyzer()
+        self.assertFleetIndependent(analyzer.build_training_frame, (), lambda: ())
+        samples, _ = analyzer.build_training_frame()
+        self.assertEqual(len(samples), 6 * (20 + self.LARGE_FLEET))
+        self.assertEqual(set(samples['label']), {0, 1})
+
+    def test_prepare_training_data(self):
+        analyzer = self.analyzer()
+        self.assertFleetIndependent(analyzer.prepare_training_data, (), lambda: ())
+
+    def test_predict_risk_batch(self):
+        analyzer = self.trained_analyzer()
+        cables = CableLine.objects.all()
+        self.assertFleetIndependent(analyzer.predict_risk_batch, (cables,), lambda: (cables,))
+
+        started = time.perf_counter()
+        results = analyzer.predict_risk_batch(cables)
+        self.assertLess(time.perf_counter() - started, self.SCORING_BUDGET)
+        self.assertEqual(len(results), 20 + self.LARGE_FLEET)
+        self.assertTrue(all(0 <= probability <= 1 for _, _, probability in results))
+
+    def test_predict_risk_batch_matches_single(self):
+        trained = self.trained_analyzer()
+        # Линия без сессий и сессия без измерений
+        CableLine.objects.create(number='БЕЗ-ДАННЫХ', enterprise=self.enterprise, cable_brand='ААБл-10 3х120',
+                                 length=50, core_count=3, commissioning_date=date(2020, 1, 1))
+        PDDMeasurementSession.objects.create(cable_line=self.small_cables[2], session_date=date(2024, 6, 1))
+
+        # Только что обученная модель scikit-learn и загруженная из реестра скомпилированная копия
+        for analyzer in (trained, self.analyzer()):
+            with self.subTest(model=type(analyzer.model).__name__):
+                results = analyzer.predict_risk_batch(CableLine.objects.order_by('pk'))
+                self.assertEqual(len(results), 21)
+                for cable, risk_level, probability in results:
+                    self.assertEqual(analyzer.predict_risk(cable), (risk_level, probability))
+                self.assertEqual({level for cable, level, _ in results if cable.number in ('БЕЗ-ДАННЫХ', 'A-00002')},
+                                 {'Нет данных измерений'})
+
+    def test_predict_risk(self):
+        analyzer = self.trained_analyzer()
+        self.assertFleetIndependent(analyzer.predict_risk, (self.small_cables[0],),
+                                    lambda: (self.large_cables[0],))
+
+    def test_update_risk_scores(self):
+        analyzer = self.trained_analyzer()
+        cables = CableLine.objects.all()
+        self.assertFleetIndependent(analyzer.update_risk_scores, (cables,), lambda: (cables,))
+        self.assertEqual(CableRiskScore.objects.count(), 20 + self.LARGE_FLEET)
+        self.assertEqual(set(CableRiskScore.objects.values_list('model_version', flat=True)),
+                         {analyzer.model_version})
+
+    def test_rescore_all_queries_grow_with_batches_only(self):
+        analyzer = self.trained_analyzer()
+        create_bulk_fleet(self.enterprise, self.LARGE_FLEET, prefix='B')
+        one_batch = self.count_calls(analyzer.rescore_all)
+        batches = self.count_calls(analyzer.rescore_all, 100)
+        # Запрос списка линий и одинаковый набор запросов на каждый из 4 пакетов
+        self.assertLessEqual(one_batch, self.QUERY_BUDGET)
+        self.assertEqual(batches - 1, 4 * (one_batch - 1))
+
+    def test_extract_features_and_future_accidents(self):
+        analyzer = self.analyzer()
+        cable = self.small_cables[0]
+        session = cable.pddmeasurementsession_set.order_by('session_date').first()
+        measurements = list(SinglePDMeasurement.objects.filter(session=session))
+
+        with CaptureQueriesContext(connection) as queries:
+            features = analyzer.extract_features(cable, measurements)
+            has_accident = analyzer.check_future_accidents(cable, session.session_date)
+        self.assertIsNotNone(features)
+        self.assertIsInstance(has_accident, bool)
+        self.assertLessEqual(len(queries.captured_queries), 2)
+
+    def test_training_dataset_matches_per_session_extraction(self):
+        import numpy as np
+
+        # Сессия без измерений и авария на границе горизонта прогноза
+        cable = self.small_cables[1]
+        PDDMeasurementSession.objects.create(cable_line=cable, session_date=date(2024, 6, 1))
+        last_session = cable.pddmeasurementsession_set.order_by('session_date').last()
+        Accident.objects.create(
+            cable_line=cable,
+            accident_date=datetime.combine(last_session.session_date + timedelta(days=90), datetime.min.time(),
+                                           tzinfo=dt_timezone.utc),
+            accident_type='other',
+            description='Авария на границе горизонта',
+        )
+        analyzer = self.analyzer()
+
+        features, labels = analyzer.build_training_dataset()
+
+        expected_features, expected_labels = [], []
+        for cable in CableLine.objects.order_by('pk'):
+            for session in cable.pddmeasurementsession_set.order_by('session_date', 'pk'):
+                measurements = list(session.singlepdmeasurement_set.all())
+                if not measurements:
+                    continue
+                expected_features.append(analyzer.extract_features(cable, measurements))
+                expected_labels.append(analyzer.check_future_accidents(cable, session.session_date))
+        self.assertEqual(len(expected_labels), 6 * 20)
+        np.testing.assert_allclose(features, np.array(expected_features, dtype=float))
+        np.testing.assert_array_equal(labels, np.array(expected_labels, dtype=int))
+        self.assertEqual(set(labels), {0, 1})
+
+    def test_train_full_and_auto(self):
+        create_bulk_fleet(self.enterprise, self.LARGE_FLEET, prefix='B')
+        analyzer = self.analyzer()
+        started = time.perf_counter()
+        self.assertTrue(analyzer.train_model(mode='full'))
+        self.assertLess(time.perf_counter() - started, self.TRAINING_BUDGET)
+        self.assertEqual(analyzer.training_info['mode'], 'full')
+        self.assertEqual(CableRiskScore.objects.count(), 20 + self.LARGE_FLEET)
+
+        # Без новых данных автоматический режим оставляет модель без изменений
+        analyzer = self.analyzer()
+        self.assertTrue(analyzer.train_model())
+        self.assertEqual(analyzer.training_info['mode'], 'unchanged')
+        self.assertEqual(ModelVersion.objects.count(), 1)
+
+    def add_new_data(self):
+        cable = self.small_cables[0]
+        for days in (400, 460):
+            session = PDDMeasurementSession.objects.create(cable_line=cable, session_date=date(2023, 1, 1) + timedelta(days=days))
+            SinglePDMeasurement.objects.create(session=session, voltage_level=10, core_1_discharge=900)
+        Accident.objects.create(cable_line=cable, accident_date=datetime(2024, 4, 20, tzinfo=dt_timezone.utc),
+                                accident_type='other', description='Тестовая авария')
+
+    def test_train_incremental(self):
+        import numpy as np
+        from .ai_analyzer import INCREMENTAL_TREES
+
+        base = self.trained_analyzer()
+        self.add_new_data()
+
+        analyzer = self.analyzer()
+        self.assertTrue(analyzer.train_model(mode='incremental'))
+        self.assertEqual(analyzer.training_info['mode'], 'incremental')
+        self.assertEqual(analyzer.training_info['parent_version'], base.model_version)
+
+        # Прежние деревья сохраняются, к ним добавляются новые; признаки и масштабатор не меняются
+        self.assertEqual(len(analyzer.model.estimators_), base.model.n_estimators + INCREMENTAL_TREES)
+        for old_tree, tree in zip(base.model.estimators_, analyzer.model.estimators_):
+            np.testing.assert_array_equal(tree.tree_.threshold, old_tree.tree_.threshold)
+        self.assertEqual(analyzer.model.n_features_in_, base.model.n_features_in_)
+        self.assertEqual(analyzer.extra_features, base.extra_features)
+        np.testing.assert_array_equal(analyzer.scaler.mean_, base.scaler.mean_)
+        np.testing.assert_array_equal(analyzer.scaler.scale_, base.scaler.scale_)
+
+    def test_incremental_falls_back_to_full_when_features_change(self):
+        from .feature_store import SESSION_FEATURE_COLUMNS
+
+        base = self.trained_analyzer()
+        self.add_new_data()
+
+        # Дополнительные признаки отключены: набор признаков текущей модели больше не подходит
+        analyzer = self.analyzer()
+        with self.settings(CABLE_AI_EXTRA_FEATURES=[]):
+            self.assertTrue(analyzer.train_model(mode='incremental'))
+        self.assertEqual(analyzer.training_info['mode'], 'full')
+        self.assertEqual(analyzer.extra_features, [])
+        self.assertEqual(analyzer.model.n_features_in_, 3 + len(SESSION_FEATURE_COLUMNS))
+        self.assertLess(analyzer.model.n_features_in_, base.model.n_features_in_)
+        self.assertEqual(analyzer.model.n_estimators, base.model.n_estimators)
+
+    def test_train_search(self):
+        analyzer = self.analyzer()
+        with self.settings(CABLE_AI_SEARCH_CANDIDATES=2, CABLE_AI_SEARCH_WORKERS=1):
+            self.assertTrue(analyzer.train_model(mode='search'))
+        self.assertEqual(analyzer.training_info['mode'], 'search')
+        self.assertEqual(analyzer.training_info['evaluation']['candidates'], 2)
+        self.assertIsNotNone(ModelVersion.objects.get(version=analyzer.model_version).roc_auc)
+
+    def test_search_compares_with_current_params_on_same_folds(self):
+        from .model_selection import DEFAULT_MODEL_PARAMS
+
+        self.trained_analyzer()
+        challenger = dict(DEFAULT_MODEL_PARAMS, max_depth=8)
+
+        def result(params, roc_auc):
+            return {'params': params, 'roc_auc': roc_auc, 'fold_roc_auc': [roc_auc], 'precision': 0.5, 'recall': 0.5}
+
+        for current_auc, mode in ((0.8, 'rejected'), (0.6, 'search')):
+            with self.subTest(current_auc=current_auc):
+                analyzer = self.analyzer()
+                versions = ModelVersion.objects.count()
+                results = sorted([result(challenger, 0.7), result(dict(DEFAULT_MODEL_PARAMS), current_auc)],
+                                 key=lambda item: item['roc_auc'], reverse=True)
+                with mock.patch('cable_manager.model_selection.search_parameters',
+                                return_value=(results, False)) as search:
+                    self.assertTrue(analyzer.train_model(mode='search'))
+                # Параметры текущей модели — первый кандидат
+                self.assertEqual(search.call_args.args[3][0], DEFAULT_MODEL_PARAMS)
+                self.assertEqual(analyzer.training_info['mode'], mode)
+                evaluation = analyzer.training_info['evaluation']
+                self.assertEqual((evaluation['roc_auc'], evaluation['current_roc_auc']), (max(0.7, current_auc), current_auc))
+                self.assertEqual(ModelVersion.objects.count(), versions + (mode == 'search'))
+
+    def test_feature_importance(self):
+        self.assertEqual(self.analyzer().get_feature_importance(), [])
+        importance = self.trained_analyzer().get_feature_importance()
+        self.assertTrue(importance)
+        self.assertAlmostEqual(sum(value for _, value in importance), 1.0, places=6)
+
+    def test_synthetic_training(self):
+        features, labels = self.analyzer().generate_synthetic_data(num_samples=30)
+        self.assertEqual(len(features), 30)
+        self.assertEqual(len(labels), 30)
+        analyzer = self.analyzer()
+        self.assertTrue(analyzer.train_with_synthetic_data())
+        self.assertIsNotNone(self.analyzer().model)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'план запросов проверяется для SQLite')
+class HistoryIndexQueryPlanTest(EnterpriseUserTestCase):
+    """Запросы истории линии используют составные индексы (линия, дата), а не сортировку во временном B-дереве"""
+
+    def setUp(self):
+        super().setUp()
+        self.cable = create_bulk_fleet(self.enterprise, 50)[0]
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = self.query_plan(queryset)
+        self.assertIn(index_name, plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_sessions_history(self):
+        from .views import SESSION_ORDERING
+        self.assertUsesIndex(
+            PDDMeasurementSession.objects.filter(cable_line=self.cable).order_by(*SESSION_ORDERING)[:50],
+            'session_cable_date_idx')
+
+    def test_sessions_history_window(self):
+        from .views import SESSION_ORDERING
+        self.assertUsesIndex(
+            PDDMeasurementSession.objects.filter(
+                cable_line=self.cable, session_date__gte=date(2023, 3, 1), session_date__lte=date(2023, 9, 1),
+            ).order_by(*SESSION_ORDERING)[:50],
+            'session_cable_date_idx')
+
+    def test_latest_session(self):
+        self.assertUsesIndex(
+            PDDMeasurementSession.objects.filter(cable_line=self.cable).order_by('-session_date', '-pk')[:1],
+            'session_cable_date_idx')
+
+    def test_tests_history(self):
+        from .views import TEST_ORDERING
+        self.assertUsesIndex(
+            HighVoltageTest.objects.filter(cable_line=self.cable).order_by(*TEST_ORDERING)[:50],
+            'test_cable_date_idx')
+
+    def test_accidents_history(self):
+        from .views import ACCIDENT_ORDERING
+        self.assertUsesIndex(
+            Accident.objects.filter(cable_line=self.cable).order_by(*ACCIDENT_ORDERING)[:50],
+            'accident_cable_date_idx')
+
+    def test_future_accidents(self):
+        # Как в CableAIAnalyzer.check_future_accidents
+        self.assertUsesIndex(
+            Accident.objects.filter(
+                cable_line=self.cable,
+                accident_date__date__gte=date(2023, 5, 1),
+                accident_date__date__lte=date(2023, 7, 30),
+            ),
+            'accident_cable_date_idx')
+
+
+class FleetGeneratorTest(TestCase):
+    def snapshot(self, prefix):
+        measurements = SinglePDMeasurement.objects.filter(session__cable_line__number__startswith=prefix).order_by(
+            'session__cable_line__number', 'session__session_date', 'voltage_level')
+        return (
+            list(CableLine.objects.filter(number__startswith=prefix).order_by('number').values_list(
+                'cable_brand', 'start_muff', 'end_muff', 'length', 'core_count', 'commissioning_date')),
+            list(measurements.values_list('session__session_date', 'voltage_level', 'core_1_discharge',
+                                          'core_2_discharge', 'core_3_distance')),
+            list(Accident.objects.filter(cable_line__number__startswith=prefix).order_by(
+                'cable_line__number').values_list('accident_date', 'accident_type')),
+        )
+
+    def test_same_seed_gives_same_fleet(self):
+        from .fleet_generator import generate_fleet
+
+        first = generate_fleet(2, 40, sessions_per_cable=4, seed=3, prefix='A-', batch_size=15)
+        second = generate_fleet(2, 40, sessions_per_cable=4, seed=3, prefix='B-', batch_size=15)
+
+        self.assertEqual(first.as_dict(), second.as_dict())
+        self.assertEqual(first.cables, 40)
+        self.assertEqual(first.measurements, 3 * first.sessions)
+        self.assertEqual(SinglePDMeasurement.objects.count(), 2 * first.measurements)
+        self.assertEqual(self.snapshot('A-'), self.snapshot('B-'))
+
+    def test_existing_prefix_is_rejected(self):
+        from .fleet_generator import generate_fleet
+
+        generate_fleet(1, 5, sessions_per_cable=2, prefix='A-')
+        with self.assertRaises(ValueError):
+            generate_fleet(1, 5, sessions_per_cable=2, prefix='A-')
+
+
+class ProfilingMiddlewareTest(EnterpriseUserTestCase):
+    def setUp(self):
+        super().setUp()
+        from .profiling import aggregator
+        self.aggregator = aggregator
+        aggregator.flush()
+        create_fleet(self.enterprise, 2)
+
+    def test_views_are_aggregated_and_flushed(self):
+        from .models import ViewProfile
+
+        url = reverse('statistics')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+            self.client.get(url)
+        self.aggregator.flush()
+
+        profile = ViewProfile.objects.get(view_name='statistics', method='GET')
+        self.assertEqual(profile.request_count, 2)
+        self.assertEqual(profile.query_count, len(queries.captured_queries))
+        self.assertGreater(profile.total_time, profile.sql_time)
+
+        # Повторный сброс прибавляется к той же строке
+        self.client.get(url)
+        self.aggregator.flush()
+        profile.refresh_from_db()
+        self.assertEqual(profile.request_count, 3)
+
+    def test_streaming_queries_are_counted_after_consumption(self):
+        from .models import ViewProfile
+
+        response = self.client.get(reverse('export_history') + '?dataset=measurements&format=csv')
+        self.aggregator.flush()
+        self.assertFalse(ViewProfile.objects.filter(view_name='export_history').exists())
+
+        b''.join(response.streaming_content)
+        self.aggregator.flush()
+        self.assertGreater(ViewProfile.objects.get(view_name='export_history').query_count, 0)
+
+    def test_sampled_request_is_saved_with_cprofile_stats(self):
+        from .models import ProfileSample
+
+        with mock.patch('cable_manager.profiling.SAMPLE_RATE', 1.0):
+            self.client.get(reverse('dashboard'))
+        sample = ProfileSample.objects.get()
+        self.assertEqual(sample.view_name, 'dashboard')
+        self.assertIn('cumulative', sample.stats)
+        self.assertGreater(sample.query_count, 0)
+
+    def test_flush_error_is_logged(self):
+        with mock.patch.object(self.aggregator, 'flush_due', return_value=True), \
+                mock.patch.object(self.aggregator, 'flush', side_effect=RuntimeError('нет соединения')), \
+                self.assertLogs('cable_manager.profiling', 'ERROR') as logs:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Ошибка сохранения профилей представлений', logs.output[0])
+        self.assertIn('нет соединения', logs.output[0])
+
+
+class MetricsEndpointTest(IsolatedModelMixin, EnterpriseUserTestCase):
+    def setUp(self):
+        super().setUp()
+        from . import metrics
+        self.metrics = metrics
+        metrics._row_counts['checked_at'] = None
+        self.user.is_staff = True
+        self.user.save()
+
+    def scrape(self, **headers):
+        response = self.client.get(reverse('metrics'), **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_access_requires_staff_or_token(self):
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+        self.client.logout()
+        with self.settings(CABLE_METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.scrape(HTTP_AUTHORIZATION='Bearer secret')
+
+    def test_histogram_buckets(self):
+        histogram = self.metrics.Histogram(self.metrics.MetricsCollector(directory=self.metrics.collector.directory),
+                                           'test_values', 'Проверка корзин', buckets=(1, 10))
+        # Границы включаются в корзину, NaN пропускается
+        for value in (0.5, 1, -3, 1.5, 10, 20, float('nan')):
+            histogram.observe(value)
+        self.assertEqual(histogram.collector.series(histogram)[()], [3, 2, 1, 30.0, 6])
+
+        histogram.observe(float('inf'))
+        self.assertEqual(histogram.collector.series(histogram)[()][2], 2)
+
+    def test_write_error_logged(self):
+        collector = self.metrics.MetricsCollector(directory=os.path.join(self.metrics.collector.directory, 'x'))
+        with open(collector.directory, 'w'):
+            pass
+        with self.assertLogs('cable_manager.metrics', 'WARNING') as logs:
+            collector.write()
+        self.assertIn('Ошибка записи показателей', logs.output[0])
+
+    def test_request_latency_and_row_counts(self):
+        create_fleet(self.enterprise, 3)
+        self.client.get(reverse('dashboard'))
+        text = self.scrape()
+
+        self.assertIn('# TYPE cable_http_request_duration_seconds histogram', text)
+        self.assertIn('cable_http_request_duration_seconds_count{url_name="dashboard",method="GET",status="200"} 1',
+                      text)
+        self.assertIn('cable_http_request_duration_seconds_bucket{url_name="dashboard",method="GET",status="200",'
+                      'le="+Inf"} 1', text)
+        self.assertIn('cable_rows{model="CableLine"} 3', text)
+        self.assertIn('cable_rows{model="SinglePDMeasurement"} 12', text)
+
+    def test_other_process_files_are_summed(self):
+        self.client.get(reverse('dashboard'))
+        other = self.metrics.MetricsCollector(directory=self.metrics.collector.directory)
+        values = self.metrics.request_latency.empty()
+        values[0], values[-2], values[-1] = 2, 0.002, 2
+        other._series = {'cable_http_request_duration_seconds': {('dashboard', 'GET', '200'): values}}
+        with mock.patch('os.getpid', return_value=999999999):
+            other._pid = 999999999
+            other.write()
+
+        text = self.scrape()
+        self.assertIn('cable_http_request_duration_seconds_count{url_name="dashboard",method="GET",status="200"} 3',
+                      text)
+
+    def test_ai_pipeline_metrics(self):
+        create_bulk_fleet(self.enterprise, 20)
+        analyzer = self.analyzer()
+        self.assertTrue(analyzer.train_model(mode='full'))
+        analyzer.predict_risk(CableLine.objects.first())
+        analyzer.predict_risk_batch(CableLine.objects.all())
+        registry.reload()
+        text = self.scrape()
+
+        self.assertIn('cable_ai_training_duration_seconds_count{mode="full"} 1', text)
+        self.assertIn('cable_ai_training_samples_count{mode="full"} 1', text)
+        self.assertIn('cable_ai_predict_duration_seconds_count{operation="single"} 1', text)
+        self.assertRegex(text, r'cable_ai_predict_duration_seconds_count\{operation="batch"\} [1-9]')
+        self.assertRegex(text, r'cable_ai_model_load_duration_seconds_count\{source="compiled"\} [1-9]')
+
+
+class PageCacheTest(IsolatedModelMixin, EnterpriseUserTestCase):
+    """Кэш страниц предприятия и его сброс по сигналам изменения данных"""
+    # Сессия, пользователь, профиль, предприятие и лёгкие запросы страницы ИИ-анализа
+    # (проверка линий без оценок, последнее задание обучения, метрики модели)
+    CACHED_QUERY_BUDGET = 7
+
+    def add_accident(self, cable):
+        # Сброс кэша выполняется после фиксации транзакции
+        with self.captureOnCommitCallbacks(execute=True):
+            Accident.objects.create(
+                cable_line=cable,
+                accident_date=datetime(2024, 5, 1, tzinfo=dt_timezone.utc),
+                accident_type='other',
+                description='Новая авария',
+            )
+
+    def test_cached_pages_skip_heavy_queries(self):
+        create_fleet(self.enterprise, 3)
+        create_bulk_fleet(self.enterprise, 50)
+        self.assertTrue(self.analyzer().train_model(mode='full'))
+        for name in ('dashboard', 'statistics', 'ai_analysis'):
+            with self.subTest(page=name):
+                uncached = self.count_queries(reverse(name))
+                cached = self.count_queries(reverse(name), cached=True)
+                self.assertLess(cached, uncached)
+                self.assertLessEqual(cached, self.CACHED_QUERY_BUDGET)
+
+    def test_statistics_invalidated_by_new_accident(self):
+        cable = create_fleet(self.enterprise, 3)[0]
+        self.assertEqual(self.client.get(reverse('statistics')).context['total_accidents'], 2)
+
+        self.add_accident(cable)
+
+        response = self.client.get(reverse('statistics'))
+        self.assertEqual(response.context['total_accidents'], 3)
+        self.assertContains(response, '<td style="padding: 0.75rem;">2</td>', html=False)
+
+    def test_dashboard_invalidated_by_new_cable(self):
+        create_fleet(self.enterprise, 2)
+        self.assertEqual(len(self.client.get(reverse('dashboard')).context['cable_lines']), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_fleet(self.enterprise, 1, prefix='Н')
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(response.context['cable_lines']), 3)
+        self.assertContains(response, 'Н-0000')
+
+    def test_other_enterprise_keeps_cache(self):
+        from .page_cache import enterprise_version
+
+        other = Enterprise.objects.create(name='Другое предприятие')
+        cable = create_fleet(self.enterprise, 1)[0]
+        create_fleet(other, 1, prefix='Д')
+        version, other_version = enterprise_version(self.enterprise.pk), enterprise_version(other.pk)
+
+        self.add_accident(cable)
+
+        self.assertNotEqual(enterprise_version(self.enterprise.pk), version)
+        self.assertEqual(enterprise_version(other.pk), other_version)
+
+    def test_rescoring_invalidates_enterprise(self):
+        from .page_cache import enterprise_version
+
+        create_bulk_fleet(self.enterprise, 20)
+        self.assertTrue(self.analyzer().train_model(mode='full'))
+        version = enterprise_version(self.enterprise.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.analyzer().update_risk_scores(CableLine.objects.all())
+
+        self.assertNotEqual(enterprise_version(self.enterprise.pk), version)
+
+    def test_ai_analysis_keyed_by_model_version(self):
+        create_bulk_fleet(self.enterprise, 20)
+        self.assertContains(self.client.get(reverse('ai_analysis')), 'Сначала обучите модель')
+        self.assertFalse(CableRiskScore.objects.exists())
+
+        # Новая модель меняет ключ фрагмента и без сброса версии данных предприятия
+        self.assertTrue(self.analyzer().train_model(mode='full'))
+        self.assertNotContains(self.client.get(reverse('ai_analysis')), 'Сначала обучите модель')
+
+    def test_untrained_model_removes_scores(self):
+        from .page_cache import enterprise_version
+
+        create_bulk_fleet(self.enterprise, 5)
+        analyzer = self.analyzer()
+        analyzer.model = analyzer.scaler = None
+        CableRiskScore.objects.create(cable_line=CableLine.objects.first(), risk_level='Высокий', probability=0.9,
+                                      scored_at=django_timezone.now())
+        version = enterprise_version(self.enterprise.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(analyzer.update_risk_scores(CableLine.objects.all()), [])
+
+        self.assertFalse(CableRiskScore.objects.exists())
+        self.assertNotEqual(enterprise_version(self.enterprise.pk), version)
+
+    def test_scoring_precedes_cache_version(self):
+        from .page_cache import cache_version
+
+        create_bulk_fleet(self.enterprise, 20)
+        analyzer = self.analyzer()
+        self.assertTrue(analyzer.train_model(mode='full'))
+        CableRiskScore.objects.all().delete()
+
+        for name in ('statistics', 'ai_analysis'):
+            # Обработчики on_commit выполняются сразу, как в запросе вне транзакции теста
+            with mock.patch('django.db.transaction.on_commit', side_effect=lambda func, *args, **kwargs: func()):
+                response = self.client.get(reverse(name))
+            # Страница сохранена под версией, действующей после сохранения оценок
+            self.assertEqual(response.context['cache_version'],
+                             cache_version(self.enterprise.pk, analyzer.model_version))
+            self.assertEqual(CableRiskScore.objects.count(), 20)
+            CableRiskScore.objects.all().delete()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AsyncViewTest(TransactionTestCase):
+    """Асинхронные представления с настоящими пулами потоков (данные зафиксированы, их видят все соединения)"""
+
+    def setUp(self):
+        from . import concurrency, metrics, profiling
+        cache.clear()
+        metrics_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(metrics_dir.cleanup)
+        for target, attr, value in ((metrics.collector, 'directory', metrics_dir.name),
+                                    (metrics.collector, '_series', {}),
+                                    (profiling.aggregator, '_stats', {}),
+                                    (concurrency, 'QUERY_WORKERS', 4),
+                                    (concurrency, 'SCORING_WORKERS', 2)):
+            patcher = mock.patch.object(target, attr, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.aggregator = profiling.aggregator
+
+        self.enterprise = Enterprise.objects.create(name='Тестовое предприятие')
+        self.user = User.objects.create_user(username='engineer', password='secret')
+        UserProfile.objects.create(user=self.user, enterprise=self.enterprise, full_name='Инженер')
+        self.async_client.force_login(self.user)
+        self.cables = create_fleet(self.enterprise, 3)
+
+    async def test_concurrent_requests(self):
+        urls = [reverse('statistics'), reverse('ai_analysis'), reverse('cable_line_detail', args=[self.cables[0].pk])]
+        responses = await asyncio.gather(*(self.async_client.get(url) for url in urls * 3))
+
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+        statistics = responses[0]
+        self.assertEqual(statistics.context['total_cables'], 3)
+        self.assertEqual(statistics.context['total_accidents'], 2)
+        self.assertContains(responses[2], self.cables[0].number)
+
+    async def test_queries_counted_across_pool_threads(self):
+        response = await self.async_client.get(reverse('cable_line_detail', args=[self.cables[0].pk]))
+        self.assertEqual(response.status_code, 200)
+
+        stats = [value for (view_name, *_), value in self.aggregator._stats.items() if view_name == 'cable_line_detail']
+        self.assertEqual(len(stats), 1)
+        self.assertGreaterEqual(stats[0]['query_count'], 6)
+
+    def test_wsgi_queries_counted_across_pool_threads(self):
+        from . import concurrency
+        self.client.force_login(self.user)
+        url = reverse('cable_line_detail', args=[self.cables[0].pk])
+
+        def query_count(query_workers, scoring_workers):
+            with mock.patch.object(concurrency, 'QUERY_WORKERS', query_workers), \
+                    mock.patch.object(concurrency, 'SCORING_WORKERS', scoring_workers):
+                self.client.get(url)
+                cache.clear()
+                self.aggregator._stats.clear()
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            stats = [value for (view_name, *_), value in self.aggregator._stats.items()
+                     if view_name == 'cable_line_detail']
+            self.assertEqual(len(stats), 1)
+            return stats[0]['query_count']
+
+        pooled = query_count(4, 2)
+        inline = query_count(0, 0)
+        self.assertGreaterEqual(pooled, 6)
+        self.assertEqual(pooled, inline)
+
+    async def test_pool_thread_reuses_connection(self):
+        from . import concurrency
+
+        def used_connection():
+            CableLine.objects.count()
+            return connection.connection, connection.close_at
+
+        # Новые пулы: соединения их потоков создаются при заданном POOL_CONN_MAX_AGE
+        with mock.patch.object(concurrency, 'POOL_CONN_MAX_AGE', 60):
+            results = [await concurrency.run_in_pool('connection-test', 1, used_connection) for _ in range(3)]
+        for raw, close_at in results:
+            self.assertIs(raw, results[0][0])
+            self.assertGreater(close_at, time.monotonic() + 30)
+
+        with mock.patch.object(concurrency, 'POOL_CONN_MAX_AGE', None):
+            _, close_at = await concurrency.run_in_pool('connection-test-unlimited', 1, used_connection)
+        self.assertIsNone(close_at)
+
+    async def test_missing_cable_and_login(self):
+        response = await self.async_client.get(reverse('cable_line_detail', args=[999999]))
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+        await sync_to_async(self.async_client.logout)()
+        response = await self.async_client.get(reverse('statistics'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(settings.LOGIN_URL, response['Location'])
@@ -0,0 +1,181 @@
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import TrainingJob
+
+
+# Выполняющаяся задача, от воркера которой столько времени нет сигнала, считается брошенной (воркер упал);
+# воркер подаёт сигнал при каждом сообщении о ходе обучения и не реже раза в HEARTBEAT_INTERVAL секунд
+STALE_JOB_TIMEOUT = timedelta(minutes=10)
+HEARTBEAT_INTERVAL = 60.0
+
+
+class JobAbandoned(Exception):
+    """Задача признана зависшей и больше не принадлежит этому воркеру"""
+
+
+def enqueue_training(user=None, mode=TrainingJob.MODE_AUTO):
+    """Постановка обучения в очередь.
+
+    Если обучение уже в очереди или выполняется, новая задача не создаётся:
+    одновременные запросы разрешает уникальный индекс по active_slot.
+    Возвращает (задача, создана ли новая).
+    """
+    while True:
+        try:
+            with transaction.atomic():
+                job = TrainingJob.objects.create(requested_by=user, mode=mode, active_slot=True,
+                                                 message="Ожидание свободного воркера")
+            return job, True
+        except IntegrityError:
+            pass
+
+        active = TrainingJob.objects.filter(active_slot=True).first()
+        if active is None:
+            # Задача завершилась между вставкой и чтением
+            continue
+        if active.is_active:
+            return active, False
+        # Отметку оставила задача, завершённая в обход воркера (например, в админке)
+        TrainingJob.objects.filter(pk=active.pk).exclude(status__in=TrainingJob.ACTIVE_STATUSES).update(
+            active_slot=None)
+
+
+def fail_stale_jobs(timeout=STALE_JOB_TIMEOUT):
+    """Перевод зависших задач (без сигнала воркера дольше timeout) в статус ошибки"""
+    cutoff = timezone.now() - timeout
+    return TrainingJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=TrainingJob.STATUS_RUNNING,
+    ).update(
+        status=TrainingJob.STATUS_FAILED,
+        message="Воркер не завершил обучение",
+        finished_at=timezone.now(),
+        active_slot=None,
+    )
+
+
+def heartbeat(job_id, **fields):
+    """Сигнал воркера (и обновление fields), если задача ещё выполняется; иначе JobAbandoned"""
+    updated = TrainingJob.objects.filter(pk=job_id, status=TrainingJob.STATUS_RUNNING).update(
+        heartbeat_at=timezone.now(), **fields
+    )
+    if not updated:
+        raise JobAbandoned(f"Задача обучения #{job_id} больше не выполняется")
+
+
+@contextmanager
+def heartbeats(job_id, interval=HEARTBEAT_INTERVAL):
+    """Сигналы воркера в фоновом потоке, пока выполняется блок (этапы без сообщений о ходе бывают долгими)"""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                try:
+                    heartbeat(job_id)
+                except JobAbandoned:
+                    return
+        except Exception as e:
+            print(f"Ошибка записи сигнала воркера: {e}")
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'training-heartbeat-{job_id}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def claim_next_job():
+    """Захват следующей задачи из очереди.
+
+    Активная задача одна (см. enqueue_training), поэтому задача в очереди
+    есть, только пока ничего не выполняется. Она захватывается одним условным
+    UPDATE по статусу: если её уже взял другой воркер, обновлено 0 строк.
+    """
+    job = TrainingJob.objects.filter(status=TrainingJob.STATUS_QUEUED, active_slot=True).first()
+    if job is None:
+        return None
+
+    now = timezone.now()
+    claimed = TrainingJob.objects.filter(pk=job.pk, status=TrainingJob.STATUS_QUEUED).update(
+        status=TrainingJob.STATUS_RUNNING,
+        started_at=now,
+        heartbeat_at=now,
+        progress=0,
+        message="Обучение запущено",
+    )
+    if not claimed:
+        return None
+
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job):
+    """Выполнение обучения по задаче с записью прогресса"""
+    from .ai_analyzer import CableAIAnalyzer
+
+    def progress(percent, message):
+        # Если задачу признали зависшей, обучение прерывается до публикации модели
+        heartbeat(job.pk, progress=percent, message=message)
+
+    try:
+        analyzer = CableAIAnalyzer()
+
+        # Сначала пробуем обучить на реальных данных
+        with heartbeats(job.pk):
+            success = analyzer.train_model(progress=progress, mode=job.mode)
+        training = analyzer.training_info or {}
+        if training.get('mode') == 'incremental':
+            message = f"Модель ИИ дообучена на {training['new_sample_count']} новых и изменённых сессиях"
+        elif training.get('mode') == 'unchanged':
+            message = "Новых данных с прошлого обучения нет, модель не изменилась"
+        elif training.get('mode') == 'search':
+            message = f"Подобраны параметры модели, ROC-AUC {training['evaluation']['roc_auc']:.3f}"
+        elif training.get('mode') == 'rejected':
+            evaluation = training['evaluation']
+            message = (f"Новая модель не лучше текущей (ROC-AUC {evaluation['roc_auc']:.3f} "
+                       f"против {evaluation['current_roc_auc']:.3f}), оставлена текущая модель")
+        else:
+            message = "Модель ИИ успешно обучена"
+
+        if not success:
+            # Если реальных данных недостаточно, используем синтетические для демонстрации
+            with heartbeats(job.pk):
+                success = analyzer.train_with_synthetic_data(progress=progress)
+            message = "Недостаточно реальных данных. Модель обучена на демонстрационных данных"
+
+        if success:
+            status = TrainingJob.STATUS_SUCCEEDED
+        else:
+            status, message = TrainingJob.STATUS_FAILED, "Не удалось обучить модель"
+        model_version = analyzer.model_version or ''
+    except JobAbandoned as e:
+        print(f"Обучение прервано: {e}")
+        job.refresh_from_db()
+        return job
+    except Exception as e:
+        print(f"Ошибка обучения: {e}")
+        status, message, model_version = TrainingJob.STATUS_FAILED, f"Ошибка обучения: {e}"[:255], ''
+
+    # Итог записывается, только если задачу не признали зависшей и не передали другому воркеру
+    TrainingJob.objects.filter(pk=job.pk, status=TrainingJob.STATUS_RUNNING).update(
+        status=status,
+        progress=100,
+        message=message,
+        model_version=model_version,
+        finished_at=timezone.now(),
+        active_slot=None,
+    )
+    job.refresh_from_db()
+    return job
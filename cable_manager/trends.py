@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from .feature_store import load_session_features
+from .models import CableLine, PDDMeasurementSession, CableDischargeTrend
+
+
+# Количество последних сессий линии, по которым оценивается тренд
+TREND_WINDOW = 5
+
+TREND_BATCH_SIZE = 2000
+
+CORES = (1, 2, 3)
+
+# Тренды по каждой жиле: относительный рост (наклон log(1 + ЧР), 1/год), наклон ЧР (пКл/год)
+# и ускорение (пКл/год²) по последним TREND_WINDOW сессиям
+TREND_METRICS = {
+    'growth': 'Относительный рост ЧР',
+    'slope': 'Наклон ЧР',
+    'accel': 'Ускорение роста ЧР',
+}
+
+TREND_FEATURE_COLUMNS = [f'trend_core_{core}_{metric}' for core in CORES for metric in TREND_METRICS]
+
+TREND_FEATURE_LABELS = {
+    f'trend_core_{core}_{metric}': f'{label} жила {core}'
+    for core in CORES
+    for metric, label in TREND_METRICS.items()
+}
+
+DAYS_PER_YEAR = 365.25
+
+
+def grouped_window_sums(frame, columns, groups, window):
+    """Суммы столбцов по скользящему окну последних window строк каждой группы.
+
+    Строки должны быть упорядочены внутри групп. Считается через накопленные суммы
+    по группам: сумма окна = накопленная сумма минус накопленная сумма window строк назад.
+    """
+    cumulative = frame[columns].groupby(groups).cumsum()
+    return cumulative - cumulative.groupby(groups).shift(window).fillna(0)
+
+
+def session_trends(sessions, window=TREND_WINDOW):
+    """Тренды ЧР на момент каждой сессии по всем линиям сразу.
+
+    sessions — DataFrame (session_id, cable_line_id, session_date, core_1..3) со значением
+    ЧР жилы в сессии. Для каждой сессии по ней и window - 1 предыдущим сессиям той же линии
+    одной сгруппированной регрессией считаются линейный наклон ЧР, наклон log(1 + ЧР)
+    и удвоенный коэффициент квадратичной аппроксимации (ускорение). Время отсчитывается
+    от текущей сессии, поэтому в расчёт не попадают более поздние измерения.
+    Возвращает DataFrame по session_id со столбцами TREND_FEATURE_COLUMNS и window_sessions.
+    """
+    frame = sessions.sort_values(['cable_line_id', 'session_date', 'session_id']).reset_index(drop=True)
+    groups = frame['cable_line_id']
+    if frame.empty:
+        return pd.DataFrame(columns=TREND_FEATURE_COLUMNS + ['window_sessions'],
+                            index=pd.Index([], name='session_id'))
+
+    dates = pd.to_datetime(frame['session_date'])
+    t = ((dates - dates.groupby(groups).transform('min')).dt.days / DAYS_PER_YEAR).to_numpy()
+
+    columns = {'s0': np.ones(len(frame)), 's1': t, 's2': t ** 2, 's3': t ** 3, 's4': t ** 4}
+    for core in CORES:
+        y = frame[f'core_{core}'].to_numpy(dtype=float)
+        log_y = np.log1p(y)
+        columns.update({
+            f'y{core}': y, f'ty{core}': t * y, f't2y{core}': t * t * y,
+            f'l{core}': log_y, f'tl{core}': t * log_y,
+        })
+    sums = grouped_window_sums(pd.DataFrame(columns), list(columns), groups, window)
+
+    # Переход к времени относительно текущей сессии (a): суммы степеней (t - a)
+    a = t
+    n = sums['s0'].to_numpy()
+    s1, s2, s3, s4 = (sums[name].to_numpy() for name in ('s1', 's2', 's3', 's4'))
+    t1 = s1 - a * n
+    t2 = s2 - 2 * a * s1 + a ** 2 * n
+    t3 = s3 - 3 * a * s2 + 3 * a ** 2 * s1 - a ** 3 * n
+    t4 = s4 - 4 * a * s3 + 6 * a ** 2 * s2 - 4 * a ** 3 * s1 + a ** 4 * n
+
+    linear_denominator = n * t2 - t1 ** 2
+    linear = (n >= 2) & (linear_denominator > 1e-12)
+
+    normal = np.stack([
+        np.stack([n, t1, t2], axis=-1),
+        np.stack([t1, t2, t3], axis=-1),
+        np.stack([t2, t3, t4], axis=-1),
+    ], axis=-2)
+    quadratic = (n >= 3) & (np.abs(np.linalg.det(normal)) > 1e-12)
+
+    result = pd.DataFrame(index=pd.Index(frame['session_id'].to_numpy(), name='session_id'))
+    for core in CORES:
+        sy = sums[f'y{core}'].to_numpy()
+        y1 = sums[f'ty{core}'].to_numpy() - a * sy
+        y2 = sums[f't2y{core}'].to_numpy() - 2 * a * sums[f'ty{core}'].to_numpy() + a ** 2 * sy
+        sl = sums[f'l{core}'].to_numpy()
+        l1 = sums[f'tl{core}'].to_numpy() - a * sl
+
+        slope = np.zeros(len(frame))
+        growth = np.zeros(len(frame))
+        slope[linear] = (n * y1 - t1 * sy)[linear] / linear_denominator[linear]
+        growth[linear] = (n * l1 - t1 * sl)[linear] / linear_denominator[linear]
+
+        acceleration = np.zeros(len(frame))
+        if quadratic.any():
+            rhs = np.stack([sy, y1, y2], axis=-1)[quadratic][..., None]
+            coefficients = np.linalg.solve(normal[quadratic], rhs)[..., 0]
+            acceleration[quadratic] = 2 * coefficients[:, 2]
+
+        result[f'trend_core_{core}_growth'] = growth
+        result[f'trend_core_{core}_slope'] = slope
+        result[f'trend_core_{core}_accel'] = acceleration
+
+    result['window_sessions'] = n.astype(int)
+    return result
+
+
+def cable_session_values(cable_ids=None):
+    """Сессии линий с максимальным ЧР по каждой жиле (из хранилища признаков)"""
+    sessions = PDDMeasurementSession.objects.all()
+    if cable_ids is not None:
+        sessions = sessions.filter(cable_line_id__in=cable_ids)
+    frame = pd.DataFrame.from_records(
+        sessions.values_list('pk', 'cable_line_id', 'session_date'),
+        columns=['session_id', 'cable_line_id', 'session_date'],
+    )
+    session_features = load_session_features(None if cable_ids is None else list(frame['session_id']))
+    values = session_features[[f'core_{core}_discharge_max' for core in CORES]].rename(
+        columns={f'core_{core}_discharge_max': f'core_{core}' for core in CORES}
+    )
+
+    # Сессии без измерений в тренд не входят; индекс после слияния может взяться из values
+    # (уровень session_id), поэтому он сбрасывается, чтобы не конфликтовать со столбцом
+    return frame.merge(values, left_on='session_id', right_index=True, how='inner').reset_index(drop=True)
+
+
+def load_trend_features(session_ids=None):
+    """Тренды ЧР на момент сессий (DataFrame по session_id со столбцами TREND_FEATURE_COLUMNS)"""
+    cable_ids = None
+    if session_ids is not None:
+        cable_ids = list(PDDMeasurementSession.objects.filter(pk__in=session_ids).values_list(
+            'cable_line_id', flat=True).distinct())
+    trends = session_trends(cable_session_values(cable_ids))
+    if session_ids is not None:
+        trends = trends[trends.index.isin(session_ids)]
+    return trends[TREND_FEATURE_COLUMNS]
+
+
+def update_cable_trends(cable_ids):
+    """Пересчёт сохранённых трендов ЧР линий (по последней сессии каждой линии)"""
+    values = cable_session_values(cable_ids)
+    trends = session_trends(values).join(values.set_index('session_id')[['cable_line_id', 'session_date']])
+    latest = trends.groupby('cable_line_id').tail(1)
+
+    records = [
+        CableDischargeTrend(
+            cable_line_id=row.cable_line_id,
+            core=core,
+            growth_rate=getattr(row, f'trend_core_{core}_growth'),
+            slope=getattr(row, f'trend_core_{core}_slope'),
+            acceleration=getattr(row, f'trend_core_{core}_accel'),
+            session_count=row.window_sessions,
+            last_session_date=row.session_date,
+        )
+        for row in latest.itertuples()
+        for core in CORES
+    ]
+
+    with transaction.atomic():
+        CableDischargeTrend.objects.filter(cable_line_id__in=cable_ids).delete()
+        CableDischargeTrend.objects.bulk_create(records)
+    return records
+
+
+def rebuild_trends(batch_size=TREND_BATCH_SIZE):
+    """Пересчёт трендов ЧР всего парка пакетами линий"""
+    cable_ids = list(CableLine.objects.order_by('pk').values_list('pk', flat=True))
+    stored = 0
+    for start in range(0, len(cable_ids), batch_size):
+        stored += len(update_cable_trends(cable_ids[start:start + batch_size]))
+    print(f"Тренды ЧР пересчитаны: {len(cable_ids)} линий")
+    return stored
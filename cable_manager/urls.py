@@ -8,9 +8,16 @@ urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
     path('add-cable/', views.add_cable_line, name='add_cable_line'),
     path('add-measurement/', views.add_measurement_session, name='add_measurement_session'),
+    path('import-measurements/', views.import_measurement_file, name='import_measurements'),
     path('add-test/', views.add_high_voltage_test, name='add_high_voltage_test'),
     path('cable/<int:cable_id>/', views.cable_line_detail, name='cable_line_detail'),
+    path('cable/<int:cable_id>/sessions.json', views.cable_sessions_json, name='cable_sessions_json'),
+    path('cable/<int:cable_id>/tests.json', views.cable_tests_json, name='cable_tests_json'),
+    path('cable/<int:cable_id>/accidents.json', views.cable_accidents_json, name='cable_accidents_json'),
     path('ai-analysis/', views.ai_analysis, name='ai_analysis'),  # НОВЫЙ МАРШРУТ
     path('train-ai/', views.train_ai_model, name='train_ai_model'),  # НОВЫЙ МАРШРУТ
+    path('train-ai/status/', views.training_status, name='training_status'),
     path('statistics/', views.statistics, name='statistics'),
+    path('export/', views.export_history, name='export_history'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -1,105 +1,274 @@
-from .ai_analyzer import CableAIAnalyzer
-from django.shortcuts import render, redirect
+from .training_jobs import enqueue_training
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+import asyncio
+import hmac
+import io
+from datetime import date
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from django.utils.functional import SimpleLazyObject
 from django.forms import inlineformset_factory
-from .models import CableLine, PDDMeasurementSession, HighVoltageTest, Accident, Enterprise, SinglePDMeasurement
+from .models import CableLine, PDDMeasurementSession, HighVoltageTest, Accident, Enterprise, SinglePDMeasurement, \
+    CableRiskScore, TrainingJob, ModelVersion
 from .forms import CableLineForm, PDDMeasurementSessionForm, HighVoltageTestForm, AccidentForm, MuffChangeLogForm, \
-    SinglePDMeasurementForm
+    SinglePDMeasurementForm, DashboardFilterForm, MeasurementImportForm, HistoryExportForm
+from .history_export import export_rows, export_chunks, EXPORT_FORMATS
+from .pagination import KeysetPage, decode_cursor, keyset_page
+from .page_cache import PAGE_CACHE_TIMEOUT, acached_page_data, cache_version, cached_page_data
+from .concurrency import async_login_required, run_query, run_scoring
+from .pd_import import import_measurements, REQUIRED_COLUMNS, VALUE_COLUMNS
+
+# Модули ИИ и анализа ЧР (numpy, pandas) импортируются внутри представлений при первом
+# обращении, чтобы процесс запускался без них (см. cable_manager.startup)
 
 
 def home(request):
     return render(request, 'cable_manager/home.html')
 
 
-@login_required
-def ai_analysis(request):
-    """Страница ИИ-анализа"""
-    analyzer = CableAIAnalyzer()
+def ensure_risk_scores(analyzer, cable_lines):
+    """Расчёт оценок риска для кабельных линий, у которых их ещё нет.
 
-    # Проверяем, обучена ли модель
-    model_trained = analyzer.model is not None
+    Сохранение оценок сбрасывает кэш предприятия, поэтому вызывается до чтения cache_version.
+    """
+    if analyzer.model is None:
+        return
+    unscored = cable_lines.filter(risk_score__isnull=True)
+    if unscored.exists():
+        analyzer.update_risk_scores(unscored)
+
+
+def request_enterprise(request):
+    return request.user.userprofile.enterprise
+
+
+def load_analyzer():
+    from .ai_analyzer import CableAIAnalyzer
+
+    return CableAIAnalyzer()
 
-    # Анализ рисков для кабельных линий пользователя
-    user_enterprise = request.user.userprofile.enterprise
-    cable_lines = CableLine.objects.filter(enterprise=user_enterprise)
 
+def trained_model_evaluation(analyzer):
+    """Метрики проверки во времени есть у моделей, обученных с подбором параметров"""
+    if analyzer.model is None:
+        return None
+    return ModelVersion.objects.filter(version=analyzer.model_version, roc_auc__isnull=False).first()
+
+
+def risk_analysis_rows(cable_lines):
+    """Сохранённые оценки риска линий для страницы ИИ-анализа (один запрос)"""
     risk_analysis = []
-    for cable in cable_lines:
-        risk_level, probability = analyzer.predict_risk(cable)
+    for cable in cable_lines.select_related('risk_score'):
+        risk_level = cable.risk_score.risk_level
         risk_analysis.append({
             'cable': cable,
             'risk_level': risk_level,
-            'probability': f"{probability:.1%}",
+            'probability': f"{cable.risk_score.probability:.1%}",
             'color': 'green' if risk_level == 'Низкий' else 'orange' if risk_level == 'Средний' else 'red'
         })
+    return risk_analysis
+
 
-    # Важность признаков
-    feature_importance = analyzer.get_feature_importance()
+@async_login_required
+async def ai_analysis(request):
+    """Страница ИИ-анализа"""
+    user_enterprise, analyzer = await asyncio.gather(run_query(request_enterprise, request), run_query(load_analyzer))
+
+    # Проверяем, обучена ли модель
+    model_trained = analyzer.model is not None
+
+    # Анализ рисков для кабельных линий пользователя (сохранённые оценки, один запрос).
+    # Недостающие оценки досчитываются до чтения версии кэша, чтобы страница не сохранилась под устаревшей
+    cable_lines = CableLine.objects.filter(enterprise=user_enterprise)
+    await run_scoring(ensure_risk_scores, analyzer, cable_lines)
+    version = await run_query(cache_version, user_enterprise.pk, analyzer.model_version)
+
+    async def risk_analysis():
+        if not model_trained:
+            return []
+        # Если фрагмент успеет устареть до отрисовки, список построит шаблон
+        fragment_key = make_template_fragment_key('ai_risk_analysis', [user_enterprise.pk, version])
+        if await run_query(cache.has_key, fragment_key):
+            return SimpleLazyObject(lambda: risk_analysis_rows(cable_lines))
+        return await run_query(risk_analysis_rows, cable_lines)
+
+    # Независимые запросы выполняются одновременно
+    rows, training_job, model_evaluation = await asyncio.gather(
+        risk_analysis(),
+        run_query(TrainingJob.objects.order_by('-created_at').first),
+        run_query(trained_model_evaluation, analyzer),
+    )
 
     context = {
         'model_trained': model_trained,
-        'risk_analysis': risk_analysis,
-        'feature_importance': feature_importance,
+        'risk_analysis': rows,
+        'cache_version': version,
+        'cache_timeout': PAGE_CACHE_TIMEOUT,
+        'enterprise': user_enterprise,
+        # Важность признаков
+        'feature_importance': analyzer.get_feature_importance(),
+        'training_job': training_job,
+        'model_evaluation': model_evaluation,
     }
 
-    return render(request, 'cable_manager/ai_analysis.html', context)
+    # Шаблон обращается к базе (пользователь, сообщения), поэтому отрисовывается в пуле запросов
+    return await run_query(render, request, 'cable_manager/ai_analysis.html', context)
 
 
-@login_required
-def statistics(request):
-    """Страница со статистикой"""
-    user_enterprise = request.user.userprofile.enterprise
-    cable_lines = CableLine.objects.filter(enterprise=user_enterprise)
+def related_count(model):
+    """Подзапрос количества связанных с кабельной линией записей"""
+    return Coalesce(Subquery(
+        model.objects.filter(cable_line=OuterRef('pk')).order_by().values('cable_line').annotate(
+            count=Count('pk')).values('count')
+    ), 0)
 
-    # Основная статистика
-    total_cables = cable_lines.count()
-    total_measurements = PDDMeasurementSession.objects.filter(cable_line__in=cable_lines).count()
-    total_tests = HighVoltageTest.objects.filter(cable_line__in=cable_lines).count()
-    total_accidents = Accident.objects.filter(cable_line__in=cable_lines).count()
 
-    # Анализ рисков
-    analyzer = CableAIAnalyzer()
+def enterprise_risk_distribution(enterprise):
+    """Распределение сохранённых оценок риска линий предприятия (один GROUP BY)"""
     risk_distribution = {'Низкий': 0, 'Средний': 0, 'Высокий': 0}
+    risk_counts = CableRiskScore.objects.filter(
+        cable_line__enterprise=enterprise
+    ).values('risk_level').annotate(count=Count('id'))
+    for row in risk_counts:
+        if row['risk_level'] in risk_distribution:
+            risk_distribution[row['risk_level']] = row['count']
+    return risk_distribution
 
-    for cable in cable_lines:
-        risk_level, _ = analyzer.predict_risk(cable)
-        if risk_level in risk_distribution:
-            risk_distribution[risk_level] += 1
+
+@async_login_required
+async def statistics(request):
+    """Страница со статистикой"""
+    user_enterprise, analyzer = await asyncio.gather(run_query(request_enterprise, request), run_query(load_analyzer))
+    cable_lines = CableLine.objects.filter(enterprise=user_enterprise)
+    # Недостающие оценки досчитываются в пуле расчёта до чтения версии кэша (их сохранение её меняет)
+    await run_scoring(ensure_risk_scores, analyzer, cable_lines)
+    version = await run_query(cache_version, user_enterprise.pk, analyzer.model_version)
+
+    # Счётчики по каждой линии считаются коррелированными подзапросами в одном запросе,
+    # итоги предприятия суммируются по ним без отдельных count()
+    annotated_lines = cable_lines.annotate(
+        session_count=related_count(PDDMeasurementSession),
+        test_count=related_count(HighVoltageTest),
+        accident_count=related_count(Accident),
+        last_measurement_date=Subquery(
+            PDDMeasurementSession.objects.filter(cable_line=OuterRef('pk')).order_by().values(
+                'cable_line').annotate(last=Max('session_date')).values('last')
+        ),
+    )
+    evaluated = {}
+
+    async def build_statistics():
+        # Счётчики по линиям и распределение оценок риска (один GROUP BY) независимы и считаются одновременно
+        lines, risk_distribution = await asyncio.gather(
+            run_query(list, annotated_lines), run_query(enterprise_risk_distribution, user_enterprise))
+        evaluated['cable_lines'] = lines
+        return {
+            'total_cables': len(lines),
+            'total_measurements': sum(cable.session_count for cable in lines),
+            'total_tests': sum(cable.test_count for cable in lines),
+            'total_accidents': sum(cable.accident_count for cable in lines),
+            'risk_distribution': risk_distribution,
+        }
 
     context = {
-        'total_cables': total_cables,
-        'total_measurements': total_measurements,
-        'total_tests': total_tests,
-        'total_accidents': total_accidents,
-        'risk_distribution': risk_distribution,
-        'cable_lines': cable_lines,
+        **await acached_page_data('statistics', user_enterprise.pk, version, build_statistics),
+        # Таблица линий кэшируется фрагментом шаблона: запрос выполняется только при его промахе
+        'cable_lines': evaluated.get('cable_lines', annotated_lines),
+        'cache_version': version,
+        'cache_timeout': PAGE_CACHE_TIMEOUT,
+        'enterprise': user_enterprise,
+        'export_form': HistoryExportForm(initial={'dataset': 'measurements', 'format': 'csv'}),
     }
 
-    return render(request, 'cable_manager/statistics.html', context)
+    return await run_query(render, request, 'cable_manager/statistics.html', context)
+
 
 @login_required
-def train_ai_model(request):
-    """Обучение ИИ-модели"""
-    analyzer = CableAIAnalyzer()
+def export_history(request):
+    """Потоковая выгрузка истории измерений, испытаний и аварий предприятия"""
+    form = HistoryExportForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    options = form.cleaned_data
+    rows = export_rows(
+        options['dataset'],
+        enterprise=request.user.userprofile.enterprise,
+        date_from=options['date_from'],
+        date_to=options['date_to'],
+        cable_numbers=options['cables'],
+    )
+    try:
+        chunks = export_chunks(options['dataset'], options['format'], rows)
+    except ValueError as e:
+        return JsonResponse({'errors': {'format': [str(e)]}}, status=400)
 
-    # Сначала пробуем обучить на реальных данных
-    success = analyzer.train_model()
+    content_type, extension = EXPORT_FORMATS[options['format']]
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{options["dataset"]}.{extension}"'
+    return response
 
-    if not success:
-        # Если реальных данных недостаточно, используем синтетические для демонстрации
-        messages.info(request, 'Недостаточно реальных данных. Используются демонстрационные данные.')
-        success = analyzer.train_with_synthetic_data()
 
-    if success:
-        messages.success(request, 'Модель ИИ успешно обучена!')
+@login_required
+def train_ai_model(request):
+    """Постановка обучения ИИ-модели в очередь фонового воркера"""
+    mode = request.GET.get('mode')
+    if mode not in dict(TrainingJob.MODES):
+        mode = TrainingJob.MODE_AUTO
+    job, created = enqueue_training(request.user, mode=mode)
+
+    if created:
+        messages.success(request, 'Обучение модели ИИ поставлено в очередь')
     else:
-        messages.warning(request, 'Не удалось обучить модель')
+        messages.info(request, 'Обучение модели уже выполняется')
 
     return redirect('ai_analysis')
 
 
+def metrics(request):
+    """Показатели в текстовом формате Prometheus (для сотрудников или по токену CABLE_METRICS_TOKEN)"""
+    from .metrics import CONTENT_TYPE, render as render_metrics
+
+    token = getattr(settings, 'CABLE_METRICS_TOKEN', None)
+    authorized = request.user.is_authenticated and request.user.is_staff
+    if token and not authorized:
+        authorized = hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not authorized:
+        return HttpResponse('Доступ запрещён', status=403, content_type='text/plain; charset=utf-8')
+
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
+
+
+@login_required
+def training_status(request):
+    """Состояние последней задачи обучения (JSON для опроса со страницы)"""
+    job = TrainingJob.objects.order_by('-created_at').first()
+    if job is None:
+        return JsonResponse({'job': None})
+
+    return JsonResponse({'job': {
+        'id': job.pk,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'active': job.is_active,
+        'progress': job.progress,
+        'message': job.message,
+        'model_version': job.model_version,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }})
+
+
 def login_view(request):
     if request.method == 'POST':
         username = request.POST['username']
@@ -118,14 +287,80 @@ def logout_view(request):
     return redirect('home')
 
 
+# Количество карточек кабельных линий на одной странице дашборда
+DASHBOARD_PAGE_SIZE = 50
+
+DASHBOARD_ORDERINGS = {
+    'number': ['number', 'id'],
+    'commissioning': ['commissioning_date', 'id'],
+}
+
+
 @login_required
 def dashboard(request):
     user_enterprise = request.user.userprofile.enterprise
     cable_lines = CableLine.objects.filter(enterprise=user_enterprise)
 
+    def build_dashboard():
+        brands = list(cable_lines.order_by('cable_brand').values_list('cable_brand', flat=True).distinct())
+        filter_form = DashboardFilterForm(request.GET or None, brands=brands)
+        filtered = cable_lines
+
+        order = 'number'
+        if filter_form.is_valid():
+            filters = filter_form.cleaned_data
+            if filters['q']:
+                # Поиск по началу строки, чтобы использовались индексы по номеру и марке
+                filtered = filtered.filter(
+                    Q(number__istartswith=filters['q']) | Q(cable_brand__istartswith=filters['q'])
+                )
+            if filters['brand']:
+                filtered = filtered.filter(cable_brand=filters['brand'])
+            if filters['core_count']:
+                filtered = filtered.filter(core_count=filters['core_count'])
+            if filters['year']:
+                filtered = filtered.filter(
+                    commissioning_date__gte=date(filters['year'], 1, 1),
+                    commissioning_date__lt=date(filters['year'] + 1, 1, 1),
+                )
+            if filters['risk'] == DashboardFilterForm.NO_DATA_RISK:
+                filtered = filtered.filter(Q(risk_score__isnull=True) | Q(risk_score__risk_level=filters['risk']))
+            elif filters['risk']:
+                filtered = filtered.filter(risk_score__risk_level=filters['risk'])
+            order = filters['order'] or order
+
+        page = keyset_page(
+            filtered.select_related('risk_score'),
+            DASHBOARD_ORDERINGS[order],
+            cursor=request.GET.get('after'),
+            page_size=DASHBOARD_PAGE_SIZE,
+        )
+        return {'brands': brands, 'items': page.items, 'next_cursor': page.next_cursor}
+
+    # Марки для фильтра и страница линий кэшируются по версии данных предприятия и параметрам запроса
+    data = cached_page_data(
+        'dashboard', user_enterprise.pk, cache_version(user_enterprise.pk), build_dashboard,
+        sorted(request.GET.lists()),
+    )
+    filter_form = DashboardFilterForm(request.GET or None, brands=data['brands'])
+    page = KeysetPage(data['items'], data['next_cursor'])
+
+    next_query = None
+    if page.next_cursor:
+        query = request.GET.copy()
+        query['after'] = page.next_cursor
+        next_query = query.urlencode()
+
+    first_query = request.GET.copy()
+    first_query.pop('after', None)
+
     context = {
-        'cable_lines': cable_lines,
-        'enterprise': user_enterprise
+        'cable_lines': page.items,
+        'enterprise': user_enterprise,
+        'filter_form': filter_form,
+        'next_query': next_query,
+        'first_query': first_query.urlencode(),
+        'is_first_page': 'after' not in request.GET,
     }
     return render(request, 'cable_manager/dashboard.html', context)
 
@@ -166,15 +401,17 @@ def add_measurement_session(request):
         formset = PDMeasurementFormSet(request.POST)
 
         if session_form.is_valid() and formset.is_valid():
-            session = session_form.save()
+            # Одна транзакция: производные данные линии пересчитываются один раз после фиксации
+            with transaction.atomic():
+                session = session_form.save()
 
-            measurements = formset.save(commit=False)
-            for measurement in measurements:
-                measurement.session = session
-                measurement.save()
+                measurements = formset.save(commit=False)
+                for measurement in measurements:
+                    measurement.session = session
+                    measurement.save()
 
-            for measurement in formset.deleted_objects:
-                measurement.delete()
+                for measurement in formset.deleted_objects:
+                    measurement.delete()
 
             messages.success(request, 'Сессия измерений с данными по напряжениям успешно добавлена')
             return redirect('dashboard')
@@ -190,6 +427,36 @@ def add_measurement_session(request):
     return render(request, 'cable_manager/add_measurement_session.html', context)
 
 
+@login_required
+def import_measurement_file(request):
+    """Загрузка CSV-файла измерений ЧР от испытательной установки"""
+    result = None
+
+    if request.method == 'POST':
+        form = MeasurementImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            lines = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                result = import_measurements(lines, enterprise=request.user.userprofile.enterprise)
+            except (ValueError, UnicodeDecodeError) as e:
+                messages.error(request, f'Не удалось импортировать файл: {e}')
+            else:
+                messages.success(request, f'Импортировано сессий: {result.sessions_created}, '
+                                          f'дополнено: {result.sessions_updated}, '
+                                          f'измерений: {result.measurements_created}')
+                if result.error_count:
+                    messages.warning(request, f'Строк с ошибками: {result.error_count}')
+    else:
+        form = MeasurementImportForm()
+
+    context = {
+        'form': form,
+        'result': result,
+        'columns': REQUIRED_COLUMNS + VALUE_COLUMNS + ['notes'],
+    }
+    return render(request, 'cable_manager/import_measurements.html', context)
+
+
 @login_required
 def add_high_voltage_test(request):
     user_enterprise = request.user.userprofile.enterprise
@@ -208,22 +475,180 @@ def add_high_voltage_test(request):
     return render(request, 'cable_manager/add_high_voltage_test.html', {'form': form})
 
 
+# Сколько последних записей истории выводится на странице линии сразу
+DETAIL_RECENT_SESSIONS = 5
+DETAIL_RECENT_ROWS = 10
+
+# Размер страницы истории в JSON-эндпоинтах (по умолчанию и максимум)
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 200
+
+SESSION_ORDERING = ['-session_date', '-id']
+TEST_ORDERING = ['-test_date', '-id']
+ACCIDENT_ORDERING = ['-accident_date', '-id']
+
+
+def serialize_session(session):
+    return {
+        'id': session.pk,
+        'session_date': session.session_date.isoformat(),
+        'created_at': session.created_at.isoformat(),
+        'notes': session.notes,
+        'measurements': [
+            {
+                'voltage_level': measurement.voltage_level,
+                'core_1_discharge': measurement.core_1_discharge,
+                'core_1_distance': measurement.core_1_distance,
+                'core_2_discharge': measurement.core_2_discharge,
+                'core_2_distance': measurement.core_2_distance,
+                'core_3_discharge': measurement.core_3_discharge,
+                'core_3_distance': measurement.core_3_distance,
+            }
+            for measurement in session.singlepdmeasurement_set.all()
+        ],
+    }
+
+
+def serialize_test(test):
+    return {
+        'id': test.pk,
+        'test_date': test.test_date.isoformat(),
+        'test_voltage': test.test_voltage,
+        'insulation_resistance': test.insulation_resistance,
+        'created_at': test.created_at.isoformat(),
+    }
+
+
+def serialize_accident(accident):
+    return {
+        'id': accident.pk,
+        'accident_date': accident.accident_date.isoformat(),
+        'accident_type': accident.accident_type,
+        'accident_type_display': accident.get_accident_type_display(),
+        'description': accident.description,
+        'downtime': str(accident.downtime) if accident.downtime else None,
+    }
+
+
+def history_page(request, cable_id, queryset, ordering, date_field, serialize):
+    """JSON-страница истории кабельной линии: курсор + необязательное окно дат"""
+    cable_line = get_object_or_404(CableLine, id=cable_id, enterprise=request.user.userprofile.enterprise)
+    queryset = queryset.filter(cable_line=cable_line)
+
+    dates = {}
+    for name in ('date_from', 'date_to'):
+        value = request.GET.get(name)
+        try:
+            dates[name] = parse_date(value) if value else None
+        except ValueError:
+            dates[name] = None
+        if value and dates[name] is None:
+            return JsonResponse({'error': 'Некорректная дата'}, status=400)
+    date_from, date_to = dates['date_from'], dates['date_to']
+    lookup = f'{date_field}__date' if date_field == 'accident_date' else date_field
+    if date_from:
+        queryset = queryset.filter(**{f'{lookup}__gte': date_from})
+    if date_to:
+        queryset = queryset.filter(**{f'{lookup}__lte': date_to})
+
+    try:
+        limit = min(max(int(request.GET.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = HISTORY_PAGE_SIZE
+
+    # Повреждённый курсор не сбрасывает пагинацию на первую страницу
+    cursor = request.GET.get('before')
+    if cursor and decode_cursor(cursor, queryset.model, ordering) is None:
+        return JsonResponse({'error': 'Некорректный курсор'}, status=400)
+
+    page = keyset_page(queryset, ordering, cursor=cursor, page_size=limit)
+    return JsonResponse({
+        'items': [serialize(item) for item in page.items],
+        'next_cursor': page.next_cursor,
+    })
+
+
+@login_required
+def cable_sessions_json(request, cable_id):
+    """Страница сессий измерений ЧР (от новых к старым)"""
+    return history_page(
+        request, cable_id,
+        PDDMeasurementSession.objects.prefetch_related('singlepdmeasurement_set'),
+        SESSION_ORDERING, 'session_date', serialize_session,
+    )
+
+
 @login_required
-def cable_line_detail(request, cable_id):
+def cable_tests_json(request, cable_id):
+    """Страница высоковольтных испытаний (от новых к старым)"""
+    return history_page(request, cable_id, HighVoltageTest.objects.all(), TEST_ORDERING, 'test_date',
+                        serialize_test)
+
+
+@login_required
+def cable_accidents_json(request, cable_id):
+    """Страница аварий (от новых к старым)"""
+    return history_page(request, cable_id, Accident.objects.all(), ACCIDENT_ORDERING, 'accident_date',
+                        serialize_accident)
+
+
+def cable_prpd(cable_line):
+    """Фазовый образ ЧР последней сессии линии с записанными импульсами (или None)"""
+    from .prpd import latest_cable_pattern, pattern_features, pattern_histogram, PRPD_FEATURE_LABELS
+
+    pattern = latest_cable_pattern(cable_line)
+    if pattern is None:
+        return None
+    features = pattern_features(pattern)
+    return {
+        'session_date': pattern.session.session_date,
+        'pulse_count': pattern.pulse_count,
+        'stats': [(PRPD_FEATURE_LABELS[name], value) for name, value in features.items()
+                  if name != 'prpd_pulse_count'],
+        'chart': {'histogram': pattern_histogram(pattern).tolist()},
+    }
+
+
+@async_login_required
+async def cable_line_detail(request, cable_id):
+    from .hotspots import cable_hotspots
+
     try:
-        cable_line = CableLine.objects.get(id=cable_id)
-        measurements = PDDMeasurementSession.objects.filter(cable_line=cable_line).prefetch_related(
-            'singlepdmeasurement_set')
-        tests = HighVoltageTest.objects.filter(cable_line=cable_line)
-        accidents = Accident.objects.filter(cable_line=cable_line)
-
-        context = {
-            'cable_line': cable_line,
-            'measurements': measurements,
-            'tests': tests,
-            'accidents': accidents,
-        }
-        return render(request, 'cable_manager/cable_line_detail.html', context)
+        # Сводка по истории линии считается подзапросами в одном запросе
+        cable_line = await run_query(CableLine.objects.annotate(
+            session_count=related_count(PDDMeasurementSession),
+            test_count=related_count(HighVoltageTest),
+            accident_count=related_count(Accident),
+        ).get, id=cable_id)
     except CableLine.DoesNotExist:
         messages.error(request, 'Кабельная линия не найдена')
-        return redirect('dashboard')
\ No newline at end of file
+        return redirect('dashboard')
+
+    # Разделы страницы не зависят друг от друга и загружаются одновременно. Сразу выводятся только
+    # последние записи, более старые подгружаются через JSON-эндпоинты
+    measurements, tests, accidents, prpd, hotspots, trends = await asyncio.gather(
+        run_query(keyset_page,
+                  PDDMeasurementSession.objects.filter(cable_line=cable_line).prefetch_related('singlepdmeasurement_set'),
+                  SESSION_ORDERING, page_size=DETAIL_RECENT_SESSIONS),
+        run_query(keyset_page, HighVoltageTest.objects.filter(cable_line=cable_line), TEST_ORDERING,
+                  page_size=DETAIL_RECENT_ROWS),
+        run_query(keyset_page, Accident.objects.filter(cable_line=cable_line), ACCIDENT_ORDERING,
+                  page_size=DETAIL_RECENT_ROWS),
+        run_query(cable_prpd, cable_line),
+        run_query(cable_hotspots, cable_line),
+        run_query(list, cable_line.discharge_trends.order_by('core')),
+    )
+
+    context = {
+        'cable_line': cable_line,
+        'prpd': prpd,
+        'hotspots': hotspots,
+        'trends': trends,
+        'measurements': measurements.items,
+        'measurements_cursor': measurements.next_cursor,
+        'tests': tests.items,
+        'tests_cursor': tests.next_cursor,
+        'accidents': accidents.items,
+        'accidents_cursor': accidents.next_cursor,
+    }
+    return await run_query(render, request, 'cable_manager/cable_line_detail.html', context)
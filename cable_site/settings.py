@@ -41,6 +41,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы замер охватывал остальные промежуточные слои
+    'cable_manager.profiling.ProfilingMiddleware',
+    'cable_manager.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -124,6 +127,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Настройки для PythonAnywhere
 import os
+import tempfile
 
 # Разрешенные хосты
 ALLOWED_HOSTS = ['yourusername.pythonanywhere.com', 'localhost', '127.0.0.1']
@@ -153,4 +157,56 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Безопасность (для production)
 DEBUG = False
 SECURE_BROWSER_XSS_FILTER = True
-SECURE_CONTENT_TYPE_NOSNIFF = True
\ No newline at end of file
+SECURE_CONTENT_TYPE_NOSNIFF = True
+
+# ИИ-модель: как часто (в секундах) процесс проверяет появление новой модели на диске
+CABLE_AI_MODEL_CHECK_INTERVAL = 5.0
+
+# Дополнительные наборы признаков для обучения новых моделей ИИ
+# (уже обученная модель использует набор, записанный в её метаданных)
+CABLE_AI_EXTRA_FEATURES = ['prpd', 'trend']
+
+# Подбор гиперпараметров модели ИИ: число проверочных блоков во времени, число кандидатов,
+# бюджет времени (секунды) и число процессов (None — все ядра)
+CABLE_AI_CV_FOLDS = 4
+CABLE_AI_SEARCH_CANDIDATES = 12
+CABLE_AI_SEARCH_BUDGET = 300
+CABLE_AI_SEARCH_WORKERS = None
+
+# Профилирование представлений (cable_manager.profiling.ProfilingMiddleware): сводка по времени
+# и SQL-запросам сбрасывается в базу раз в CABLE_PROFILE_FLUSH_INTERVAL секунд; доля запросов
+# CABLE_PROFILE_SAMPLE_RATE выполняется под cProfile (0 — выключено), хранятся последние CABLE_PROFILE_SAMPLES_KEPT
+CABLE_PROFILING = True
+CABLE_PROFILE_FLUSH_INTERVAL = 60.0
+CABLE_PROFILE_SAMPLE_RATE = 0.0
+CABLE_PROFILE_SAMPLES_KEPT = 500
+
+# Показатели в формате Prometheus (/metrics/): каталог файлов показателей процессов (общий для воркеров
+# gunicorn, при развёртывании можно очистить) и период их записи (секунды). Страница доступна
+# сотрудникам (is_staff) и запросам с заголовком "Authorization: Bearer <CABLE_METRICS_TOKEN>"
+# CABLE_METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+CABLE_METRICS_WRITE_INTERVAL = 5.0
+CABLE_METRICS_TOKEN = os.environ.get('CABLE_METRICS_TOKEN')
+
+# Кэш страниц и фрагментов шаблонов (cable_manager.page_cache). Файловый кэш общий для всех воркеров
+# и процесса обучения, поэтому сброс по сигналам изменения данных виден сразу всем процессам
+# (LocMemCache подходит только для одного процесса). Ключи зависят от версии данных предприятия,
+# устаревшие записи удаляются через CABLE_PAGE_CACHE_TIMEOUT секунд
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'cable_manager_cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+CABLE_PAGE_CACHE_TIMEOUT = 3600
+
+# Асинхронные представления (статистика, ИИ-анализ, карточка линии) под ASGI (cable_site.asgi, например
+# uvicorn cable_site.asgi:application): потоки для одновременных запросов к базе и ограниченный пул
+# расчёта оценок риска моделью. Потоки пулов живут весь процесс, и каждый держит своё соединение
+# с базой до CABLE_POOL_CONN_MAX_AGE секунд (закрывается раньше только после ошибки), независимо
+# от CONN_MAX_AGE запросов; значение должно быть меньше wait_timeout MySQL.
+# Сравнение с WSGI: manage.py benchmark_handlers --user <имя>
+CABLE_ASYNC_QUERY_WORKERS = 8
+CABLE_SCORING_WORKERS = 2
+CABLE_POOL_CONN_MAX_AGE = 60
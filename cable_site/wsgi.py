@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cable_site.settings')
 
 application = get_wsgi_application()
+
+# Для gunicorn --preload: при CABLE_PRELOAD=1 модули ИИ и модель загружаются в мастер-процессе
+# до запуска воркеров, и воркеры используют эту память совместно (cable_manager.startup.preload)
+if os.environ.get('CABLE_PRELOAD') == '1':
+    from cable_manager.startup import preload
+    preload()